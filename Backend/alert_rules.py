@@ -0,0 +1,236 @@
+"""Threshold alert rules evaluated over ingested sensor batches.
+
+A batch is turned into NumPy columns (silo index, timestamp, one column
+per metric) sorted by silo then time, and every rule is a handful of
+array comparisons over the whole batch rather than a Python loop per
+reading. Rules have hysteresis: an alert opens when a value crosses the
+threshold and only clears once it comes back past ``threshold -/+
+hysteresis``. So a silo oscillating around 28°C raises one alert, not
+one per reading. Python only runs for the state transitions, which are
+rare, and they are written to ``alerts`` in the same shape as the
+hand-entered alerts.
+"""
+
+import logging
+import threading
+import time
+from uuid import uuid4
+
+import numpy as np
+
+from pymongo.errors import BulkWriteError
+
+from ingest import SENSOR_METRICS
+
+GRAINS = ["Wheat", "Rice", "Corn", "Soybean", "Sunflower", "Barley", "Mustard"]
+
+# Product-specific defaults; documents in the alert_rules collection
+# (same fields) replace these when present. "crops"/"siloIds" left out
+# means the rule applies to every silo.
+DEFAULT_RULES = [
+    {"_id": "grain-temp-warning", "crops": GRAINS, "metric": "temperature", "bound": "max",
+     "threshold": 25, "hysteresis": 1.0, "severity": "warning"},
+    {"_id": "grain-temp-critical", "crops": GRAINS, "metric": "temperature", "bound": "max",
+     "threshold": 28, "hysteresis": 1.0, "severity": "critical"},
+    {"_id": "grain-humidity-warning", "crops": GRAINS, "metric": "humidity", "bound": "max",
+     "threshold": 65, "hysteresis": 3.0, "severity": "warning"},
+    {"_id": "grain-humidity-critical", "crops": GRAINS, "metric": "humidity", "bound": "max",
+     "threshold": 75, "hysteresis": 3.0, "severity": "critical"},
+    {"_id": "apples-temp-high", "crops": ["Apples"], "metric": "temperature", "bound": "max",
+     "threshold": 4, "hysteresis": 0.5, "severity": "critical"},
+    {"_id": "apples-temp-low", "crops": ["Apples"], "metric": "temperature", "bound": "min",
+     "threshold": 0, "hysteresis": 0.5, "severity": "critical"},
+    {"_id": "potatoes-temp-high", "crops": ["Potatoes"], "metric": "temperature", "bound": "max",
+     "threshold": 10, "hysteresis": 0.5, "severity": "warning"},
+    {"_id": "potatoes-temp-low", "crops": ["Potatoes"], "metric": "temperature", "bound": "min",
+     "threshold": 4, "hysteresis": 0.5, "severity": "warning"},
+    {"_id": "co2-high", "metric": "co2", "bound": "max",
+     "threshold": 500, "hysteresis": 25, "severity": "warning"},
+]
+
+METRIC_LABELS = {
+    "temperature": ("Temperature", "°C"),
+    "humidity": ("Humidity", "%"),
+    "co2": ("CO2", " ppm"),
+}
+
+META_REFRESH_SECONDS = 60
+
+
+def _iso(epoch: float) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(epoch))
+
+
+class AlertEngine:
+    def __init__(self, get_db, publish=None):
+        self._get_db = get_db
+        self._publish = publish
+        self._lock = threading.Lock()
+        self._rules = None
+        self._silos = {}  # siloId -> {"name", "crop"}
+        self._silos_loaded_at = 0.0
+        self._open = None  # (ruleId, siloId) -> open alert _id
+
+    def _load(self):
+        database = self._get_db()
+        if self._rules is None:
+            self._rules = list(database.alert_rules.find({})) or DEFAULT_RULES
+        if self._open is None:
+            self._open = {
+                (a["ruleId"], a["siloId"]): a["_id"]
+                for a in database.alerts.find({"ruleId": {"$exists": True}, "resolved": False})
+            }
+
+    def _refresh_silos(self, silo_ids):
+        now = time.time()
+        unknown = any(s not in self._silos for s in silo_ids)
+        if unknown and now - self._silos_loaded_at > META_REFRESH_SECONDS:
+            self._silos = {
+                doc["id"]: {"name": doc.get("name", doc["id"]), "crop": doc.get("crop")}
+                for doc in self._get_db().silo_status.find({}, {"_id": 0, "id": 1, "name": 1, "crop": 1})
+                if "id" in doc
+            }
+            self._silos_loaded_at = now
+
+    def reload_rules(self):
+        with self._lock:
+            self._rules = None
+
+    def _applies(self, rule, silo_id):
+        if "siloIds" in rule:
+            return silo_id in rule["siloIds"]
+        if "crops" in rule:
+            return self._silos.get(silo_id, {}).get("crop") in rule["crops"]
+        return True
+
+    def evaluate(self, readings):
+        """Run every rule over a batch; returns (opened alerts, resolved alert ids)."""
+        if not readings:
+            return [], []
+        with self._lock:
+            self._load()
+            silo_ids = sorted({r["siloId"] for r in readings})
+            self._refresh_silos(silo_ids)
+            position = {silo_id: i for i, silo_id in enumerate(silo_ids)}
+
+            silo_idx = np.fromiter((position[r["siloId"]] for r in readings), np.int32, len(readings))
+            ts = np.fromiter((r["ts"].timestamp() for r in readings), np.float64, len(readings))
+            order = np.lexsort((ts, silo_idx))
+            silo_idx, ts = silo_idx[order], ts[order]
+            columns = {
+                m: np.fromiter((r.get(m, np.nan) for r in readings), np.float64, len(readings))[order]
+                for m in SENSOR_METRICS
+            }
+
+            opened, resolved = [], []
+            resolved_keys = {}  # alert _id -> (ruleId, siloId)
+            for rule in self._rules:
+                applies = np.fromiter((self._applies(rule, s) for s in silo_ids), bool, len(silo_ids))
+                if not applies.any():
+                    continue
+                values = columns[rule["metric"]]
+                # NaN compares False, so readings without this metric are ignored
+                with np.errstate(invalid="ignore"):
+                    if rule["bound"] == "max":
+                        breach = values > rule["threshold"]
+                        clear = values <= rule["threshold"] - rule["hysteresis"]
+                    else:
+                        breach = values < rule["threshold"]
+                        clear = values >= rule["threshold"] + rule["hysteresis"]
+                events = np.flatnonzero(applies[silo_idx] & (breach | clear))
+                if not events.size:
+                    continue
+
+                state = breach[events]
+                silos = silo_idx[events]
+                first = np.r_[True, silos[1:] != silos[:-1]]
+                was_open = np.fromiter(
+                    ((rule["_id"], silo_ids[s]) in self._open for s in silos[first]), bool, int(first.sum())
+                )
+                previous = np.empty_like(state)
+                previous[1:] = state[:-1]
+                previous[first] = was_open
+                for i in np.flatnonzero(state != previous):
+                    row = events[i]
+                    silo_id = silo_ids[silos[i]]
+                    key = (rule["_id"], silo_id)
+                    when = _iso(ts[row])
+                    if state[i]:
+                        alert = self._make_alert(rule, silo_id, float(values[row]), when)
+                        self._open[key] = alert["_id"]
+                        opened.append(alert)
+                    else:
+                        alert_id = self._open.pop(key)
+                        resolved.append((alert_id, when))
+                        resolved_keys[alert_id] = key
+
+            failed = self._write(opened, resolved)
+            if failed:
+                # Undo the transitions that were not stored, so the next
+                # reading past the threshold retries them
+                opened_ids = {a["_id"] for a in opened}
+                for alert in opened:
+                    key = (alert["ruleId"], alert["siloId"])
+                    if alert["_id"] in failed and self._open.get(key) == alert["_id"]:
+                        del self._open[key]
+                for alert_id, _ in resolved:
+                    if alert_id in failed and alert_id not in opened_ids:
+                        self._open.setdefault(resolved_keys[alert_id], alert_id)
+                opened = [a for a in opened if a["_id"] not in failed]
+                resolved = [(i, when) for i, when in resolved if i not in failed]
+
+        if self._publish is not None:
+            for alert in opened:
+                self._publish("alert", alert)
+            for alert_id, when in resolved:
+                self._publish("alert.resolved", {"_id": alert_id, "resolvedAt": when})
+        return opened, [alert_id for alert_id, _ in resolved]
+
+    def _make_alert(self, rule, silo_id, value, when):
+        label, unit = METRIC_LABELS[rule["metric"]]
+        verb = "exceeded" if rule["bound"] == "max" else "dropped below"
+        return {
+            "_id": str(uuid4()),
+            "type": label,
+            "severity": rule["severity"],
+            "location": self._silos.get(silo_id, {}).get("name", silo_id),
+            "message": f"{label} {verb} {rule['threshold']:g}{unit} threshold ({round(value, 1):g}{unit})",
+            "timestamp": when,
+            "acknowledged": False,
+            "ruleId": rule["_id"],
+            "siloId": silo_id,
+            "value": round(value, 2),
+            "resolved": False,
+        }
+
+    def _write(self, opened, resolved):
+        """Store the transitions; returns the ids of alerts whose write failed."""
+        database = self._get_db()
+        # An alert can open and clear within one batch; store it resolved
+        by_id = {a["_id"]: a for a in opened}
+        late = []
+        for alert_id, when in resolved:
+            if alert_id in by_id:
+                by_id[alert_id].update(resolved=True, resolvedAt=when)
+            else:
+                late.append((alert_id, when))
+        failed = set()
+        if opened:
+            try:
+                database.alerts.insert_many([dict(a) for a in opened], ordered=False)
+            except BulkWriteError as exc:
+                failed.update(opened[e["index"]]["_id"] for e in exc.details.get("writeErrors", []))
+                logging.warning("Could not store %d generated alerts", len(failed))
+            except Exception:
+                failed.update(a["_id"] for a in opened)
+                logging.exception("Could not store generated alerts")
+        for i, (alert_id, when) in enumerate(late):
+            try:
+                database.alerts.update_one(
+                    {"_id": alert_id}, {"$set": {"resolved": True, "resolvedAt": when}}
+                )
+            except Exception:
+                failed.update(a for a, _ in late[i:])
+                logging.exception("Could not resolve generated alerts")
+                break
+        return failed
@@ -1,26 +1,38 @@
 import os
+import json
 import jwt
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from uuid import uuid4
 from functools import wraps
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 from dotenv import load_dotenv
-from werkzeug.security import generate_password_hash, check_password_hash
-
-try:
-    from google import genai
-    from google.genai.types import HttpOptions
-except ImportError:
-    genai = None
-    HttpOptions = None
-
-from db import get_db
+from pymongo import DeleteOne, InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from alert_rules import AlertEngine
+from chat_context import ChatContext
+from chat_memory import ReplyCache, history_digest, normalize_prompt, window_history
+from dashboard_stats import DashboardStats
+from db import get_db, start_db_monitor
+from response_cache import ResponseCache
+from events import EventBroker, TooManySubscribers, format_sse
+from gemini import GeminiGateway
+from metrics import RequestMetrics
+from ingest import IngestQueueFull, SensorIngestBuffer, parse_body, parse_timestamp, validate_reading
+from passwords import HasherBusy, PasswordHasher
+from risk import RiskScorer
+from rollups import BUCKET_SIZES, MAX_POINTS, query_rollups, write_rollups
+from silo_cache import SiloStateCache
+from token_cache import TokenCache, token_key
+from streaming import export_format, stream_export
 
 load_dotenv()
 
 JWT_EXPIRY_HOURS = 72
+MAX_INGEST_BATCH = 10_000
+MAX_BULK_OPERATIONS = 10_000
 
 
 def create_app() -> Flask:
@@ -36,12 +48,81 @@ def create_app() -> Flask:
         supports_credentials=True,
     )
 
+    # Connect (or fall back) now so the first request never waits on a handshake
+    db_monitor = start_db_monitor()
+    app.extensions["db_monitor"] = db_monitor
+
+    request_metrics = RequestMetrics(slow_seconds=float(os.environ.get("SLOW_REQUEST_MS", "1000")) / 1000)
+    app.extensions["request_metrics"] = request_metrics
+    # Collection calls made through this handle are charged to the current request
+    timed_db = request_metrics.database(get_db)
+
+    password_hasher = PasswordHasher(
+        workers=int(os.environ.get("PASSWORD_HASH_WORKERS", "2")),
+        max_pending=int(os.environ.get("PASSWORD_HASH_QUEUE", "32")),
+        method=os.environ.get("PASSWORD_HASH_METHOD", "scrypt"),
+    )
+    app.extensions["password_hasher"] = password_hasher
+
+    token_cache = TokenCache(max_entries=int(os.environ.get("TOKEN_CACHE_SIZE", "10000")))
+    app.extensions["token_cache"] = token_cache
+
+    sensor_ingest = SensorIngestBuffer(
+        timed_db,
+        flush_size=int(os.environ.get("SENSOR_FLUSH_SIZE", "500")),
+        flush_interval=float(os.environ.get("SENSOR_FLUSH_INTERVAL", "2.0")),
+    )
+    sensor_ingest.add_flush_listener(lambda readings: write_rollups(timed_db(), readings))
+    app.extensions["sensor_ingest"] = sensor_ingest
+
+    silo_cache = SiloStateCache(
+        capacity=int(os.environ.get("SILO_RING_SIZE", "256")),
+        stale_after=float(os.environ.get("SILO_STALE_SECONDS", "30")),
+    )
+    app.extensions["silo_cache"] = silo_cache
+
+    event_broker = EventBroker(queue_size=int(os.environ.get("EVENT_QUEUE_SIZE", "100")))
+    app.extensions["event_broker"] = event_broker
+
+    alert_engine = AlertEngine(timed_db, publish=event_broker.publish)
+    app.extensions["alert_engine"] = alert_engine
+
+    risk_scorer = RiskScorer()
+    app.extensions["risk_scorer"] = risk_scorer
+
+    response_cache = ResponseCache(max_entries=int(os.environ.get("RESPONSE_CACHE_ENTRIES", "1024")))
+    app.extensions["response_cache"] = response_cache
+
+    dashboard_stats = DashboardStats(
+        timed_db,
+        reconcile_interval=float(os.environ.get("DASHBOARD_RECONCILE_SECONDS", "300")),
+        on_change=lambda: response_cache.invalidate("dashboard"),
+    )
+    app.extensions["dashboard_stats"] = dashboard_stats
+
+    chat_context = ChatContext(
+        timed_db,
+        load_silos=lambda: silo_cache.snapshot(lambda: timed_db().silo_status.find({}, {"_id": 0})),
+        max_chars=int(os.environ.get("CHAT_CONTEXT_CHARS", "2000")),
+        min_interval=float(os.environ.get("CHAT_CONTEXT_REFRESH_SECONDS", "30")),
+    )
+    app.extensions["chat_context"] = chat_context
+
+    def on_database_switch(_database):
+        # Everything derived from the fallback's data is rebuilt from Mongo
+        risk_scorer.built = False
+        dashboard_stats.reconcile()
+        chat_context.mark_dirty()
+        response_cache.invalidate("analytics", "consumer", "dashboard", "logistics", "silos", "warehouses")
+
+    db_monitor.add_switch_listener(on_database_switch)
+
     # --------------------
     # Helper functions
     # --------------------
 
     def db():
-        return get_db()
+        return timed_db()
 
     def make_jwt(user_id: str, role: str) -> str:
         """Generate a real signed JWT token."""
@@ -57,6 +138,31 @@ def create_app() -> Flask:
         """Decode and verify a JWT token. Raises on failure."""
         return jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
 
+    def authenticate(token: str):
+        """Verify a token and attach the user to the request.
+
+        Returns None on success, otherwise the 401 response to send.
+        Verified payloads are cached until their ``exp``.
+        """
+        key = token_key(token)
+        if token_cache.is_revoked(key):
+            return jsonify({"message": "Token has been revoked. Please log in again."}), 401
+        payload = token_cache.get(key)
+        if payload is None:
+            try:
+                payload = decode_jwt(token)
+            except jwt.ExpiredSignatureError:
+                return jsonify({"message": "Token has expired. Please log in again."}), 401
+            except jwt.InvalidTokenError:
+                return jsonify({"message": "Invalid token. Please log in again."}), 401
+            token_cache.put(key, payload)
+        request.current_token_key = key
+        request.current_token_exp = payload.get("exp", 0)
+        # Attach user info to request context
+        request.current_user_id = payload["sub"]
+        request.current_user_role = payload.get("role", "consumer")
+        return None
+
     def token_required(f):
         """Decorator to protect routes — requires a valid JWT Bearer token."""
         @wraps(f)
@@ -64,16 +170,9 @@ def create_app() -> Flask:
             auth_header = request.headers.get("Authorization", "")
             if not auth_header.startswith("Bearer "):
                 return jsonify({"message": "Authorization token missing or malformed"}), 401
-            token = auth_header.split(" ", 1)[1]
-            try:
-                payload = decode_jwt(token)
-            except jwt.ExpiredSignatureError:
-                return jsonify({"message": "Token has expired. Please log in again."}), 401
-            except jwt.InvalidTokenError:
-                return jsonify({"message": "Invalid token. Please log in again."}), 401
-            # Attach user info to request context
-            request.current_user_id = payload["sub"]
-            request.current_user_role = payload.get("role", "consumer")
+            error = authenticate(auth_header.split(" ", 1)[1])
+            if error:
+                return error
             return f(*args, **kwargs)
         return decorated
 
@@ -84,6 +183,11 @@ def create_app() -> Flask:
     # Auth routes
     # --------------------
 
+    def hasher_busy():
+        response = jsonify({"message": "Too many sign-ins right now, please retry shortly"})
+        response.headers["Retry-After"] = "1"
+        return response, 503
+
     @app.post("/api/auth/signup")
     def signup():
         data = request.get_json(force=True)
@@ -100,12 +204,17 @@ def create_app() -> Flask:
         if db().users.find_one({"email": email}):
             return jsonify({"message": "An account with this email already exists"}), 400
 
+        try:
+            password_hash = password_hasher.hash(password)
+        except HasherBusy:
+            return hasher_busy()
+
         user_id = str(uuid4())
         user = {
             "_id": user_id,
             "name": name,
             "email": email,
-            "password": generate_password_hash(password),
+            "password": password_hash,
             "role": role,
             "phone": phone,
             "address": address,
@@ -131,13 +240,31 @@ def create_app() -> Flask:
         if not user:
             return jsonify({"message": "No account found with this email"}), 404
 
-        if not check_password_hash(user["password"], password):
-            return jsonify({"message": "Incorrect password"}), 401
+        try:
+            if not password_hasher.verify(user["password"], password):
+                return jsonify({"message": "Incorrect password"}), 401
+        except HasherBusy:
+            return hasher_busy()
+        if password_hasher.needs_rehash(user["password"]):
+            # Optional upgrade; when the pool is busy it waits for the next login
+            try:
+                db().users.update_one(
+                    {"_id": user["_id"]}, {"$set": {"password": password_hasher.hash(password)}},
+                )
+            except HasherBusy:
+                pass
 
         token = make_jwt(user["_id"], user.get("role", "consumer"))
         response_user = {k: v for k, v in user.items() if k != "password"}
         return jsonify({"user": response_user, "token": token}), 200
 
+    @app.post("/api/auth/logout")
+    @token_required
+    def logout():
+        """Revoke the caller's token so it is refused until it expires."""
+        token_cache.revoke(request.current_token_key, request.current_token_exp)
+        return jsonify({"message": "Logged out"}), 200
+
     @app.get("/api/auth/me")
     @token_required
     def get_me():
@@ -152,21 +279,142 @@ def create_app() -> Flask:
     # Inventory routes
     # --------------------
 
+    INVENTORY_SORT_FIELDS = ("_id", "lastChecked", "quantity")
+    INVENTORY_PAGE_SIZE = 50
+    INVENTORY_MAX_PAGE_SIZE = 500
+
+    # CSV export columns; rows missing a field get an empty cell
+    INVENTORY_COLUMNS = (
+        "_id", "name", "category", "location", "quantity", "unit", "qualityStatus",
+        "lastChecked", "storedSince", "temperature", "humidity",
+    )
+    ALERT_COLUMNS = (
+        "_id", "type", "severity", "location", "message", "timestamp", "acknowledged",
+        "acknowledgedAt", "ruleId", "siloId", "value", "resolved", "resolvedAt",
+    )
+    WAREHOUSE_COLUMNS = (
+        "_id", "name", "location", "totalCapacity", "usedCapacity", "units",
+        "contact.phone", "contact.email", "contact.manager", "crops", "status",
+    )
+
+    def parse_fields():
+        """Turn ?fields=a,b into a projection (``_id`` is always kept)."""
+        fields = [f.strip() for f in request.args.get("fields", "").split(",") if f.strip()]
+        return {f: 1 for f in fields} if fields else None
+
     @app.get("/api/inventory")
     #@token_required
     def get_inventory():
+        """List inventory batches.
+
+        Without ``limit``/``after`` the whole (filtered) list is returned as
+        before. With either, results are keyset-paginated and wrapped as
+        ``{"items": [...], "next": <_id or null>}``; pass ``next`` back as
+        ``after`` to fetch the following page.
+        """
         category = request.args.get("category")
         query = {"category": category} if category else {}
-        items = list(db().inventory.find(query))
-        return jsonify(items), 200
 
-    @app.post("/api/inventory")
+        sort_param = request.args.get("sort", "_id")
+        direction = -1 if sort_param.startswith("-") else 1
+        sort_field = sort_param.lstrip("-")
+        if sort_field not in INVENTORY_SORT_FIELDS:
+            return jsonify({"message": f"Cannot sort inventory by '{sort_field}'"}), 400
+        order = [(sort_field, direction)]
+        if sort_field != "_id":
+            order.append(("_id", direction))
+        projection = parse_fields()
+
+        if "limit" not in request.args and "after" not in request.args:
+            # Unsorted unless asked, so exports stream in natural order
+            cursor = db().inventory.find(query, projection)
+            if "sort" in request.args:
+                cursor = cursor.sort(order)
+            fmt = export_format()
+            if fmt:
+                return stream_export(cursor, fmt, projection, filename="inventory", columns=INVENTORY_COLUMNS)
+            return jsonify(list(cursor)), 200
+
+        try:
+            limit = int(request.args.get("limit", INVENTORY_PAGE_SIZE))
+        except ValueError:
+            return jsonify({"message": "limit must be an integer"}), 400
+        limit = max(1, min(limit, INVENTORY_MAX_PAGE_SIZE))
+
+        after = request.args.get("after")
+        if after:
+            anchor = db().inventory.find_one({"_id": after}, {sort_field: 1})
+            if anchor is None:
+                return jsonify({"message": "Invalid pagination cursor"}), 400
+            past = "$gt" if direction > 0 else "$lt"
+            if sort_field == "_id":
+                query["_id"] = {past: after}
+            else:
+                # Null and missing values sort before every other value
+                value = anchor.get(sort_field)
+                if value is None:
+                    tie = {sort_field: None, "_id": {past: after}}
+                    if direction > 0:
+                        query["$or"] = [tie, {sort_field: {"$ne": None}}]
+                    else:
+                        query.update(tie)
+                elif direction > 0:
+                    # (field, _id) > anchor, written so the range on `field` can use an index
+                    query[sort_field] = {"$gte": value}
+                    query["$or"] = [{sort_field: {"$gt": value}}, {"_id": {"$gt": after}}]
+                else:
+                    query["$or"] = [
+                        {sort_field: {"$lt": value}},
+                        {sort_field: value, "_id": {"$lt": after}},
+                        {sort_field: None},
+                    ]
+
+        items = list(db().inventory.find(query, projection).sort(order).limit(limit + 1))
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            next_cursor = items[-1]["_id"]
+        return jsonify({"items": items, "next": next_cursor}), 200
+
+    RISK_FIELDS = {"name": 1, "category": 1, "location": 1, "temperature": 1,
+                   "humidity": 1, "storedSince": 1, "lastChecked": 1}
+
+    @app.get("/api/inventory/risk")
     @token_required
-    def create_inventory_item():
-        data = request.get_json(force=True)
-        item_id = str(uuid4())
-        new_item = {
-            "_id": item_id,
+    def inventory_risk():
+        """Highest spoilage-risk batches (``limit``, ``level``, ``category``) plus a summary."""
+        if not risk_scorer.built:
+            silos = db().silo_status.find({}, {"_id": 0, "id": 1, "name": 1})
+            risk_scorer.load(
+                db().inventory.find({}, RISK_FIELDS),
+                {s["id"]: s.get("name", s["id"]) for s in silos if "id" in s},
+            )
+        level = request.args.get("level")
+        if level not in (None, "low", "medium", "high"):
+            return jsonify({"message": "level must be low, medium or high"}), 400
+        try:
+            limit = max(1, min(int(request.args.get("limit", 50)), 1000))
+        except ValueError:
+            return jsonify({"message": "limit must be an integer"}), 400
+        return jsonify(risk_scorer.top(limit, level, request.args.get("category"))), 200
+
+    INVENTORY_UPDATE_FIELDS = (
+        "name", "category", "location", "quantity",
+        "unit", "qualityStatus", "temperature", "humidity",
+    )
+    NUMERIC_INVENTORY_FIELDS = ("quantity", "temperature", "humidity")
+
+    def numeric_field_error(data):
+        """Message for the first numeric inventory field holding a non-number, or None."""
+        for key in NUMERIC_INVENTORY_FIELDS:
+            value = data.get(key)
+            if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+                return f"{key} must be a number"
+        return None
+
+    def new_inventory_item(data):
+        return {
+            "_id": str(uuid4()),
             "name": data.get("name", "Unnamed Item"),
             "category": data.get("category", "Uncategorized"),
             "location": data.get("location", "Unknown"),
@@ -174,12 +422,131 @@ def create_app() -> Flask:
             "unit": data.get("unit", "tons"),
             "qualityStatus": data.get("qualityStatus", "Good"),
             "lastChecked": current_time_iso(),
+            "storedSince": data.get("storedSince") or current_time_iso(),
             "temperature": data.get("temperature", 22.0),
             "humidity": data.get("humidity", 60),
         }
+
+    def inventory_update_fields(data):
+        update_fields = {key: data[key] for key in INVENTORY_UPDATE_FIELDS if key in data}
+        update_fields["lastChecked"] = current_time_iso()
+        return update_fields
+
+    @app.post("/api/inventory")
+    @token_required
+    def create_inventory_item():
+        data = request.get_json(force=True)
+        error = numeric_field_error(data)
+        if error:
+            return jsonify({"message": error}), 400
+        new_item = new_inventory_item(data)
         db().inventory.insert_one(new_item)
+        risk_scorer.upsert(new_item)
+        dashboard_stats.inventory_changed(after=new_item)
+        chat_context.mark_dirty("inventory")
         return jsonify(new_item), 201
 
+    def bulk_operation_error(op, docs):
+        """Why a bulk operation cannot be applied, or None. ``docs`` is the planned state by _id."""
+        if not isinstance(op, dict):
+            return "Operation must be an object"
+        kind = op.get("op")
+        if kind not in ("create", "update", "delete"):
+            return "op must be create, update or delete"
+        if kind != "create":
+            if not isinstance(op.get("_id"), str):
+                return "_id is required"
+            if op["_id"] not in docs:
+                return "Item not found"
+        if kind != "delete":
+            return numeric_field_error(op)
+        return None
+
+    @app.post("/api/inventory/bulk")
+    @token_required
+    def bulk_inventory():
+        """Apply many create/update/delete operations with one bulk write.
+
+        Body: ``{"ordered": true, "operations": [{"op": "create", ...fields},
+        {"op": "update", "_id": ..., ...fields}, {"op": "delete", "_id": ...}]}``
+        (or just the list). Ordered batches stop at the first failure and
+        report the rest as skipped; unordered ones apply everything valid.
+        """
+        data = request.get_json(force=True)
+        if isinstance(data, list):
+            data = {"operations": data}
+        operations = data.get("operations") if isinstance(data, dict) else None
+        if not isinstance(operations, list) or not operations:
+            return jsonify({"message": "operations must be a non-empty list"}), 400
+        if len(operations) > MAX_BULK_OPERATIONS:
+            return jsonify({"message": f"At most {MAX_BULK_OPERATIONS} operations per request"}), 413
+        ordered = data.get("ordered", True) is not False
+
+        # One query for every document an update or delete refers to; the
+        # dict then tracks the planned state so later operations see earlier ones.
+        ids = list({op["_id"] for op in operations if isinstance(op, dict) and isinstance(op.get("_id"), str)})
+        docs = {doc["_id"]: doc for doc in db().inventory.find({"_id": {"$in": ids}})} if ids else {}
+
+        results = [None] * len(operations)
+        writes, planned = [], []
+        for index, op in enumerate(operations):
+            error = bulk_operation_error(op, docs)
+            if error:
+                results[index] = {"index": index, "status": "error", "message": error}
+                if ordered:
+                    break
+                continue
+            kind = op["op"]
+            before = docs.get(op.get("_id")) if kind != "create" else None
+            if kind == "create":
+                after = new_inventory_item(op)
+                writes.append(InsertOne(after))
+            elif kind == "update":
+                fields = inventory_update_fields(op)
+                after = dict(before, **fields)
+                writes.append(UpdateOne({"_id": before["_id"]}, {"$set": fields}))
+            else:
+                after = None
+                writes.append(DeleteOne({"_id": before["_id"]}))
+            if after is None:
+                docs.pop(before["_id"])
+            else:
+                docs[after["_id"]] = after
+            planned.append((index, kind, before, after))
+
+        failed = {}
+        if writes:
+            try:
+                db().inventory.bulk_write(writes, ordered=ordered)
+            except BulkWriteError as exc:
+                failed = {e["index"]: e.get("errmsg", "Write failed") for e in exc.details.get("writeErrors", [])}
+        stop = min(failed) if ordered and failed else None
+
+        applied = []
+        for position, (index, kind, before, after) in enumerate(planned):
+            item_id = (after or before)["_id"]
+            if position in failed:
+                results[index] = {"index": index, "status": "error", "_id": item_id, "message": failed[position]}
+            elif stop is not None and position > stop:
+                continue
+            else:
+                results[index] = {"index": index, "status": kind + "d", "_id": item_id}
+                applied.append((before, after))
+        results = [r or {"index": i, "status": "skipped"} for i, r in enumerate(results)]
+
+        if applied:
+            risk_scorer.upsert_many([after for _, after in applied if after is not None])
+            for before, after in applied:
+                if after is None:
+                    risk_scorer.remove(before["_id"])
+            dashboard_stats.inventory_changes(applied)
+            chat_context.mark_dirty("inventory")
+
+        counts = {}
+        for r in results:
+            counts[r["status"]] = counts.get(r["status"], 0) + 1
+        return jsonify({"ordered": ordered, "counts": counts, "results": results}), 200
+
     @app.get("/api/inventory/<item_id>")
     @token_required
     def get_inventory_item(item_id: str):
@@ -192,22 +559,21 @@ def create_app() -> Flask:
     @token_required
     def update_inventory_item(item_id: str):
         data = request.get_json(force=True)
-        update_fields = {}
-        for key in [
-            "name", "category", "location", "quantity",
-            "unit", "qualityStatus", "temperature", "humidity",
-        ]:
-            if key in data:
-                update_fields[key] = data[key]
-        update_fields["lastChecked"] = current_time_iso()
-
-        result = db().inventory.find_one_and_update(
+        error = numeric_field_error(data)
+        if error:
+            return jsonify({"message": error}), 400
+        update_fields = inventory_update_fields(data)
+        before = db().inventory.find_one_and_update(
             {"_id": item_id},
             {"$set": update_fields},
-            return_document=True,
+            return_document=False,
         )
-        if not result:
+        if not before:
             return jsonify({"message": "Item not found"}), 404
+        result = dict(before, **update_fields)
+        risk_scorer.upsert(result)
+        dashboard_stats.inventory_changed(before, result)
+        chat_context.mark_dirty("inventory")
         return jsonify(result), 200
 
     @app.delete("/api/inventory/<item_id>")
@@ -216,6 +582,9 @@ def create_app() -> Flask:
         deleted = db().inventory.find_one_and_delete({"_id": item_id})
         if not deleted:
             return jsonify({"message": "Item not found"}), 404
+        risk_scorer.remove(item_id)
+        dashboard_stats.inventory_changed(before=deleted)
+        chat_context.mark_dirty("inventory")
         return jsonify({"deleted": deleted}), 200
 
     # --------------------
@@ -224,30 +593,40 @@ def create_app() -> Flask:
 
     @app.get("/api/analytics/dashboard")
     @token_required
+    @response_cache.cached(ttl=10, tags=("dashboard",))
     def analytics_dashboard():
-        doc = db().dashboard_stats.find_one({"_id": "current"}, {"_id": 0})
-        return jsonify(doc or {}), 200
+        return jsonify(dashboard_stats.read()), 200
+
+    @app.post("/api/analytics/dashboard/reconcile")
+    @token_required
+    def analytics_dashboard_reconcile():
+        """Recount the dashboard figures now and report any drift corrected."""
+        return jsonify({"drift": dashboard_stats.reconcile()}), 200
 
     @app.get("/api/analytics/trends")
     @token_required
+    @response_cache.cached(ttl=300, tags=("analytics",))
     def analytics_trends():
         doc = db().analytics.find_one({"_id": "current"}, {"_id": 0})
         return jsonify((doc or {}).get("storageTrends", [])), 200
 
     @app.get("/api/analytics/loss")
     @token_required
+    @response_cache.cached(ttl=300, tags=("analytics",))
     def analytics_loss():
         doc = db().analytics.find_one({"_id": "current"}, {"_id": 0})
         return jsonify((doc or {}).get("lossAnalysis", [])), 200
 
     @app.get("/api/analytics/consumer")
     @token_required
+    @response_cache.cached(ttl=300, tags=("consumer",))
     def analytics_consumer():
         doc = db().consumer_data.find_one({"_id": "current"}, {"_id": 0})
         return jsonify((doc or {}).get("stats", {})), 200
 
     @app.get("/api/analytics/full")
     @token_required
+    @response_cache.cached(ttl=300, tags=("analytics",))
     def analytics_full():
         doc = db().analytics.find_one({"_id": "current"}, {"_id": 0})
         return jsonify(doc or {}), 200
@@ -258,6 +637,7 @@ def create_app() -> Flask:
 
     @app.get("/api/consumer")
     @token_required
+    @response_cache.cached(ttl=300, tags=("consumer",))
     def consumer_data():
         doc = db().consumer_data.find_one({"_id": "current"}, {"_id": 0})
         return jsonify(doc or {}), 200
@@ -269,48 +649,192 @@ def create_app() -> Flask:
     @app.get("/api/sensors/readings")
     @token_required
     def sensor_readings():
-        doc = db().sensor_readings.find_one({"_id": "current"}, {"_id": 0})
-        return jsonify(doc or {}), 200
+        """Sensor history.
+
+        With no parameters this is the static weekly summary. With any of
+        ``silo`` (comma separated), ``from``, ``to`` or ``bucket``
+        (1m/5m/15m/1h/6h/1d) it returns min/avg/max per bucket from the
+        rollup tiers. The window defaults to the last 7 days at 1h.
+        """
+        if not any(k in request.args for k in ("silo", "from", "to", "bucket")):
+            doc = db().sensor_readings.find_one({"_id": "current"}, {"_id": 0})
+            return jsonify(doc or {}), 200
+
+        bucket = request.args.get("bucket", "1h")
+        if bucket not in BUCKET_SIZES:
+            return jsonify({"message": f"bucket must be one of {', '.join(BUCKET_SIZES)}"}), 400
+        try:
+            end = parse_timestamp(request.args["to"]) if "to" in request.args else datetime.now(timezone.utc)
+            start = parse_timestamp(request.args["from"]) if "from" in request.args else end - timedelta(days=7)
+        except ValueError as exc:
+            return jsonify({"message": str(exc)}), 400
+        if start >= end:
+            return jsonify({"message": "'from' must be before 'to'"}), 400
+        if (end - start).total_seconds() / BUCKET_SIZES[bucket] > MAX_POINTS:
+            return jsonify({"message": f"Range too large for {bucket} buckets; use a coarser bucket"}), 400
+
+        silos = [s for s in request.args.get("silo", "").split(",") if s]
+        series = query_rollups(db(), silos, start, end, BUCKET_SIZES[bucket])
+        return jsonify(series), 200
 
     @app.get("/api/sensors/alerts")
     @token_required
     def sensor_alerts():
         severity = request.args.get("severity")
         query = {"severity": severity} if severity else {}
-        alerts = list(db().alerts.find(query))
+        projection = parse_fields()
+        fmt = export_format()
+        if fmt:
+            return stream_export(db().alerts.find(query, projection), fmt, projection, filename="alerts", columns=ALERT_COLUMNS)
+        alerts = list(db().alerts.find(query, projection))
         return jsonify(alerts), 200
 
     @app.get("/api/sensors/silos")
     @token_required
+    @response_cache.cached(ttl=5, tags=("silos",))
     def sensor_silos():
-        silos = list(db().silo_status.find({}, {"_id": 0}))
+        silos = silo_cache.snapshot(lambda: db().silo_status.find({}, {"_id": 0}))
         return jsonify(silos), 200
 
+    @app.get("/api/sensors/silos/cache")
+    @token_required
+    def sensor_silos_cache():
+        return jsonify(silo_cache.memory_usage()), 200
+
+    @app.post("/api/sensors/ingest")
+    @token_required
+    def sensor_ingest_batch():
+        """Queue a batch of readings (JSON array/object or NDJSON) for storage."""
+        try:
+            raw = parse_body(request.get_data(), request.mimetype)
+        except (ValueError, UnicodeDecodeError) as exc:
+            return jsonify({"message": f"Could not parse readings: {exc}"}), 400
+        if len(raw) > MAX_INGEST_BATCH:
+            return jsonify({"message": f"At most {MAX_INGEST_BATCH} readings per request"}), 413
+
+        readings, rejected = [], []
+        for i, item in enumerate(raw):
+            try:
+                readings.append(validate_reading(item))
+            except ValueError as exc:
+                rejected.append({"index": i, "error": str(exc)})
+
+        try:
+            queued = sensor_ingest.submit(readings)
+        except IngestQueueFull as exc:
+            return jsonify({"message": str(exc)}), 503
+        silo_cache.record(readings)
+        response_cache.invalidate("silos")
+        for silo_id in {r["siloId"] for r in readings}:
+            event_broker.publish("silo", silo_cache.latest(silo_id))
+        opened, resolved = alert_engine.evaluate(readings)
+        dashboard_stats.alerts_opened(opened)
+        risk_scorer.apply_readings(readings)
+        chat_context.mark_dirty("silos", *(("alerts",) if opened or resolved else ()))
+        return jsonify({
+            "accepted": len(readings),
+            "rejected": rejected,
+            "queued": queued,
+            "alertsOpened": len(opened),
+            "alertsResolved": len(resolved),
+            "flushSize": sensor_ingest.flush_size,
+            "flushInterval": sensor_ingest.flush_interval,
+        }), 202
+
+    @app.get("/api/sensors/ingest/stats")
+    @token_required
+    def sensor_ingest_stats():
+        return jsonify(sensor_ingest.stats()), 200
+
     @app.put("/api/sensors/alerts/<alert_id>/acknowledge")
     @token_required
     def acknowledge_alert(alert_id: str):
-        result = db().alerts.update_one(
+        acknowledged_at = current_time_iso()
+        update = {"acknowledged": True, "acknowledgedAt": acknowledged_at}
+        before = db().alerts.find_one_and_update(
             {"_id": alert_id},
-            {"$set": {"acknowledged": True, "acknowledgedAt": current_time_iso()}},
+            {"$set": update},
+            return_document=False,
         )
-        if result.matched_count == 0:
+        if not before:
             return jsonify({"message": "Alert not found"}), 404
+        dashboard_stats.alert_changed(before, dict(before, **update))
+        chat_context.mark_dirty("alerts")
+        event_broker.publish("alert.acknowledged", {
+            "_id": alert_id,
+            "acknowledgedAt": acknowledged_at,
+            "acknowledgedBy": request.current_user_id,
+        })
         return jsonify({"message": "Alert acknowledged"}), 200
 
+    # --------------------
+    # Live event stream
+    # --------------------
+
+    @app.get("/api/stream/events")
+    def stream_events():
+        """Server-sent events: ``alert``, ``alert.acknowledged`` and ``silo``.
+
+        EventSource cannot send headers, so the token may also be passed
+        as ``?token=``.
+        """
+        auth_header = request.headers.get("Authorization", "")
+        token = auth_header.split(" ", 1)[1] if auth_header.startswith("Bearer ") else request.args.get("token")
+        if not token:
+            return jsonify({"message": "Authorization token missing or malformed"}), 401
+        error = authenticate(token)
+        if error:
+            return error
+        try:
+            subscription = event_broker.subscribe()
+        except TooManySubscribers as exc:
+            return jsonify({"message": str(exc)}), 503
+
+        def generate():
+            try:
+                yield "retry: 5000\n\n"
+                while True:
+                    messages = subscription.drain(timeout=15)
+                    yield "".join(messages) if messages else ": keep-alive\n\n"
+            finally:
+                event_broker.unsubscribe(subscription)
+
+        return Response(
+            generate(),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    @app.get("/api/cache/stats")
+    @token_required
+    def cache_stats():
+        return jsonify(response_cache.stats()), 200
+
+    @app.get("/api/stream/stats")
+    @token_required
+    def stream_stats():
+        return jsonify(event_broker.stats()), 200
+
     # --------------------
     # Logistics & directory
     # --------------------
 
     @app.get("/api/logistics")
     @token_required
+    @response_cache.cached(ttl=300, tags=("logistics",))
     def logistics():
         doc = db().logistics.find_one({"_id": "current"}, {"_id": 0})
         return jsonify(doc or {}), 200
 
     @app.get("/api/warehouses")
     @token_required
+    @response_cache.cached(ttl=300, tags=("warehouses",))
     def warehouses():
-        items = list(db().warehouses.find({}))
+        projection = parse_fields()
+        fmt = export_format()
+        if fmt:
+            return stream_export(db().warehouses.find({}, projection), fmt, projection, filename="warehouses", columns=WAREHOUSE_COLUMNS)
+        items = list(db().warehouses.find({}, projection))
         return jsonify(items), 200
 
     # --------------------
@@ -325,20 +849,20 @@ def create_app() -> Flask:
 - General agricultural storage knowledge
 Keep responses concise and helpful. Use bullet points when listing multiple items."""
 
-    def build_gemini_client():
-        api_key = os.environ.get("GOOGLE_API_KEY") or os.environ.get("GEMINI_API_KEY")
-        if not api_key or genai is None:
-            return None
-        if HttpOptions is not None:
-            http_options = HttpOptions(api_version="v1")
-            return genai.Client(api_key=api_key, http_options=http_options)
-        return genai.Client(api_key=api_key)
+    gemini = GeminiGateway(model=os.environ.get("GEMINI_MODEL", "gemini-2.5-flash"))
+    app.extensions["gemini"] = gemini
+    reply_cache = ReplyCache(
+        max_entries=int(os.environ.get("CHAT_CACHE_SIZE", "512")),
+        ttl=float(os.environ.get("CHAT_CACHE_TTL", "600")),
+    )
+    app.extensions["reply_cache"] = reply_cache
+    history_budget = int(os.environ.get("CHAT_HISTORY_TOKENS", "2000"))
+    summary_budget = int(os.environ.get("CHAT_SUMMARY_TOKENS", "300"))
 
     @app.post("/api/chat")
     @token_required
     def chat():
-        client = build_gemini_client()
-        if client is None:
+        if gemini.client is None:
             return (
                 jsonify({"message": "Gemini client is not configured. Install 'google-genai' and set GOOGLE_API_KEY or GEMINI_API_KEY."}),
                 500,
@@ -351,50 +875,125 @@ Keep responses concise and helpful. Use bullet points when listing multiple item
         if not message:
             return jsonify({"message": "Message is required"}), 400
 
+        kept, summary, dropped = window_history(history, history_budget, summary_budget)
+        snapshot, snapshot_digest = chat_context.current()
+        system_prompt = SYSTEM_PROMPT
+        if snapshot:
+            system_prompt += f"\n\nCurrent warehouse data (use it for questions about stock, silos, alerts or shipments):\n{snapshot}"
+        if summary:
+            system_prompt += f"\n\n{summary}"
         contents = []
-        for msg in history:
+        for msg in kept:
             role = "user" if msg.get("role") == "user" else "model"
             contents.append({"role": role, "parts": [{"text": msg.get("content", "")}]})
         contents.append({"role": "user", "parts": [{"text": message}]})
+        if dropped:
+            trimmed = sum(len(msg.get("content", "").encode("utf-8")) for msg in history[:dropped])
+            reply_cache.record_window(dropped, trimmed - len(summary.encode("utf-8")))
+
+        streaming = request.args.get("stream") in ("1", "true")
+        # Keyed on the snapshot and the history sent, so data changes or a
+        # different conversation never serve a stale answer
+        cache_key = f"{snapshot_digest}:{history_digest(kept, summary)}:{normalize_prompt(message)}"
+        request_bytes = len(json.dumps(contents).encode("utf-8")) + len(system_prompt.encode("utf-8"))
+        cached = reply_cache.get(cache_key, request_bytes)
+        if cached is not None:
+            if streaming:
+                events = format_sse(1, "token", {"text": cached}) + format_sse(2, "done", {"reply": cached, "cached": True})
+                return Response(events, mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+            return jsonify({"reply": cached, "cached": True}), 200
+
+        if streaming:
+            def generate():
+                parts = []
+                try:
+                    for text in gemini.stream(contents, system_prompt):
+                        parts.append(text)
+                        yield format_sse(len(parts), "token", {"text": text})
+                except Exception as exc:
+                    yield format_sse(len(parts) + 1, "error", {"message": f"Error calling Gemini API: {exc}"})
+                    return
+                if not parts:
+                    yield format_sse(1, "error", {"message": "No text response from Gemini."})
+                    return
+                reply = "".join(parts)
+                reply_cache.put(cache_key, reply)
+                yield format_sse(len(parts) + 1, "done", {"reply": reply})
+
+            return Response(
+                generate(),
+                mimetype="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            )
 
         try:
-            response = client.models.generate_content(
-                model="gemini-2.5-flash",
-                contents=contents,
-                system_instruction={"parts": [{"text": SYSTEM_PROMPT}]},
-                generation_config={"temperature": 0.7, "max_output_tokens": 1024},
-            )
+            text = gemini.generate(contents, system_prompt)
         except Exception as exc:
             return jsonify({"message": f"Error calling Gemini API: {exc}"}), 500
 
-        text = getattr(response, "text", None)
-        if not text:
-            try:
-                candidates = getattr(response, "candidates", None) or []
-                if candidates and getattr(candidates[0], "content", None):
-                    parts = getattr(candidates[0].content, "parts", None) or []
-                    if parts and getattr(parts[0], "text", None):
-                        text = parts[0].text
-            except Exception:
-                text = None
-
         if not text:
             return jsonify({"message": "No text response from Gemini."}), 500
 
+        reply_cache.put(cache_key, text)
         return jsonify({"reply": text}), 200
 
+    @app.get("/api/chat/stats")
+    @token_required
+    def chat_stats():
+        return jsonify(dict(reply_cache.stats(), context=chat_context.stats())), 200
+
+    # --------------------
+    # Request metrics
+    # --------------------
+
+    @app.before_request
+    def start_request_timer():
+        request_metrics.begin()
+
+    @app.after_request
+    def record_request_metrics(response):
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        request_metrics.end(
+            route,
+            request.method,
+            response.status_code,
+            response.content_length or 0,
+            request.args,
+        )
+        return response
+
+    @app.get("/api/metrics")
+    @token_required
+    def metrics():
+        monitor = db_monitor.stats()
+        gauges = [
+            ("db_backend", "Active database backend.", {"backend": monitor["backend"]}, 1),
+            ("db_reachable", "Whether the last MongoDB ping succeeded.", {}, int(monitor["reachable"])),
+        ]
+        for field, value in monitor["pool"].items():
+            gauges.append(("db_pool", "MongoDB connection pool counters.", {"field": field}, value))
+        return Response(request_metrics.render(gauges), mimetype="text/plain; version=0.0.4")
+
     # --------------------
     # Health check (public)
     # --------------------
 
     @app.get("/api/health")
     def health():
-        try:
-            db().command("ping")
-            db_status = "connected"
-        except Exception:
-            db_status = "disconnected"
-        return jsonify({"status": "ok", "time": current_time_iso(), "database": db_status}), 200
+        # Reports the monitor's last check instead of pinging inline
+        connected = db_monitor.backend == "mock" or db_monitor.reachable
+        return jsonify({
+            "status": "ok",
+            "time": current_time_iso(),
+            "database": "connected" if connected else "disconnected",
+            "backend": db_monitor.backend,
+        }), 200
+
+    @app.get("/api/health/monitor")
+    @token_required
+    def health_monitor():
+        """Last ping, pool counters and fallback stats of the database monitor."""
+        return jsonify(db_monitor.stats()), 200
 
     return app
 
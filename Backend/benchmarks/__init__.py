@@ -0,0 +1 @@
+"""Benchmarks for the AgroVault backend; run modules with ``python -m``."""
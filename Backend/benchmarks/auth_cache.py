@@ -0,0 +1,68 @@
+"""Benchmark authenticated requests with and without the token cache.
+
+Usage (from Backend/):
+    python -m benchmarks.auth_cache [--requests 4000] [--threads 8]
+
+Signs up one user, then has several threads hammer GET /api/auth/me
+with the same bearer token through the Flask test client. Runs once
+with TOKEN_CACHE_SIZE=0 (every request verifies the signature) and
+once with the cache on, and prints throughput and latency percentiles.
+"""
+
+import argparse
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from app import create_app
+
+
+def percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+def run(cache_size, total, threads):
+    os.environ["TOKEN_CACHE_SIZE"] = str(cache_size)
+    app = create_app()
+    client = app.test_client()
+    email = f"bench-{uuid.uuid4().hex[:8]}@example.com"
+    res = client.post("/api/auth/signup", json={"name": "Bench", "email": email, "password": "bench-pass"})
+    headers = {"Authorization": f"Bearer {res.get_json()['token']}"}
+
+    def worker(count):
+        local = app.test_client()
+        latencies = []
+        for _ in range(count):
+            start = time.perf_counter()
+            assert local.get("/api/auth/me", headers=headers).status_code == 200
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    per_thread = total // threads
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        latencies = sorted(l for batch in pool.map(worker, [per_thread] * threads) for l in batch)
+    elapsed = time.perf_counter() - start
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": percentile(latencies, 50) * 1000,
+        "p99": percentile(latencies, 99) * 1000,
+        "stats": app.extensions["token_cache"].stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    for label, size in (("cache off", 0), ("cache on", 10_000)):
+        result = run(size, args.requests, args.threads)
+        print(f"{label:10} {result['rps']:8.0f} req/s   p50 {result['p50']:6.2f} ms   "
+              f"p99 {result['p99']:6.2f} ms   {result['stats']}")
+
+
+if __name__ == "__main__":
+    main()
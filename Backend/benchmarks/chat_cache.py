@@ -0,0 +1,62 @@
+"""Upstream payload size and reply-cache hit rate for /api/chat.
+
+Usage (from Backend/):
+    python -m benchmarks.chat_cache [--turns 60]
+
+Plays a long offline conversation against ``StubGeminiClient`` and
+prints the request size the stub received as the history grows. Every
+third turn another user opens a fresh chat with a common (rephrased)
+question; with no history those are the requests the reply cache can
+serve, so the closing counters show its hit rate. Sensor readings with
+small jitter are ingested between turns, as a live deployment would.
+"""
+
+import argparse
+import json
+import os
+import time
+import uuid
+
+from app import create_app
+from benchmarks.gemini_stub import StubGeminiClient
+
+REPEATS = ["What's the humidity in Silo B?", "what is the humidity in silo b", "Best temp for potatoes?",
+           "best temp for potatoes please"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=60)
+    args = parser.parse_args()
+
+    # Rebuild the chat context on every request, so each ingest reaches the digest
+    os.environ.setdefault("CHAT_CONTEXT_REFRESH_SECONDS", "0")
+    app = create_app()
+    stub = StubGeminiClient(first_token_delay=0, token_delay=0, reply_words=80)
+    app.extensions["gemini"].use(stub)
+    client = app.test_client()
+    email = f"cache-{uuid.uuid4().hex[:8]}@example.com"
+    res = client.post("/api/auth/signup", json={"name": "Cache", "email": email, "password": "cache-pass"})
+    headers = {"Authorization": f"Bearer {res.get_json()['token']}"}
+
+    history = []
+    for turn in range(args.turns):
+        reading = {"siloId": "silo-b", "ts": time.time(), "temperature": 18 + turn % 5 * 0.1, "humidity": 62.2}
+        client.post("/api/sensors/ingest", json=[reading], headers=headers)
+        if turn % 3 == 0:
+            message = REPEATS[turn // 3 % len(REPEATS)]
+            client.post("/api/chat", json={"message": message, "history": []}, headers=headers)
+        else:
+            message = f"Question {turn} about stock level of lot {turn}?"
+            body = {"message": message, "history": history}
+            reply = client.post("/api/chat", json=body, headers=headers).get_json()["reply"]
+            history += [{"role": "user", "content": message}, {"role": "assistant", "content": reply}]
+        if (turn + 1) % 10 == 0 and stub.last_request:
+            sent = len(json.dumps(stub.last_request, default=str))
+            print(f"turn {turn + 1:4}: history {len(json.dumps(history)):7,} B, last upstream request {sent:6,} B")
+
+    print(client.get("/api/chat/stats", headers=headers).get_json())
+
+
+if __name__ == "__main__":
+    main()
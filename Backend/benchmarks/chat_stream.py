@@ -0,0 +1,61 @@
+"""Time-to-first-token for /api/chat, buffered vs ``?stream=1``.
+
+Usage (from Backend/):
+    python -m benchmarks.chat_stream [--turns 5] [--first-token 0.3] [--token-delay 0.02]
+
+Runs entirely offline: the shared Gemini client is replaced with
+``StubGeminiClient``, which sleeps to imitate model latency.
+"""
+
+import argparse
+import time
+import uuid
+
+from app import create_app
+from benchmarks.gemini_stub import StubGeminiClient
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--first-token", type=float, default=0.3)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    args = parser.parse_args()
+
+    app = create_app()
+    stub = StubGeminiClient(first_token_delay=args.first_token, token_delay=args.token_delay)
+    app.extensions["gemini"].use(stub)
+    client = app.test_client()
+    email = f"chat-{uuid.uuid4().hex[:8]}@example.com"
+    res = client.post("/api/auth/signup", json={"name": "Chat", "email": email, "password": "chat-pass"})
+    headers = {"Authorization": f"Bearer {res.get_json()['token']}"}
+    buffered, first, total = [], [], []
+    for turn in range(args.turns):
+        # A fresh question per call, so neither mode is answered from the reply cache
+        body = {"message": f"What is the humidity in Silo B? (turn {turn} buffered)", "history": []}
+        start = time.perf_counter()
+        assert client.post("/api/chat", json=body, headers=headers).status_code == 200
+        buffered.append(time.perf_counter() - start)
+
+        body = {"message": f"What is the humidity in Silo B? (turn {turn} streamed)", "history": []}
+        start = time.perf_counter()
+        response = client.post("/api/chat?stream=1", json=body, headers=headers, buffered=False)
+        chunks = response.iter_encoded()
+        assert b"event: token" in next(chunks)
+        first.append(time.perf_counter() - start)
+        tail = b"".join(chunks)
+        assert b"event: done" in tail
+        total.append(time.perf_counter() - start)
+        response.close()
+
+    def avg(values):
+        return sum(values) / len(values) * 1000
+
+    print(f"buffered reply:        {avg(buffered):7.0f} ms to first byte")
+    print(f"stream first token:    {avg(first):7.0f} ms")
+    print(f"stream full reply:     {avg(total):7.0f} ms")
+    print(f"upstream calls:        {stub.calls}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Offline stand-in for ``genai.Client``.
+
+Mimics ``client.models.generate_content`` and
+``client.models.generate_content_stream`` with configurable latency, so
+the chat route can be driven without network access or an API key:
+
+    app.extensions["gemini"].use(StubGeminiClient())
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+
+
+class _Models:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def _reply(self, contents):
+        last = contents[-1]["parts"][0]["text"] if contents else ""
+        words = self._owner.reply_words
+        return [f"word{i} " for i in range(words - 1)] + [f"(re: {last[:40]})"]
+
+    def generate_content(self, model, contents, config=None):
+        self._owner.record(contents, config)
+        tokens = self._reply(contents)
+        time.sleep(self._owner.first_token_delay + self._owner.token_delay * len(tokens))
+        return SimpleNamespace(text="".join(tokens), candidates=[])
+
+    def generate_content_stream(self, model, contents, config=None):
+        self._owner.record(contents, config)
+        time.sleep(self._owner.first_token_delay)
+        for token in self._reply(contents):
+            yield SimpleNamespace(text=token, candidates=[])
+            time.sleep(self._owner.token_delay)
+
+
+class StubGeminiClient:
+    def __init__(self, first_token_delay=0.3, token_delay=0.02, reply_words=60):
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.reply_words = reply_words
+        self.calls = 0
+        self.last_request = None
+        self._lock = threading.Lock()
+        self.models = _Models(self)
+
+    def record(self, contents, config):
+        with self._lock:
+            self.calls += 1
+            self.last_request = {"contents": contents, "config": config}
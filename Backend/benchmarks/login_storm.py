@@ -0,0 +1,101 @@
+"""Load test: /api/inventory latency while a login storm is running.
+
+Usage (from Backend/):
+    python -m benchmarks.login_storm [--logins 16] [--seconds 5]
+
+Starts the app on a local threaded HTTP server and measures
+GET /api/inventory latency on its own, then again while ``--logins``
+threads log in back to back. Runs once with hashing inline on request
+threads (PASSWORD_HASH_WORKERS=0) and once on the process pool, so the
+two p99 figures can be compared.
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import os
+import threading
+import time
+
+from werkzeug.serving import make_server
+
+
+def request(port, method, path, body=None, headers=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    payload = json.dumps(body) if body is not None else None
+    conn.request(method, path, payload, {"Content-Type": "application/json", **(headers or {})})
+    response = conn.getresponse()
+    data = response.read()
+    conn.close()
+    return response.status, data
+
+
+def percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+def probe(port, headers, seconds):
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        request(port, "GET", "/api/inventory", headers=headers)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return percentile(latencies, 50) * 1000, percentile(latencies, 99) * 1000
+
+
+def run(workers, logins, seconds):
+    os.environ["PASSWORD_HASH_WORKERS"] = str(workers)
+    from app import create_app
+
+    app = create_app()
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    port = server.server_port
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    email = f"storm-{workers}@example.com"
+    credentials = {"email": email, "password": "storm-pass"}
+    _, body = request(port, "POST", "/api/auth/signup", {"name": "Storm", **credentials})
+    headers = {"Authorization": f"Bearer {json.loads(body)['token']}"}
+
+    quiet = probe(port, headers, seconds)
+
+    stop = threading.Event()
+    statuses = {}
+
+    def storm():
+        while not stop.is_set():
+            status, _ = request(port, "POST", "/api/auth/login", credentials)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    threads = [threading.Thread(target=storm) for _ in range(logins)]
+    for thread in threads:
+        thread.start()
+    busy = probe(port, headers, seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    server.shutdown()
+    app.extensions["password_hasher"].shutdown()
+    return quiet, busy, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    for label, workers in (("inline", 0), (f"pool x{args.workers}", args.workers)):
+        (q50, q99), (b50, b99), statuses = run(workers, args.logins, args.seconds)
+        print(f"{label:8} quiet p50 {q50:6.1f} ms p99 {q99:6.1f} ms | "
+              f"storm p50 {b50:6.1f} ms p99 {b99:6.1f} ms | logins {statuses}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Multi-threaded stress test for MockDB.
+
+Usage (from Backend/):
+    python -m benchmarks.mockdb_stress [--threads 8] [--seconds 5]
+
+Runs writer threads (inserts, $inc read-modify-writes, deletes, bulk
+writes) against reader threads (indexed point and range queries, sorted
+scans) on one collection, then checks that:
+
+* no operation raised,
+* every $inc landed (counters equal the number of increments issued),
+* every index agrees with a full scan.
+
+Thread switches are forced every 10 µs so interleavings that would be
+rare in production show up within seconds. It also prints read throughput with 1 and N reader threads, with no
+writers running.
+"""
+
+import argparse
+import random
+import sys
+import threading
+import time
+
+from pymongo import InsertOne, UpdateOne
+
+from db import MockDB
+
+COUNTERS = 4
+
+
+def setup(db, docs):
+    inventory = db.inventory
+    inventory.create_index("category")
+    inventory.create_index([("quantity", 1), ("_id", 1)])
+    inventory.insert_many([
+        {"_id": f"seed-{i}", "category": f"c{i % 10}", "quantity": i % 1000} for i in range(docs)
+    ])
+    db.counters.insert_many([{"_id": f"k{i}", "n": 0} for i in range(COUNTERS)])
+
+
+def run_threads(targets, seconds):
+    stop = threading.Event()
+    errors, counts = [], {}
+
+    def loop(name, fn):
+        rng = random.Random(name)
+        done = 0
+        try:
+            while not stop.is_set():
+                fn(rng)
+                done += 1
+        except Exception as exc:  # noqa: BLE001 - report everything
+            errors.append(f"{name}: {exc!r}")
+        counts[name] = done
+
+    threads = [threading.Thread(target=loop, args=(name, fn)) for name, fn in targets]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return counts, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--docs", type=int, default=20_000)
+    args = parser.parse_args()
+    # Switch threads far more often than the 5 ms default so races surface
+    sys.setswitchinterval(1e-5)
+
+    db = MockDB()
+    setup(db, args.docs)
+    increments = [0] * COUNTERS
+    inc_lock = threading.Lock()
+    serial = iter(range(10**12))
+
+    def insert(rng):
+        db.inventory.insert_one({"_id": f"w-{next(serial)}", "category": f"c{rng.randrange(10)}",
+                                 "quantity": rng.randrange(1000)})
+
+    def increment(rng):
+        k = rng.randrange(COUNTERS)
+        db.counters.find_one_and_update({"_id": f"k{k}"}, {"$inc": {"n": 1}})
+        with inc_lock:
+            increments[k] += 1
+
+    def delete(rng):
+        db.inventory.delete_many({"category": f"c{rng.randrange(10)}", "quantity": rng.randrange(1000)})
+
+    def bulk(rng):
+        db.inventory.bulk_write([
+            InsertOne({"_id": f"b-{next(serial)}", "category": "bulk", "quantity": rng.randrange(1000)}),
+            UpdateOne({"category": f"c{rng.randrange(10)}"}, {"$set": {"quantity": rng.randrange(1000)}}),
+        ], ordered=False)
+
+    def point(rng):
+        db.inventory.find_one({"category": f"c{rng.randrange(10)}"})
+
+    def range_query(rng):
+        low = rng.randrange(1000)
+        list(db.inventory.find({"quantity": {"$gte": low, "$lt": low + 5}}))
+
+    def sorted_scan(rng):
+        list(db.inventory.find({}).sort("quantity", -1).limit(20))
+
+    readers = [point, range_query, sorted_scan]
+    writers = [insert, increment, delete, bulk]
+    targets = [(f"{fn.__name__}-{i}", fn) for i, fn in enumerate(writers * max(1, args.threads // 4))]
+    targets += [(f"{fn.__name__}-r{i}", fn) for i, fn in enumerate(readers * max(1, args.threads // 3))]
+    counts, errors = run_threads(targets, args.seconds)
+
+    print(f"operations: {sum(counts.values()):,} across {len(targets)} threads")
+    stored = {doc["_id"]: doc["n"] for doc in db.counters.find({})}
+    lost = sum(increments) - sum(stored.values())
+    print(f"$inc issued {sum(increments):,}, applied {sum(stored.values()):,} (lost {lost})")
+
+    docs = list(db.inventory.find({}))
+    mismatched = 0
+    for c in [f"c{i}" for i in range(10)] + ["bulk"]:
+        mismatched += len(list(db.inventory.find({"category": c}))) != sum(d["category"] == c for d in docs)
+    for low in range(0, 1000, 97):
+        indexed = {d["_id"] for d in db.inventory.find({"quantity": {"$gte": low, "$lt": low + 50}})}
+        scanned = {d["_id"] for d in docs if low <= d["quantity"] < low + 50}
+        mismatched += indexed != scanned
+    print(f"index checks failed: {mismatched}")
+    print(f"errors: {len(errors)}", *errors[:5], sep="\n  ")
+
+    for n in (1, args.threads):
+        counts, _ = run_threads([(f"r{i}", range_query) for i in range(n)], args.seconds / 2)
+        print(f"read-only, {n} thread(s): {sum(counts.values()) / (args.seconds / 2):,.0f} range queries/s")
+
+    if errors or lost or mismatched:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
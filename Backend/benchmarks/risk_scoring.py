@@ -0,0 +1,64 @@
+"""Benchmark the vectorized spoilage risk scorer.
+
+Usage (from Backend/):
+    python -m benchmarks.risk_scoring [--batches 1000000]
+
+Loads synthetic batch columns straight into a RiskScorer, then times a
+full rescore, a top-50 query and single-batch incremental updates.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from risk import CATEGORY_PROFILES, RiskScorer
+
+
+def build(scorer, n, rng):
+    """Fill the scorer's columns directly; going through dicts would time the loader."""
+    scorer._allocate(n)
+    scorer._size = n
+    scorer.temperature[:n] = rng.normal(20, 6, n)
+    scorer.humidity[:n] = rng.normal(65, 12, n)
+    scorer.stored[:n] = time.time() - rng.uniform(0, 400, n) * 86400
+    scorer.category[:n] = rng.integers(0, len(CATEGORY_PROFILES) + 1, n)
+    scorer._ids = [str(i) for i in range(n)]
+    scorer._row = {str(i): i for i in range(n)}
+    scorer._meta = [("batch", None, "Silo A")] * n
+    scorer.built = True
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batches", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    scorer = RiskScorer()
+    build(scorer, args.batches, rng)
+
+    full = best_of(scorer.score_all, args.repeat)
+    top = best_of(lambda: scorer.top(50), args.repeat)
+    doc = {"_id": "0", "name": "batch", "category": "Grains", "location": "Silo A",
+           "temperature": 30.0, "humidity": 70, "storedSince": "2026-01-01T00:00:00Z"}
+    upsert = best_of(lambda: scorer.upsert(doc), args.repeat * 20)
+
+    print(f"batches:           {args.batches:,}")
+    print(f"full rescore:      {full * 1000:8.1f} ms")
+    print(f"top-50 + summary:  {top * 1000:8.1f} ms")
+    print(f"single upsert:     {upsert * 1e6:8.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
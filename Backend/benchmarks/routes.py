@@ -0,0 +1,632 @@
+"""Load test every route in create_app(), with JSON baselines and regression checks.
+
+Usage (from Backend/):
+    python -m benchmarks.routes [--backend all|mock|mongo] [--mode both|client|http]
+        [--scale 0.05] [--days 7] [--requests 200] [--concurrency 8] [--repeat 1] [--only inventory]
+        [--save baseline.json] [--compare baseline.json] [--tolerance 0.25]
+
+Seeds the demo singletons plus synthetic data at ``--scale`` (see
+synthetic.py), then runs one scenario per route, or more where a route
+has distinct modes. Each scenario is driven by ``--concurrency`` threads,
+first through the Flask test client and then over HTTP against a real
+threaded werkzeug server. It reports throughput, p50/p95/p99 latency,
+DB calls and DB time per request (from the app's own request metrics),
+and peak RSS.
+
+Runs offline. ``mock`` uses the in-memory MockDB. ``mongo`` starts a
+throwaway ``mongod`` on a free port in a temp directory; it never
+touches MONGO_URI, because seeding drops collections. ``all`` runs
+``mock`` and, when a ``mongod`` binary is on PATH, ``mongo``, each in
+its own process so RSS and the database monitor are not shared.
+
+``--save`` writes the results as JSON. ``--compare`` re-runs and flags
+any scenario whose p50/p95 grew, or whose throughput fell, by more than
+``--tolerance``, and exits 1 if anything regressed. Latency changes
+under ``--min-delta-ms`` are ignored as noise. The default is one GIL
+switch interval (5 ms), which is what a request preempted by another
+client thread pays. On a shared or single-CPU host, use
+``--repeat 3`` for both the baseline and the comparison.
+"""
+
+import argparse
+import http.client
+import itertools
+import json
+import logging
+import os
+import platform
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import jwt
+
+MOCK_SINGLETONS = ("dashboard_stats", "analytics", "consumer_data", "logistics", "sensor_readings")
+MIN_DELTA_MS = sys.getswitchinterval() * 1000  # one GIL time slice
+STREAM_LIMIT = 50  # each HTTP event stream holds a server thread until its next keep-alive
+
+
+def percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+
+# --------------------
+# Backends
+# --------------------
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextmanager
+def local_mongod(timeout=30):
+    """Start a throwaway mongod and yield its URI."""
+    from pymongo import MongoClient
+
+    binary = shutil.which("mongod")
+    if binary is None:
+        raise RuntimeError("mongod not found on PATH")
+    path = tempfile.mkdtemp(prefix="agrovault-bench-")
+    port = _free_port()
+    process = subprocess.Popen(
+        [binary, "--dbpath", path, "--port", str(port), "--bind_ip", "127.0.0.1", "--quiet"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    uri = f"mongodb://127.0.0.1:{port}"
+    try:
+        client = MongoClient(uri, serverSelectionTimeoutMS=500)
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                client.admin.command("ping")
+                break
+            except Exception:
+                if process.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError(f"mongod did not start on port {port}") from None
+                time.sleep(0.2)
+        client.close()
+        yield uri
+    finally:
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def configure_environment(backend, uri=None):
+    """Point the app at the chosen backend before anything imports db state."""
+    os.environ.pop("MOCKDB_PATH", None)
+    if backend == "mock":
+        # Nothing listens on port 9, so the monitor falls back at once and stays there
+        os.environ["MONGO_URI"] = "mongodb://127.0.0.1:9"
+        os.environ["MONGO_STARTUP_WAIT"] = "0"
+        os.environ["MONGO_CHECK_INTERVAL"] = "3600"
+    else:
+        os.environ["MONGO_URI"] = uri
+        os.environ["MONGO_STARTUP_WAIT"] = "10"
+    os.environ.setdefault("SLOW_REQUEST_MS", "60000")
+
+
+def seed(database, args):
+    from mock_data import MOCK_ANALYTICS, MOCK_CONSUMER_DATA, MOCK_DASHBOARD_STATS, MOCK_LOGISTICS, MOCK_SENSOR_READINGS
+    from synthetic import generate
+
+    singletons = (MOCK_DASHBOARD_STATS, MOCK_ANALYTICS, MOCK_CONSUMER_DATA, MOCK_LOGISTICS, MOCK_SENSOR_READINGS)
+    for name, doc in zip(MOCK_SINGLETONS, singletons):
+        database.drop_collection(name)
+        database[name].insert_one(dict(doc, _id="current"))
+    database.drop_collection("users")
+    return generate(database, args.scale, seed=args.seed, days=args.days, log=lambda *a, **k: None)
+
+
+# --------------------
+# Scenarios
+# --------------------
+
+class Scenario:
+    """One benchmarked request shape. ``path`` and ``body`` may be callables of the request index."""
+
+    def __init__(self, method, rule, path=None, body=None, name=None, expect=(200,), limit=None,
+                 first_chunk=False, token=None):
+        self.method = method
+        self.rule = rule
+        self.path = path or rule
+        self.body = body
+        self.name = name or f"{method} {rule}"
+        self.expect = expect
+        self.limit = limit
+        self.first_chunk = first_chunk
+        self.token = token
+
+    def build(self, index):
+        path = self.path(index) if callable(self.path) else self.path
+        body = self.body(index) if callable(self.body) else self.body
+        return path, body
+
+
+class Fixtures:
+    """Ids and tokens the scenarios draw from, taken from the seeded data."""
+
+    def __init__(self, app, database):
+        client = app.test_client()
+        email = f"bench-{uuid.uuid4().hex[:8]}@example.com"
+        res = client.post("/api/auth/signup", json={"name": "Bench", "email": email, "password": "bench-pass"})
+        self.email = email
+        self.token = res.get_json()["token"]
+        self.user_id = res.get_json()["user"]["_id"]
+        self.item_ids = [d["_id"] for d in database.inventory.find({}, {"_id": 1}).limit(500)]
+        self.alert_ids = [d["_id"] for d in database.alerts.find({}, {"_id": 1}).limit(500)]
+        self.silo_ids = sorted({d["id"] for d in database.silo_status.find({}, {"id": 1}) if "id" in d})
+        self.secret = app.config["SECRET_KEY"]
+        self._client = client
+        self.delete_ids = []
+        self.logout_tokens = []
+        self.round = 0
+
+    def refill(self, count):
+        """Items for the DELETE scenario and spare tokens for logout, fresh for each mode."""
+        self.round += 1
+        headers = {"Authorization": f"Bearer {self.token}"}
+        operations = [{"op": "create", "name": f"bench-delete-{i}", "quantity": 1} for i in range(count)]
+        res = self._client.post("/api/inventory/bulk", json={"operations": operations}, headers=headers)
+        self.delete_ids = [r["_id"] for r in res.get_json()["results"]]
+        now = datetime.now(timezone.utc)
+        self.logout_tokens = [
+            jwt.encode(
+                {"sub": self.user_id, "role": "consumer", "iat": now, "exp": now + timedelta(hours=1),
+                 "jti": uuid.uuid4().hex},
+                self.secret,
+                algorithm="HS256",
+            )
+            for _ in range(count)
+        ]
+
+    def pick(self, values, index):
+        return values[index % len(values)]
+
+
+def scenarios(fx):
+    silo = fx.silo_ids[0] if fx.silo_ids else "silo-1"
+
+    def reading(index):
+        ts = datetime.now(timezone.utc).isoformat()
+        return [
+            {"siloId": fx.pick(fx.silo_ids or [silo], index + n), "ts": ts,
+             "temperature": 20 + (index + n) % 10, "humidity": 55 + n, "co2": 400}
+            for n in range(10)
+        ]
+
+    def bulk_updates(index):
+        return {"ordered": False, "operations": [
+            {"op": "update", "_id": fx.pick(fx.item_ids, index * 10 + n), "quantity": n + 1} for n in range(10)
+        ]}
+
+    return [
+        Scenario("GET", "/api/health"),
+        Scenario("GET", "/api/health/monitor"),
+        Scenario("GET", "/api/metrics"),
+        Scenario("GET", "/api/auth/me"),
+        Scenario("POST", "/api/auth/signup", expect=(201,), limit=16, body=lambda i: {
+            "name": "Bench", "email": f"bench-{uuid.uuid4().hex}@example.com", "password": "bench-pass",
+        }),
+        Scenario("POST", "/api/auth/login", limit=16, body={"email": fx.email, "password": "bench-pass"}),
+        Scenario("GET", "/api/inventory"),
+        Scenario("GET", "/api/inventory", path="/api/inventory?limit=50&sort=-quantity",
+                 name="GET /api/inventory?limit=50&sort=-quantity"),
+        Scenario("GET", "/api/inventory", path="/api/inventory?format=ndjson", name="GET /api/inventory?format=ndjson"),
+        Scenario("GET", "/api/inventory/risk", path="/api/inventory/risk?limit=20"),
+        Scenario("GET", "/api/inventory/<item_id>", path=lambda i: f"/api/inventory/{fx.pick(fx.item_ids, i)}"),
+        Scenario("GET", "/api/analytics/dashboard"),
+        Scenario("GET", "/api/analytics/trends"),
+        Scenario("GET", "/api/analytics/loss"),
+        Scenario("GET", "/api/analytics/consumer"),
+        Scenario("GET", "/api/analytics/full"),
+        Scenario("GET", "/api/consumer"),
+        Scenario("GET", "/api/sensors/readings"),
+        Scenario("GET", "/api/sensors/readings", path=f"/api/sensors/readings?silo={silo}&bucket=1h",
+                 name="GET /api/sensors/readings?bucket=1h"),
+        Scenario("GET", "/api/sensors/alerts"),
+        Scenario("GET", "/api/sensors/silos"),
+        Scenario("GET", "/api/sensors/silos/cache"),
+        Scenario("GET", "/api/sensors/ingest/stats"),
+        Scenario("GET", "/api/stream/events", path=f"/api/stream/events?token={fx.token}",
+                 first_chunk=True, limit=STREAM_LIMIT),
+        Scenario("GET", "/api/stream/stats"),
+        Scenario("GET", "/api/cache/stats"),
+        Scenario("GET", "/api/logistics"),
+        Scenario("GET", "/api/warehouses"),
+        Scenario("POST", "/api/chat", body=lambda i: {"message": f"How is silo {i} doing? ({fx.round})", "history": []}),
+        Scenario("POST", "/api/chat", path="/api/chat?stream=1", name="POST /api/chat?stream=1",
+                 body=lambda i: {"message": f"Stream silo {i} status ({fx.round})", "history": []}),
+        Scenario("GET", "/api/chat/stats"),
+        Scenario("POST", "/api/inventory", expect=(201,), body=lambda i: {
+            "name": f"bench-{i}", "category": "Grains", "quantity": i % 100, "location": "Silo A",
+        }),
+        Scenario("PUT", "/api/inventory/<item_id>", path=lambda i: f"/api/inventory/{fx.pick(fx.item_ids, i)}",
+                 body=lambda i: {"quantity": i % 500}),
+        Scenario("POST", "/api/inventory/bulk", body=bulk_updates, name="POST /api/inventory/bulk (10 updates)"),
+        Scenario("POST", "/api/sensors/ingest", expect=(202,), body=reading,
+                 name="POST /api/sensors/ingest (10 readings)"),
+        Scenario("PUT", "/api/sensors/alerts/<alert_id>/acknowledge",
+                 path=lambda i: f"/api/sensors/alerts/{fx.pick(fx.alert_ids, i)}/acknowledge"),
+        Scenario("POST", "/api/analytics/dashboard/reconcile", limit=20),
+        Scenario("DELETE", "/api/inventory/<item_id>", path=lambda i: f"/api/inventory/{fx.delete_ids[i]}"),
+        Scenario("POST", "/api/auth/logout", token=lambda i: fx.logout_tokens[i]),
+    ]
+
+
+def uncovered_routes(app, plan):
+    covered = {(s.method, s.rule) for s in plan}
+    routes = set()
+    for rule in app.url_map.iter_rules():
+        if rule.endpoint == "static":
+            continue
+        for method in rule.methods - {"HEAD", "OPTIONS"}:
+            routes.add((method, rule.rule))
+    return sorted(routes - covered)
+
+
+# --------------------
+# Transports
+# --------------------
+
+class ClientTransport:
+    name = "client"
+
+    def __init__(self, app):
+        self.app = app
+
+    def session(self):
+        return self.app.test_client()
+
+    def send(self, client, method, path, body, headers, first_chunk):
+        response = client.open(path, method=method, json=body, headers=headers, buffered=not first_chunk)
+        if first_chunk:
+            size = len(next(response.iter_encoded(), b""))
+        else:
+            size = len(response.get_data())
+        response.close()
+        return response.status_code, size
+
+    def close(self):
+        pass
+
+
+class HttpTransport:
+    name = "http"
+
+    def __init__(self, app):
+        from werkzeug.serving import make_server
+
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+        self.server = make_server("127.0.0.1", 0, app, threaded=True)
+        self.port = self.server.server_port
+        self.thread = threading.Thread(target=self.server.serve_forever, name="bench-http", daemon=True)
+        self.thread.start()
+
+    def session(self):
+        return None
+
+    def send(self, _, method, path, body, headers, first_chunk):
+        connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=60)
+        try:
+            payload = None
+            if body is not None:
+                payload = json.dumps(body).encode()
+                headers = dict(headers, **{"Content-Type": "application/json"})
+            connection.request(method, path, body=payload, headers=headers)
+            response = connection.getresponse()
+            size = len(response.read1() if first_chunk else response.read())
+            return response.status, size
+        finally:
+            connection.close()
+
+    def close(self):
+        self.server.shutdown()
+        self.thread.join()
+
+
+# --------------------
+# Driver
+# --------------------
+
+def drive(transport, scenario, fx, total, concurrency, metrics, warmup=0, start=0):
+    """Send ``warmup`` untimed requests, then ``total`` timed ones from ``concurrency`` threads.
+
+    Request indexes run from ``start``, so repeated runs use fresh delete ids and logout tokens.
+    """
+    default_headers = {"Authorization": f"Bearer {fx.token}"}
+
+    def send(session, index):
+        path, body = scenario.build(index)
+        headers = default_headers
+        if scenario.token is not None:
+            headers = {"Authorization": f"Bearer {scenario.token(index)}"}
+        return transport.send(session, scenario.method, path, body, headers, scenario.first_chunk)
+
+    session = transport.session()
+    for index in range(start, start + warmup):
+        send(session, index)
+    counter = itertools.count(start + warmup)
+    end = start + warmup + total
+
+    def worker():
+        session = transport.session()
+        latencies, failures, size = [], [], 0
+        while True:
+            index = next(counter)
+            if index >= end:
+                return latencies, failures, size
+            started = time.perf_counter()
+            status, n = send(session, index)
+            latencies.append(time.perf_counter() - started)
+            size += n
+            if status not in scenario.expect:
+                failures.append(status)
+
+    key = (scenario.rule, scenario.method)
+    before = metrics.snapshot().get(key)
+    before = (before.db_calls, before.db_seconds) if before else (0, 0.0)
+    threads = min(concurrency, total)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        results = list(pool.map(lambda _: worker(), range(threads)))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(l for batch, _, _ in results for l in batch)
+    failures = [s for _, batch, _ in results for s in batch]
+    after = metrics.snapshot().get(key)
+    db_calls = after.db_calls - before[0] if after else 0
+    db_seconds = after.db_seconds - before[1] if after else 0.0
+    return {
+        "requests": len(latencies),
+        "errors": len(failures),
+        "errorStatuses": sorted(set(failures)),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50": round(percentile(latencies, 50) * 1000, 3),
+        "p95": round(percentile(latencies, 95) * 1000, 3),
+        "p99": round(percentile(latencies, 99) * 1000, 3),
+        "bytes": round(sum(n for _, _, n in results) / len(latencies)),
+        # Shared by scenarios on one route, so these are per request of this run only
+        "dbCalls": round(db_calls / len(latencies), 2),
+        "dbMs": round(db_seconds * 1000 / len(latencies), 3),
+    }
+
+
+def best_of(runs):
+    """Combine repeated runs like timeit does: lowest latencies, highest throughput."""
+    best = dict(min(runs, key=lambda run: run["p50"]))
+    for metric in ("p95", "p99"):
+        best[metric] = min(run[metric] for run in runs)
+    best["rps"] = max(run["rps"] for run in runs)
+    best["errors"] = sum(run["errors"] for run in runs)
+    best["errorStatuses"] = sorted({s for run in runs for s in run["errorStatuses"]})
+    return best
+
+
+def run_backend(args, backend):
+    """Seed, start the app and run every scenario in each mode; returns the results dict."""
+    with (local_mongod() if backend == "mongo" else _nothing()) as uri:
+        configure_environment(backend, uri)
+        from benchmarks.gemini_stub import StubGeminiClient
+        from db import get_db, start_db_monitor
+
+        monitor = start_db_monitor()
+        if monitor.backend != backend:
+            raise RuntimeError(f"expected the {backend} backend, the monitor chose {monitor.backend}")
+        started = time.perf_counter()
+        counts = seed(get_db(), args)
+        seed_seconds = time.perf_counter() - started
+        print(f"[{backend}] seeded {sum(counts.values()):,} docs in {seed_seconds:.1f}s "
+              f"(scale {args.scale:g}, {args.days} days)", flush=True)
+
+        from app import create_app
+
+        app = create_app()
+        app.extensions["gemini"].use(StubGeminiClient(first_token_delay=0, token_delay=0, reply_words=40))
+        metrics = app.extensions["request_metrics"]
+        fx = Fixtures(app, get_db())
+        plan = [s for s in scenarios(fx) if args.only is None or args.only in s.name]
+        missing = uncovered_routes(app, scenarios(fx))
+        if missing:
+            print(f"[{backend}] routes without a scenario: {', '.join(f'{m} {r}' for m, r in missing)}")
+
+        result = {"seedSeconds": round(seed_seconds, 2), "documents": sum(counts.values()), "modes": {}}
+        for mode in ("client", "http") if args.mode == "both" else (args.mode,):
+            transport = ClientTransport(app) if mode == "client" else HttpTransport(app)
+            fx.refill((args.requests + args.warmup) * args.repeat)
+            rows = {}
+            print(f"\n[{backend}/{mode}] {args.concurrency} concurrent clients")
+            print(f"{'scenario':50} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'db/req':>7} {'err':>4}")
+            try:
+                for scenario in plan:
+                    total = min(args.requests, scenario.limit or args.requests)
+                    # Capped scenarios are the expensive ones; a couple of warmups is enough
+                    warmup = args.warmup if scenario.limit is None else min(args.warmup, 2)
+                    # On a busy host the slower runs mostly measure the neighbours
+                    runs = [
+                        drive(transport, scenario, fx, total, args.concurrency, metrics,
+                              warmup=warmup, start=r * (args.requests + args.warmup))
+                        for r in range(args.repeat)
+                    ]
+                    row = rows[scenario.name] = best_of(runs)
+                    print(f"{scenario.name[:50]:50} {row['rps']:9.1f} {row['p50']:8.2f} {row['p95']:8.2f} "
+                          f"{row['p99']:8.2f} {row['dbCalls']:7.1f} {row['errors']:4d}", flush=True)
+            finally:
+                transport.close()
+            result["modes"][mode] = {"scenarios": rows, "peakRssMb": peak_rss_mb()}
+        result["peakRssMb"] = peak_rss_mb()
+        print(f"\n[{backend}] peak RSS {result['peakRssMb']} MB")
+        return result
+
+
+@contextmanager
+def _nothing():
+    yield None
+
+
+def run_isolated(argv, backend):
+    """Run one backend in a child process and return its results."""
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        output = f.name
+    try:
+        command = [sys.executable, "-m", "benchmarks.routes", *argv, "--backend", backend, "--output", output]
+        subprocess.run(command, check=True)
+        with open(output) as f:
+            return json.load(f)
+    finally:
+        os.remove(output)
+
+
+# --------------------
+# Baselines
+# --------------------
+
+def compare(baseline, current, tolerance, min_delta_ms=MIN_DELTA_MS):
+    """Print a comparison table and return the list of regressions."""
+    regressions = []
+    for key in ("scale", "days", "requests", "concurrency", "warmup"):
+        if baseline["meta"].get(key) != current["meta"].get(key):
+            print(f"warning: baseline {key}={baseline['meta'].get(key)} but this run used {current['meta'].get(key)}")
+    for backend, result in current["backends"].items():
+        base_backend = baseline["backends"].get(backend)
+        if base_backend is None:
+            print(f"[{backend}] not in baseline, skipped")
+            continue
+        for mode, data in result["modes"].items():
+            base_mode = base_backend["modes"].get(mode)
+            if base_mode is None:
+                continue
+            print(f"\n[{backend}/{mode}] against baseline")
+            print(f"{'scenario':50} {'p50':>16} {'p95':>16} {'req/s':>16}")
+            for name, row in data["scenarios"].items():
+                base = base_mode["scenarios"].get(name)
+                if base is None:
+                    continue
+                flags = []
+                for metric in ("p50", "p95"):
+                    if row[metric] > base[metric] * (1 + tolerance) and row[metric] - base[metric] > min_delta_ms:
+                        flags.append(metric)
+                if row["rps"] < base["rps"] * (1 - tolerance):
+                    flags.append("rps")
+                if row["errors"] > base["errors"]:
+                    flags.append("errors")
+                cells = [f"{base[m]:>7.2f}->{row[m]:<7.2f}" for m in ("p50", "p95")]
+                cells.append(f"{base['rps']:>7.0f}->{row['rps']:<7.0f}")
+                marker = "  REGRESSED " + ",".join(flags) if flags else ""
+                print(f"{name[:50]:50} {' '.join(cells)}{marker}")
+                if flags:
+                    regressions.append(f"{backend}/{mode} {name}: {', '.join(flags)}")
+        base_rss, rss = base_backend["peakRssMb"], result["peakRssMb"]
+        print(f"[{backend}] peak RSS {base_rss} -> {rss} MB")
+        if rss > base_rss * (1 + tolerance):
+            regressions.append(f"{backend}: peak RSS {base_rss} -> {rss} MB")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=("all", "mock", "mongo"), default="all")
+    parser.add_argument("--mode", choices=("both", "client", "http"), default="both")
+    parser.add_argument("--scale", type=float, default=0.05, help="synthetic data scale (see synthetic.py)")
+    parser.add_argument("--days", type=int, default=7, help="days of sensor history")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=10, help="untimed requests per scenario")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per scenario; the best latency and throughput are kept")
+    parser.add_argument("--only", help="run only scenarios whose name contains this")
+    parser.add_argument("--save", metavar="FILE", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="FILE", help="compare against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown")
+    parser.add_argument("--min-delta-ms", type=float, default=MIN_DELTA_MS,
+                        help="ignore latency changes smaller than this")
+    parser.add_argument("--output", help=argparse.SUPPRESS)  # used by --backend all
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.ERROR)
+
+    if args.backend == "all":
+        backends = ["mock"] + (["mongo"] if shutil.which("mongod") else [])
+        if len(backends) == 1:
+            print("mongod not found on PATH; benchmarking MockDB only")
+        results = {backend: run_isolated(_child_args(argv), backend) for backend in backends}
+    else:
+        results = {args.backend: run_backend(args, args.backend)}
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results[args.backend], f)
+        return
+
+    report = {
+        "meta": {
+            "scale": args.scale,
+            "days": args.days,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "warmup": args.warmup,
+            "repeat": args.repeat,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "createdAt": datetime.now(timezone.utc).isoformat(),
+        },
+        "backends": results,
+    }
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nbaseline written to {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.tolerance, args.min_delta_ms)
+        if regressions:
+            print("\nRegressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print("\nNo regressions.")
+
+
+def _child_args(argv):
+    """argv without --backend/--save/--compare/--output, which only the parent handles."""
+    skip = ("--backend", "--save", "--compare", "--output")
+    child, dropping = [], False
+    for arg in argv:
+        if dropping:
+            dropping = False
+            continue
+        name = arg.split("=", 1)[0]
+        if name in skip:
+            dropping = "=" not in arg
+            continue
+        child.append(arg)
+    return child
+
+
+if __name__ == "__main__":
+    main()
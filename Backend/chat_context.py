@@ -0,0 +1,165 @@
+"""Compact snapshot of live warehouse data for the chat prompt.
+
+The snapshot has four sections: inventory totals by category, silo
+status, open alerts and upcoming shipments. Each is rendered once and
+kept until a write route calls ``mark_dirty`` for it. Chat requests then
+only read the cached text. Rebuilds are throttled to one per
+``min_interval`` seconds, and everything is refreshed after ``max_age``
+seconds to pick up writes made outside the app (e.g. ``seed.py``). The
+rendered text is capped at ``max_chars``; sections are filled in
+priority order and lines past the cap are dropped.
+
+``digest`` versions the snapshot for the reply cache. It hashes the
+sections with silo readings rounded to ``READING_STEPS``, so sensor
+jitter between ingests does not invalidate every cached answer. Only a
+change an answer could notice produces a new digest.
+"""
+
+import hashlib
+import threading
+import time
+
+SECTIONS = ("alerts", "silos", "inventory", "logistics")
+SEVERITY_ORDER = {"critical": 0, "warning": 1, "info": 2}
+MAX_ALERTS = 8
+MAX_SHIPMENTS = 6
+# Resolution of silo readings in the digest (the prompt keeps full precision)
+READING_STEPS = {"temperature": 1, "humidity": 5, "co2": 50, "capacity": 5}
+
+
+def _number(value):
+    return f"{value:g}" if isinstance(value, (int, float)) else str(value)
+
+
+def _coarse(silo):
+    """The silo with its readings rounded to ``READING_STEPS``."""
+    out = dict(silo)
+    for field, step in READING_STEPS.items():
+        value = out.get(field)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            out[field] = round(value / step) * step
+    return out
+
+
+class ChatContext:
+    def __init__(self, get_db, load_silos, max_chars=2000, min_interval=30.0, max_age=300.0):
+        self._get_db = get_db
+        self._load_silos = load_silos
+        self.max_chars = max_chars
+        self.min_interval = min_interval
+        self.max_age = max_age
+        self._lines = {}
+        self._key_lines = {}
+        self._dirty = set(SECTIONS)
+        self._lock = threading.Lock()
+        self._built_at = 0.0
+        self.text = ""
+        self.digest = ""
+        self.builds = 0
+
+    def mark_dirty(self, *sections):
+        self._dirty.update(sections or SECTIONS)
+
+    def current(self):
+        """(text, digest) of the snapshot, rebuilding stale sections first."""
+        now = time.monotonic()
+        if now - self._built_at >= self.max_age:
+            self._dirty.update(SECTIONS)
+        if self._dirty and now - self._built_at >= self.min_interval and self._lock.acquire(blocking=False):
+            try:
+                self._rebuild()
+            finally:
+                self._lock.release()
+        return self.text, self.digest
+
+    def _rebuild(self):
+        dirty, self._dirty = self._dirty, set()
+        database = self._get_db()
+        for section in SECTIONS:
+            if section in dirty:
+                if section == "silos":
+                    silos = list(self._load_silos())
+                    self._lines[section] = self._silos_lines(silos)
+                    self._key_lines[section] = self._silos_lines([_coarse(s) for s in silos])
+                else:
+                    self._lines[section] = self._key_lines[section] = getattr(self, f"_{section}_lines")(database)
+        self.text = self._render()
+        key = "\n".join(line for section in SECTIONS for line in self._key_lines.get(section) or [])
+        self.digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+        self._built_at = time.monotonic()
+        self.builds += 1
+
+    def _render(self):
+        titles = {"alerts": "Open alerts", "silos": "Silos", "inventory": "Inventory by category",
+                  "logistics": "Upcoming shipments"}
+        out, size = [], 0
+        for section in SECTIONS:
+            lines = self._lines.get(section) or []
+            if not lines:
+                continue
+            header = f"{titles[section]}:"
+            if size + len(header) + 1 > self.max_chars:
+                break
+            out.append(header)
+            size += len(header) + 1
+            for line in lines:
+                if size + len(line) + 1 > self.max_chars:
+                    break
+                out.append(line)
+                size += len(line) + 1
+        return "\n".join(out)
+
+    def _alerts_lines(self, database):
+        alerts = database.alerts.find({"acknowledged": {"$ne": True}, "resolved": {"$ne": True}}, {"_id": 0})
+        alerts = sorted(alerts, key=lambda a: (SEVERITY_ORDER.get(a.get("severity"), 3), a.get("timestamp", "")))
+        lines = [f"- {a.get('severity', 'info')} {a.get('type', '')} at {a.get('location', '?')}: {a.get('message', '')}"
+                 for a in alerts[:MAX_ALERTS]]
+        if len(alerts) > MAX_ALERTS:
+            lines.append(f"- and {len(alerts) - MAX_ALERTS} more")
+        return lines
+
+    def _silos_lines(self, silos):
+        lines = []
+        for silo in silos:
+            readings = [f"{_number(silo['temperature'])}°C" if "temperature" in silo else None,
+                        f"{_number(silo['humidity'])}% RH" if "humidity" in silo else None,
+                        f"CO2 {_number(silo['co2'])} ppm" if "co2" in silo else None,
+                        f"{_number(silo['capacity'])}% full" if "capacity" in silo else None]
+            detail = ", ".join(r for r in readings if r)
+            name = silo.get("name") or silo.get("id")
+            crop = f" ({silo['crop']})" if silo.get("crop") else ""
+            lines.append(f"- {name}{crop}: {silo.get('status', 'unknown')}" + (f", {detail}" if detail else ""))
+        return lines
+
+    def _inventory_lines(self, database):
+        totals = {}
+        for item in database.inventory.find({}, {"category": 1, "quantity": 1, "unit": 1}):
+            category = item.get("category") or "Uncategorized"
+            count, quantity, unit = totals.get(category, (0, 0, item.get("unit", "")))
+            value = item.get("quantity", 0)
+            quantity += value if isinstance(value, (int, float)) and not isinstance(value, bool) else 0
+            totals[category] = (count + 1, quantity, unit)
+        return [f"- {category}: {count} lot{'s' if count != 1 else ''}, {_number(quantity)} {unit}".rstrip()
+                for category, (count, quantity, unit) in sorted(totals.items())]
+
+    def _logistics_lines(self, database):
+        doc = database.logistics.find_one({"_id": "current"}) or {}
+        shipments = [("in", s, s.get("eta", "")) for s in doc.get("incomingShipments", [])]
+        shipments += [("out", s, s.get("departure", "")) for s in doc.get("outgoingShipments", [])]
+        shipments = sorted((s for s in shipments if s[1].get("status") != "Delivered"), key=lambda s: s[2])
+        lines = []
+        for direction, s, when in shipments[:MAX_SHIPMENTS]:
+            party = s.get("origin") if direction == "in" else s.get("destination")
+            label = "from" if direction == "in" else "to"
+            lines.append(f"- {s.get('_id', '')} {direction} {_number(s.get('quantity', ''))} {s.get('unit', '')} "
+                         f"{s.get('crop', '')} {label} {party}, {s.get('status', '')}, {when}")
+        return lines
+
+    def stats(self) -> dict:
+        return {
+            "chars": len(self.text),
+            "maxChars": self.max_chars,
+            "digest": self.digest,
+            "builds": self.builds,
+            "dirty": sorted(self._dirty),
+        }
@@ -0,0 +1,137 @@
+"""Reply cache and history window for the chat route.
+
+``ReplyCache`` maps a normalized prompt to a previous reply (TTL + LRU),
+so repeated questions such as "what's the humidity in Silo B?" skip the
+model entirely; the key also carries ``history_digest`` of the turns
+actually sent, so a follow-up like "and Silo C?" is only reused within
+the same conversation. ``window_history`` keeps the newest turns that fit a
+token budget and folds older user turns into a short extractive summary,
+so the upstream payload stops growing with conversation length.
+Token counts are estimated at four characters per token.
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+
+_CONTRACTIONS = {"what's": "what is", "how's": "how is", "where's": "where is", "it's": "it is",
+                 "whats": "what is", "i'm": "i am", "don't": "do not", "can't": "cannot"}
+_FILLER = {"please", "pls", "thanks", "thank", "you", "hey", "hi", "hello", "kindly", "the", "a", "an"}
+_PUNCT = re.compile(r"[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def normalize_prompt(text: str) -> str:
+    """Lowercase, expand common contractions, drop punctuation and filler words."""
+    words = []
+    for word in text.lower().split():
+        words.extend(_CONTRACTIONS.get(word, word).split())
+    words = (_PUNCT.sub("", word) for word in words)
+    return " ".join(word for word in words if word and word not in _FILLER)
+
+
+def history_digest(kept, summary) -> str:
+    """Short digest of the history window sent upstream ("" when there is none)."""
+    if not kept and not summary:
+        return ""
+    turns = [(msg.get("role"), msg.get("content", "")) for msg in kept]
+    payload = json.dumps([turns, summary], ensure_ascii=False).encode("utf-8")
+    return hashlib.sha1(payload).hexdigest()[:16]
+
+
+def _first_sentence(text: str, limit=160) -> str:
+    sentence = re.split(r"(?<=[.?!])\s", text.strip(), maxsplit=1)[0]
+    return sentence if len(sentence) <= limit else sentence[: limit - 1] + "…"
+
+
+def window_history(history, budget_tokens, summary_tokens):
+    """Split ``history`` into (kept turns, summary text, dropped turn count).
+
+    Turns are kept newest-first until ``budget_tokens`` is used up. The
+    summary lists the most recent dropped user questions that fit in
+    ``summary_tokens``; it is empty when nothing was dropped.
+    """
+    used = 0
+    index = len(history)
+    while index > 0:
+        cost = estimate_tokens(history[index - 1].get("content", ""))
+        if used + cost > budget_tokens:
+            break
+        used += cost
+        index -= 1
+    kept = history[index:]
+    dropped = history[:index]
+
+    topics, used = [], 0
+    for msg in reversed(dropped):
+        if msg.get("role") != "user":
+            continue
+        topic = _first_sentence(msg.get("content", ""))
+        cost = estimate_tokens(topic)
+        if not topic or used + cost > summary_tokens:
+            break
+        topics.append(topic)
+        used += cost
+    summary = ""
+    if topics:
+        summary = "Earlier in this conversation the user asked: " + " | ".join(reversed(topics))
+    return kept, summary, len(dropped)
+
+
+class ReplyCache:
+    def __init__(self, max_entries=512, ttl=600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, reply)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.turns_dropped = 0
+        self.bytes_trimmed = 0
+
+    def get(self, key, request_bytes=0):
+        """Cached reply for ``key``; on a hit, count the upstream bytes avoided."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.bytes_saved += request_bytes + len(entry[1].encode("utf-8"))
+            return entry[1]
+
+    def put(self, key, reply):
+        if self.max_entries <= 0 or not key:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, reply)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def record_window(self, dropped_turns, trimmed_bytes):
+        with self._lock:
+            self.turns_dropped += dropped_turns
+            self.bytes_trimmed += trimmed_bytes
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "bytesSaved": self.bytes_saved,
+            "historyTurnsDropped": self.turns_dropped,
+            "historyBytesTrimmed": self.bytes_trimmed,
+        }
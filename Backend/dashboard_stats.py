@@ -0,0 +1,158 @@
+"""Dashboard figures maintained as running aggregates.
+
+The dashboard is the stored ``dashboard_stats`` document. Two of its
+fields, ``totalStock`` (sum of inventory quantities) and
+``criticalAlerts`` (unacknowledged critical alerts), are adjusted with
+``$inc`` deltas by the routes that change them, so reading the
+dashboard never scans a collection. ``capacityUsed`` is derived on read
+as ``totalStock`` over ``stockCapacity``, the capacity the stock is
+held against. That is worked out once from the seeded ``totalStock`` and
+``capacityUsed`` pair, so the seeded figure is reproduced and then
+follows every stock change. When the pair is unusable it falls back to
+the summed warehouse capacity. The trend fields are returned as
+seeded. Deltas never create the document, so an unseeded database
+still reads as empty rather than as a partial dashboard. A background
+reconciliation recounts the maintained fields every
+``reconcile_interval`` seconds and corrects any drift.
+"""
+
+import logging
+import threading
+import time
+
+STATS_ID = "current"
+MAINTAINED_FIELDS = ("totalStock", "criticalAlerts")
+
+
+def _quantity(doc) -> float:
+    value = (doc or {}).get("quantity", 0)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return 0
+    return value
+
+
+def _positive(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0
+
+
+def _open_critical(alert) -> int:
+    return int(bool(alert) and alert.get("severity") == "critical" and not alert.get("acknowledged"))
+
+
+class DashboardStats:
+    def __init__(self, get_db, reconcile_interval=300.0, on_change=None):
+        self._get_db = get_db
+        self.reconcile_interval = reconcile_interval
+        self._on_change = on_change
+        self._thread = None
+        self._lock = threading.Lock()
+        self.last_reconcile = None
+
+    def _collection(self):
+        return self._get_db().dashboard_stats
+
+    # -- deltas -------------------------------------------------------------
+
+    def adjust(self, **deltas):
+        deltas = {k: v for k, v in deltas.items() if v}
+        if deltas:
+            self._collection().update_one({"_id": STATS_ID}, {"$inc": deltas})
+            if self._on_change is not None:
+                self._on_change()
+
+    def inventory_changed(self, before=None, after=None):
+        """Apply the stock delta of an inventory create (before=None), update or delete (after=None)."""
+        self.adjust(totalStock=_quantity(after) - _quantity(before))
+
+    def inventory_changes(self, pairs):
+        """Apply the net stock delta of many (before, after) pairs with one ``$inc``."""
+        self.adjust(totalStock=sum(_quantity(after) - _quantity(before) for before, after in pairs))
+
+    def alert_changed(self, before=None, after=None):
+        self.adjust(criticalAlerts=_open_critical(after) - _open_critical(before))
+
+    def alerts_opened(self, alerts):
+        self.adjust(criticalAlerts=sum(_open_critical(a) for a in alerts))
+
+    # -- reads --------------------------------------------------------------
+
+    def read(self) -> dict:
+        self._ensure_started()
+        doc = self._collection().find_one({"_id": STATS_ID}, {"_id": 0}) or {}
+        if not doc:
+            return doc
+        capacity = doc.pop("stockCapacity", None)
+        if capacity is None:
+            capacity = self._derive_capacity(doc)
+        if capacity:
+            doc["capacityUsed"] = round(100 * doc.get("totalStock", 0) / capacity, 1)
+        return doc
+
+    def _derive_capacity(self, doc):
+        """Store (once) the capacity that ``capacityUsed`` is measured against."""
+        stock, used = doc.get("totalStock"), doc.get("capacityUsed")
+        if _positive(stock) and _positive(used):
+            capacity = stock * 100 / used
+        else:
+            capacity = sum(
+                w.get("totalCapacity") or 0 for w in self._get_db().warehouses.find({}, {"totalCapacity": 1})
+            )
+        if capacity:
+            self._collection().update_one(
+                {"_id": STATS_ID, "stockCapacity": {"$exists": False}}, {"$set": {"stockCapacity": capacity}},
+            )
+        return capacity
+
+    # -- reconciliation -----------------------------------------------------
+
+    def compute(self) -> dict:
+        """Recompute the maintained figures with full scans."""
+        database = self._get_db()
+        total_stock = sum(_quantity(d) for d in database.inventory.find({}, {"quantity": 1}))
+        critical = sum(
+            1 for _ in database.alerts.find(
+                {"severity": "critical", "acknowledged": {"$ne": True}}, {"_id": 1}
+            )
+        )
+        return {"totalStock": total_stock, "criticalAlerts": critical}
+
+    def reconcile(self) -> dict:
+        """Correct drift between the running aggregates and a full recount.
+
+        The correction is applied as ``$inc`` of (actual - stored) rather
+        than ``$set``, so deltas landing while the scan runs are kept; any
+        skew from that window is picked up by the next run.
+        """
+        with self._lock:
+            stored = self._collection().find_one({"_id": STATS_ID}, dict.fromkeys(MAINTAINED_FIELDS, 1))
+            drift = {}
+            if stored is not None:
+                actual = self.compute()
+                drift = {k: actual[k] - stored.get(k, 0) for k in MAINTAINED_FIELDS}
+                drift = {k: v for k, v in drift.items() if v}
+            if drift:
+                logging.warning("Dashboard stats drifted, correcting: %s", drift)
+                self.adjust(**drift)
+            self.last_reconcile = {"at": time.time(), "drift": drift}
+            return drift
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="dashboard-reconcile", daemon=True)
+        self.reconcile()
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.reconcile_interval)
+            try:
+                self.reconcile()
+            except Exception:
+                logging.exception("Dashboard stats reconciliation failed")
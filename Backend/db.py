@@ -1,99 +1,1271 @@
 import os
+import atexit
+import heapq
 import logging
-from pymongo import MongoClient
+import re
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from itertools import islice
+
+from bson import ObjectId
+from pymongo import DeleteMany, DeleteOne, InsertOne, MongoClient, UpdateMany, UpdateOne, monitoring
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from pymongo.results import BulkWriteResult, InsertManyResult
+
+from mock_store import LogStore
+
+_monitor = None
+_monitor_lock = threading.Lock()
+
+
+# --------------------
+# Query engine
+# --------------------
+
+def _key(value):
+    """Hashable key that keeps Mongo's type distinctions (True is not 1)."""
+    if isinstance(value, bool):
+        return ("bool", value)
+    if isinstance(value, (int, float)):
+        return ("number", value)
+    if isinstance(value, dict):
+        return ("object", tuple(sorted((k, _key(v)) for k, v in value.items())))
+    if isinstance(value, list):
+        return ("array", tuple(_key(v) for v in value))
+    return (type(value).__name__, value)
+
+
+def _bracket(value):
+    """Comparison bracket for range operators; values only compare within one."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return "number"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, datetime):
+        return "date"
+    return None
+
+
+def _getter(path):
+    """Build a function returning the values found at a (dotted) path."""
+    if "." not in path:
+        def get(doc):
+            return [doc[path]] if path in doc else []
+        return get
+
+    parts = path.split(".")
+
+    def get(doc):
+        values = [doc]
+        for part in parts:
+            found = []
+            for value in values:
+                if isinstance(value, dict):
+                    if part in value:
+                        found.append(value[part])
+                elif isinstance(value, list):
+                    if part.isdigit() and int(part) < len(value):
+                        found.append(value[int(part)])
+                    for element in value:
+                        if isinstance(element, dict) and part in element:
+                            found.append(element[part])
+            values = found
+        return values
+    return get
+
+
+def _expand(values):
+    """Values plus the elements of any arrays among them (Mongo multikey)."""
+    for value in values:
+        yield value
+        if isinstance(value, list):
+            yield from value
+
+
+def _compile_op(op, arg):
+    """Compile a single field operator into a test over resolved values."""
+    if op == "$eq":
+        target = _key(arg)
+        if arg is None:
+            return lambda values: not values or any(_key(v) == target for v in _expand(values))
+        return lambda values: any(_key(v) == target for v in _expand(values))
+    if op == "$ne":
+        eq = _compile_op("$eq", arg)
+        return lambda values: not eq(values)
+    if op == "$in":
+        if not isinstance(arg, list):
+            raise OperationFailure("$in needs an array")
+        targets = {_key(v) for v in arg}
+        if None in arg:
+            return lambda values: not values or any(_key(v) in targets for v in _expand(values))
+        return lambda values: any(_key(v) in targets for v in _expand(values))
+    if op == "$nin":
+        isin = _compile_op("$in", arg)
+        return lambda values: not isin(values)
+    if op == "$exists":
+        wanted = bool(arg)
+        return lambda values: bool(values) is wanted
+    if op in _COMPARATORS:
+        compare = _COMPARATORS[op]
+        bracket = _bracket(arg)
+        inclusive = op in ("$gte", "$lte")
+        if arg is None:
+            # Null sorts alone: $gte/$lte null mean "null or missing", $gt/$lt null match nothing
+            if inclusive:
+                return lambda values: not values or any(v is None for v in _expand(values))
+            return lambda values: False
+        if isinstance(arg, bool):
+            return lambda values: any(isinstance(v, bool) and compare(v, arg) for v in _expand(values))
+        if bracket is None:
+            # Objects and arrays are not ordered here; only an equal value satisfies $gte/$lte
+            if not inclusive:
+                return lambda values: False
+            target = _key(arg)
+            return lambda values: any(_key(v) == target for v in _expand(values))
+        return lambda values: any(
+            _bracket(v) == bracket and compare(v, arg) for v in _expand(values)
+        )
+    raise OperationFailure(f"unknown operator: {op}")
+
+
+_COMPARATORS = {
+    "$gt": lambda a, b: a > b,
+    "$gte": lambda a, b: a >= b,
+    "$lt": lambda a, b: a < b,
+    "$lte": lambda a, b: a <= b,
+}
+
+
+def _is_operator_doc(cond):
+    return isinstance(cond, dict) and bool(cond) and all(k.startswith("$") for k in cond)
+
+
+def _compile_field(path, cond):
+    get = _getter(path)
+    if _is_operator_doc(cond):
+        tests = [_compile_op(op, arg) for op, arg in cond.items()]
+    else:
+        tests = [_compile_op("$eq", cond)]
+    if len(tests) == 1:
+        test = tests[0]
+        return lambda doc: test(get(doc))
+
+    def pred(doc):
+        values = get(doc)
+        return all(t(values) for t in tests)
+    return pred
+
+
+def _compile(query):
+    preds = []
+    for field, cond in query.items():
+        if field in ("$and", "$or"):
+            if not isinstance(cond, list) or not cond:
+                raise OperationFailure(f"{field} must be a nonempty array")
+            subs = [_compile(q) for q in cond]
+            if field == "$and":
+                preds.append(lambda doc, subs=subs: all(p(doc) for p in subs))
+            else:
+                preds.append(lambda doc, subs=subs: any(p(doc) for p in subs))
+        elif field.startswith("$"):
+            raise OperationFailure(f"unknown top level operator: {field}")
+        else:
+            preds.append(_compile_field(field, cond))
+    if not preds:
+        return lambda doc: True
+    if len(preds) == 1:
+        return preds[0]
+    return lambda doc: all(p(doc) for p in preds)
+
+
+_QUERY_CACHE = {}
+_QUERY_CACHE_SIZE = 1024
+
+
+def compile_query(query):
+    """Compile a Mongo filter into a predicate, reusing earlier compilations."""
+    key = _key(query or {})
+    pred = _QUERY_CACHE.get(key)
+    if pred is None:
+        if len(_QUERY_CACHE) >= _QUERY_CACHE_SIZE:
+            _QUERY_CACHE.clear()
+        pred = _QUERY_CACHE[key] = _compile(query or {})
+    return pred
+
+
+# --------------------
+# Mock collection
+# --------------------
+
+class _Index:
+    """Index on one (dotted) field.
+
+    Equality lookups go through a dict of value -> ordered set of _ids;
+    numbers, strings (ISO timestamps) and datetimes are also kept in
+    sorted arrays so range predicates can bisect instead of scanning.
+    """
+
+    def __init__(self, field, unique=False, sparse=False):
+        self.field = field
+        self.unique = unique
+        self.sparse = sparse
+        self._get = _getter(field)
+        self._map = {}
+        self._sorted = {}  # bracket -> (sorted values, matching _ids)
+
+    def keys_for(self, doc):
+        values = self._get(doc)
+        if not values:
+            return set() if self.sparse else {_key(None)}
+        # Arrays are multikey, as in Mongo: every element is indexed too.
+        return {_key(v) for v in _expand(values)}
+
+    def _ordered_for(self, doc):
+        return {v for v in _expand(self._get(doc)) if _bracket(v) is not None}
+
+    def check(self, doc_id, doc):
+        """Raise DuplicateKeyError if adding doc would break uniqueness."""
+        if not self.unique:
+            return
+        for key in self.keys_for(doc):
+            owners = self._map.get(key)
+            if owners and (len(owners) > 1 or doc_id not in owners):
+                raise DuplicateKeyError(
+                    f"E11000 duplicate key error collection index: {self.field}_1 "
+                    f"dup key: {{ {self.field}: {key[1]!r} }}"
+                )
+
+    def build(self, items):
+        """Index many (doc_id, doc) pairs at once: one sort per bracket, not an insert per value."""
+        pending = {}  # bracket -> [(value, doc_id)]
+        for doc_id, doc in items:
+            self.check(doc_id, doc)
+            for key in self.keys_for(doc):
+                self._map.setdefault(key, {})[doc_id] = None
+            for value in self._ordered_for(doc):
+                pending.setdefault(_bracket(value), []).append((value, doc_id))
+        for bracket, pairs in pending.items():
+            # Stable sort on the value alone, so ties keep insertion order like bisect_right
+            pairs.sort(key=lambda pair: pair[0])
+            self._sorted[bracket] = ([v for v, _ in pairs], [i for _, i in pairs])
+
+    def add(self, doc_id, doc):
+        for key in self.keys_for(doc):
+            self._map.setdefault(key, {})[doc_id] = None
+        for value in self._ordered_for(doc):
+            values, ids = self._sorted.setdefault(_bracket(value), ([], []))
+            pos = bisect_right(values, value)
+            values.insert(pos, value)
+            ids.insert(pos, doc_id)
+
+    def remove(self, doc_id, doc):
+        for key in self.keys_for(doc):
+            owners = self._map.get(key)
+            if owners is not None:
+                owners.pop(doc_id, None)
+                if not owners:
+                    del self._map[key]
+        for value in self._ordered_for(doc):
+            values, ids = self._sorted[_bracket(value)]
+            pos = bisect_left(values, value)
+            while pos < len(values) and values[pos] == value:
+                if ids[pos] == doc_id:
+                    del values[pos], ids[pos]
+                    break
+                pos += 1
+
+    def lookup(self, value):
+        return self._map.get(_key(value), {})
+
+    def lookup_many(self, values):
+        found = {}
+        for value in values:
+            found.update(self.lookup(value))
+        return found
+
+    def range(self, lower=None, lower_inclusive=True, upper=None, upper_inclusive=True):
+        """_ids whose value lies within the bounds, in index order."""
+        bracket = _bracket(lower if lower is not None else upper)
+        values, ids = self._sorted.get(bracket, ([], []))
+        start, end = 0, len(values)
+        if lower is not None:
+            start = (bisect_left if lower_inclusive else bisect_right)(values, lower)
+        if upper is not None:
+            end = (bisect_right if upper_inclusive else bisect_left)(values, upper)
+        return dict.fromkeys(ids[start:end])
+
+    def plan(self, cond):
+        """Candidate _ids for a field condition, or None if not indexable."""
+        if not _is_operator_doc(cond):
+            return self.lookup(cond)
+        if "$eq" in cond:
+            return self.lookup(cond["$eq"])
+        if isinstance(cond.get("$in"), list):
+            return self.lookup_many(cond["$in"])
+        lower = upper = None
+        lower_inclusive = upper_inclusive = True
+        for op in ("$gt", "$gte"):
+            if op in cond:
+                lower, lower_inclusive = cond[op], op == "$gte"
+        for op in ("$lt", "$lte"):
+            if op in cond:
+                upper, upper_inclusive = cond[op], op == "$lte"
+        if lower is None and upper is None:
+            return None
+        brackets = {_bracket(b) for b in (lower, upper) if b is not None}
+        if len(brackets) != 1 or None in brackets:
+            return None
+        return self.range(lower, lower_inclusive, upper, upper_inclusive)
+
+
+def _sort_value(value):
+    """Order values across types the way Mongo does (null < numbers < strings ...)."""
+    if value is None:
+        return (0, 0)
+    if isinstance(value, bool):
+        return (5, value)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    if isinstance(value, datetime):
+        return (6, value)
+    if isinstance(value, dict):
+        return (3, repr(value))
+    return (4, repr(value))
+
+
+class _Descending:
+    """Sort key wrapper that inverts the comparison of whatever it holds."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+def _compile_sort(spec):
+    getters = [(_getter(field), direction) for field, direction in spec]
+
+    def key(doc):
+        parts = []
+        for get, direction in getters:
+            values = get(doc)
+            part = _sort_value(values[0] if values else None)
+            parts.append(part if direction >= 0 else _Descending(part))
+        return tuple(parts)
+    return key
+
+
+def _compile_projection(projection):
+    """Build a function copying only the projected fields out of a document."""
+    if projection is None:
+        return dict
+    if isinstance(projection, (list, tuple)):
+        projection = {field: 1 for field in projection}
+    include_id = bool(projection.get("_id", 1))
+    fields = [f for f in projection if f != "_id"]
+    # {"_id": 1} on its own is an inclusion too: only the _id comes back
+    inclusive = any(projection[f] for f in fields) or (not fields and "_id" in projection and include_id)
+
+    if inclusive:
+        paths = [f.split(".") for f in fields if projection[f]]
+
+        def project(doc):
+            out = {"_id": doc["_id"]} if include_id and "_id" in doc else {}
+            for parts in paths:
+                source, target = doc, out
+                for part in parts[:-1]:
+                    source = source.get(part) if isinstance(source, dict) else None
+                    if not isinstance(source, dict):
+                        break
+                    target = target.setdefault(part, {})
+                else:
+                    if isinstance(source, dict) and parts[-1] in source:
+                        target[parts[-1]] = source[parts[-1]]
+            return out
+        return project
+
+    paths = [f.split(".") for f in fields]
+    if not include_id:
+        paths.append(["_id"])
+
+    def project(doc):
+        out = dict(doc)
+        for parts in paths:
+            target = out
+            for part in parts[:-1]:
+                if not isinstance(target.get(part), dict):
+                    break
+                target[part] = target = dict(target[part])
+            else:
+                target.pop(parts[-1], None)
+        return out
+    return project
+
+
+def _writable_parent(doc, path):
+    """Parent dict of a dotted path inside doc, copying nested dicts on the way."""
+    parts = path.split(".")
+    target = doc
+    for part in parts[:-1]:
+        child = target.get(part)
+        child = dict(child) if isinstance(child, dict) else {}
+        target[part] = child
+        target = child
+    return target, parts[-1]
+
+
+def _op_set(target, key, arg):
+    target[key] = arg
+
+
+def _op_unset(target, key, arg):
+    target.pop(key, None)
+
+
+def _op_inc(target, key, arg):
+    target[key] = target.get(key, 0) + arg
+
+
+def _op_min(target, key, arg):
+    if key not in target or _sort_value(arg) < _sort_value(target[key]):
+        target[key] = arg
+
+
+def _op_max(target, key, arg):
+    if key not in target or _sort_value(arg) > _sort_value(target[key]):
+        target[key] = arg
+
+
+def _op_push(target, key, arg):
+    # A new list (pointer copy) so readers of the old document never see it
+    # grow; the log records only the appended tail (see mock_store.patch)
+    each = arg["$each"] if isinstance(arg, dict) and "$each" in arg else [arg]
+    target[key] = list(target.get(key) or []) + list(each)
+
+
+_UPDATE_OPERATORS = {
+    "$set": _op_set,
+    "$unset": _op_unset,
+    "$inc": _op_inc,
+    "$min": _op_min,
+    "$max": _op_max,
+    "$push": _op_push,
+}
+
+
+def _apply_update(doc, update, inserting=False):
+    """Return a copy of doc with a Mongo update document applied."""
+    if not update or not all(op.startswith("$") for op in update):
+        raise OperationFailure("update document must only contain $ operators")
+    new = dict(doc)
+    for op, fields in update.items():
+        if op == "$setOnInsert":
+            if not inserting:
+                continue
+            handler = _op_set
+        else:
+            handler = _UPDATE_OPERATORS.get(op)
+            if handler is None:
+                raise OperationFailure(f"unknown update operator: {op}")
+        for path, arg in fields.items():
+            target, key = _writable_parent(new, path)
+            handler(target, key, arg)
+    return new
+
+
+def _hashable(value) -> bool:
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+def _upsert_base(query):
+    """Seed document for an upsert: the query's equality conditions."""
+    doc = {}
+    for path, cond in query.items():
+        if path.startswith("$"):
+            continue
+        if _is_operator_doc(cond):
+            if "$eq" not in cond:
+                continue
+            cond = cond["$eq"]
+        target, key = _writable_parent(doc, path)
+        target[key] = cond
+    return doc
+
+
+# --------------------
+# Concurrency
+# --------------------
+
+class _RWLock:
+    """Shared lock for readers, exclusive for one writer.
+
+    Waiting writers block new readers so a steady stream of reads cannot
+    starve them. Both sides are reentrant per thread, and the writer may
+    also take the read side (read-modify-write operations do).
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None
+        self._waiting_writers = 0
+        self._local = threading.local()
+
+    @contextmanager
+    def read(self):
+        me = threading.get_ident()
+        depth = getattr(self._local, "reads", 0)
+        if self._writer == me or depth:
+            self._local.reads = depth + 1
+            try:
+                yield
+            finally:
+                self._local.reads = depth
+            return
+        with self._cond:
+            while self._writer is not None or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+        self._local.reads = 1
+        try:
+            yield
+        finally:
+            self._local.reads = 0
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        me = threading.get_ident()
+        if self._writer == me:
+            yield
+            return
+        with self._cond:
+            self._waiting_writers += 1
+            while self._writer is not None or self._readers:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writer = me
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = None
+                self._cond.notify_all()
+
+
+def _writes(method):
+    """Run a MockCollection method under the collection's exclusive lock."""
+    @wraps(method)
+    def locked(self, *args, **kwargs):
+        with self._lock.write():
+            return method(self, *args, **kwargs)
+    return locked
+
+
+class MockCursor:
+    """Lazy result set for MockCollection.find, mirroring pymongo's Cursor.
+
+    Nothing is evaluated until iteration starts. Without a sort, matching
+    documents stream straight from the candidate set; with a sort and a
+    limit only the top skip + limit rows are kept on a heap.
+    """
+
+    def __init__(self, collection, query=None, projection=None):
+        self._collection = collection
+        self._query = query or {}
+        self._project = _compile_projection(projection)
+        self._sort = None
+        self._skip = 0
+        self._limit = 0
+        self._iter = None
+
+    def sort(self, key_or_list, direction=1):
+        if isinstance(key_or_list, str):
+            self._sort = [(key_or_list, direction)]
+        else:
+            self._sort = list(key_or_list)
+        return self
+
+    def skip(self, count):
+        self._skip = count
+        return self
+
+    def limit(self, count):
+        self._limit = count
+        return self
+
+    def batch_size(self, count):
+        return self
+
+    def _rows(self):
+        rows = self._collection._match(self._query)
+        end = self._skip + self._limit if self._limit else None
+        if self._sort:
+            key = _compile_sort(self._sort)
+            if end is not None:
+                rows = iter(heapq.nsmallest(end, rows, key=key))
+            else:
+                rows = iter(sorted(rows, key=key))
+        return map(self._project, islice(rows, self._skip, end))
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._iter is None:
+            self._iter = self._rows()
+        return next(self._iter)
+
+    next = __next__
 
-_client = None
-_db = None
 
 class MockCollection:
-    def __init__(self, name):
+    """In-memory collection with pymongo's CRUD surface.
+
+    Safe to share between threads: writers take the collection's lock
+    exclusively, so each write (and each bulk_write/insert_many batch) is
+    atomic, while readers share it only long enough to collect their
+    candidate documents. Stored documents are never mutated in place
+    (updates swap in a new copy), so cursors iterate them unlocked.
+    """
+
+    def __init__(self, name, store=None):
         self.name = name
         self._data = {}
+        self._indexes = {}
+        self._store = store
+        self._lock = _RWLock()
 
-    def find_one(self, query):
-        for item in self._data.values():
-            if all(item.get(k) == v for k, v in query.items()):
-                return item
-        return None
+    # -- indexes ------------------------------------------------------------
+
+    @_writes
+    def create_index(self, keys, unique=False, sparse=False, **kwargs):
+        """Create an index; accepts the same key spec as pymongo."""
+        if isinstance(keys, (list, tuple)):
+            field = keys[0][0] if isinstance(keys[0], (list, tuple)) else keys[0]
+        else:
+            field = keys
+        name = kwargs.get("name", f"{field}_1")
+        if field == "_id" or field in self._indexes:
+            return name
+        index = _Index(field, unique=unique, sparse=sparse)
+        index.build(self._data.items())
+        self._indexes[field] = index
+        return name
+
+    def _index_doc(self, doc_id, doc):
+        for index in self._indexes.values():
+            index.add(doc_id, doc)
+
+    def _unindex_doc(self, doc_id, doc):
+        for index in self._indexes.values():
+            index.remove(doc_id, doc)
+
+    def _candidates(self, query):
+        """Pick the cheapest set of documents that can satisfy the query."""
+        with self._lock.read():
+            return self._plan_candidates(query)
+
+    def _plan_candidates(self, query):
+        id_cond = query.get("_id")
+        # Direct lookups only for hashable ids; a dict or list _id goes through the predicate
+        if id_cond is not None and not _is_operator_doc(id_cond) and _hashable(id_cond):
+            doc = self._data.get(id_cond)
+            return [doc] if doc is not None else []
+        if _is_operator_doc(id_cond) and isinstance(id_cond.get("$in"), list) and all(map(_hashable, id_cond["$in"])):
+            return [self._data[i] for i in id_cond["$in"] if i in self._data]
+        best = None
+        for field, cond in query.items():
+            index = self._indexes.get(field)
+            if index is None:
+                continue
+            ids = index.plan(cond)
+            if ids is not None and (best is None or len(ids) < len(best)):
+                best = ids
+                if not best:
+                    break
+        if best is None:
+            return list(self._data.values())
+        return [self._data[doc_id] for doc_id in best]
+
+    def _replace(self, item, new):
+        """Swap a stored document for its updated copy, keeping indexes consistent."""
+        doc_id = item["_id"]
+        if new.get("_id") != doc_id:
+            raise OperationFailure("the _id field cannot be changed")
+        self._unindex_doc(doc_id, item)
+        try:
+            for index in self._indexes.values():
+                index.check(doc_id, new)
+        except DuplicateKeyError:
+            self._index_doc(doc_id, item)
+            raise
+        self._data[doc_id] = new
+        self._index_doc(doc_id, new)
+        if self._store is not None:
+            self._store.patch(self.name, item, new)
+        return new
+
+    def _remove(self, item):
+        del self._data[item["_id"]]
+        self._unindex_doc(item["_id"], item)
+        if self._store is not None:
+            self._store.delete(self.name, item["_id"])
+
+    def _upsert(self, query, update):
+        doc = _apply_update(_upsert_base(query), update, inserting=True)
+        self.insert_one(doc)
+        return doc
+
+    # -- reads --------------------------------------------------------------
+
+    def _match(self, query):
+        """Stored documents matching query, lazily, without copying."""
+        if not query:
+            with self._lock.read():
+                return iter(list(self._data.values()))
+        matches = compile_query(query)
+        return (item for item in self._candidates(query) if matches(item))
 
+    def _first(self, query):
+        return next(self._match(query), None)
+
+    def find_one(self, query=None, projection=None):
+        item = self._first(query)
+        return _compile_projection(projection)(item) if item is not None else None
+
+    def find(self, query=None, projection=None):
+        return MockCursor(self, query, projection)
+
+    # -- writes -------------------------------------------------------------
+
+    @_writes
     def insert_one(self, document):
-        doc_id = document.get("_id", str(len(self._data)))
+        doc_id = document.setdefault("_id", str(ObjectId()))
+        if doc_id in self._data:
+            raise DuplicateKeyError(
+                f"E11000 duplicate key error collection index: _id_ dup key: {{ _id: {doc_id!r} }}"
+            )
+        for index in self._indexes.values():
+            index.check(doc_id, document)
         self._data[doc_id] = document
+        self._index_doc(doc_id, document)
+        if self._store is not None:
+            self._store.put(self.name, document)
         return type('obj', (object,), {'inserted_id': doc_id})
 
-    def find(self, query=None):
-        if not query:
-            return list(self._data.values())
-        results = []
-        for item in self._data.values():
-            if all(item.get(k) == v for k, v in query.items()):
-                results.append(item)
-        return results
-
-    def find_one_and_update(self, query, update, return_document=True):
-        item = self.find_one(query)
-        if item and "$set" in update:
-            item.update(update["$set"])
-            return item
-        return None
+    @_writes
+    def insert_many(self, documents, ordered=True):
+        result = self.bulk_write([InsertOne(doc) for doc in documents], ordered=ordered)
+        return InsertManyResult([doc["_id"] for doc in documents if "_id" in doc], result.acknowledged)
+
+    @_writes
+    def find_one_and_update(self, query, update, return_document=True, upsert=False):
+        item = self._first(query)
+        if item is None:
+            if upsert:
+                doc = self._upsert(query, update)
+                return dict(doc) if return_document else None
+            return None
+        new = self._replace(item, _apply_update(item, update))
+        return dict(new) if return_document else dict(item)
 
+    @_writes
     def find_one_and_delete(self, query):
-        item = self.find_one(query)
+        item = self._first(query)
         if item:
-            del self._data[item["_id"]]
+            self._remove(item)
             return item
         return None
-    
-    def update_one(self, query, update):
-        item = self.find_one(query)
-        if item and "$set" in update:
-            item.update(update["$set"])
-            return type('obj', (object,), {'matched_count': 1})
-        return type('obj', (object,), {'matched_count': 0})
-
-    def update_many(self, query, update):
-        items = self.find(query)
+
+    @_writes
+    def update_one(self, query, update, upsert=False):
+        item = self._first(query)
+        if item is None:
+            upserted_id = self._upsert(query, update)["_id"] if upsert else None
+            return type('obj', (object,), {'matched_count': 0, 'modified_count': 0, 'upserted_id': upserted_id})
+        new = self._replace(item, _apply_update(item, update))
+        return type('obj', (object,), {'matched_count': 1, 'modified_count': int(new != item), 'upserted_id': None})
+
+    @_writes
+    def update_many(self, query, update, upsert=False):
+        items = list(self._match(query))
+        if not items and upsert:
+            upserted_id = self._upsert(query, update)["_id"]
+            return type('obj', (object,), {'matched_count': 0, 'modified_count': 0, 'upserted_id': upserted_id})
+        modified = 0
         for item in items:
-            if "$set" in update:
-                item.update(update["$set"])
-        return type('obj', (object,), {'matched_count': len(items)})
+            modified += self._replace(item, _apply_update(item, update)) != item
+        return type('obj', (object,), {'matched_count': len(items), 'modified_count': modified, 'upserted_id': None})
+
+    @_writes
+    def delete_one(self, query):
+        item = self.find_one_and_delete(query)
+        return type('obj', (object,), {'deleted_count': int(item is not None)})
 
+    @_writes
     def delete_many(self, query):
-        items = self.find(query)
+        items = list(self._match(query))
         for item in items:
-            del self._data[item["_id"]]
+            self._remove(item)
         return type('obj', (object,), {'deleted_count': len(items)})
 
+    @_writes
+    def bulk_write(self, requests, ordered=True):
+        """Apply pymongo write models (InsertOne, UpdateOne, ...) as one batch.
+
+        Mirrors Mongo's semantics: ordered batches stop at the first error,
+        unordered ones carry on, and any failures raise BulkWriteError with
+        the per-operation writeErrors and the counts of what did succeed.
+        """
+        summary = {
+            "writeErrors": [], "writeConcernErrors": [], "upserted": [],
+            "nInserted": 0, "nUpserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0,
+        }
+        for i, op in enumerate(requests):
+            try:
+                self._bulk_op(op, i, summary)
+            except (DuplicateKeyError, OperationFailure) as e:
+                summary["writeErrors"].append({
+                    "index": i,
+                    "code": 11000 if isinstance(e, DuplicateKeyError) else (e.code or 2),
+                    "errmsg": str(e),
+                    "op": getattr(op, "_doc", None) or getattr(op, "_filter", None),
+                })
+                if ordered:
+                    break
+        if summary["writeErrors"]:
+            raise BulkWriteError(summary)
+        return BulkWriteResult(summary, True)
+
+    def _bulk_op(self, op, i, summary):
+        if isinstance(op, InsertOne):
+            self.insert_one(op._doc)
+            summary["nInserted"] += 1
+        elif isinstance(op, (UpdateOne, UpdateMany)):
+            update = self.update_one if isinstance(op, UpdateOne) else self.update_many
+            result = update(op._filter, op._doc, upsert=bool(op._upsert))
+            summary["nMatched"] += result.matched_count
+            summary["nModified"] += result.modified_count
+            if result.upserted_id is not None:
+                summary["nUpserted"] += 1
+                summary["upserted"].append({"index": i, "_id": result.upserted_id})
+        elif isinstance(op, DeleteOne):
+            summary["nRemoved"] += self.delete_one(op._filter).deleted_count
+        elif isinstance(op, DeleteMany):
+            summary["nRemoved"] += self.delete_many(op._filter).deleted_count
+        else:
+            raise OperationFailure(f"unsupported bulk operation: {type(op).__name__}")
+
+# Indexes every deployment relies on; seed.py creates the same set.
+INDEXES = {
+    "users": [("email", {"unique": True})],
+    "inventory": [
+        ("category", {}),
+        ([("lastChecked", 1), ("_id", 1)], {}),
+        ([("quantity", 1), ("_id", 1)], {}),
+    ],
+    "alerts": [("severity", {})],
+    "sensor_buckets": [([("siloId", 1), ("bucketStart", 1)], {})],
+    # start alone serves history queries that do not filter by silo
+    "sensor_rollup_1m": [([("siloId", 1), ("start", 1)], {}), ("start", {})],
+    "sensor_rollup_1h": [([("siloId", 1), ("start", 1)], {}), ("start", {})],
+    "sensor_rollup_1d": [([("siloId", 1), ("start", 1)], {}), ("start", {})],
+}
+
+
+def ensure_indexes(database):
+    """Create the standard indexes on a Mongo or Mock database handle."""
+    for collection, specs in INDEXES.items():
+        for keys, options in specs:
+            try:
+                database[collection].create_index(keys, **options)
+            except Exception as e:
+                logging.warning("Could not create index %s.%s: %s", collection, index_label(keys), e)
+
+
+def index_label(keys):
+    """Readable name for an index key spec ("email" or "quantity,_id")."""
+    if isinstance(keys, str):
+        return keys
+    return ",".join(field for field, _ in keys)
+
+
 class MockDB:
-    def __init__(self):
+    """In-memory stand-in for a pymongo Database.
+
+    With ``path`` set, every write is also logged to disk (see
+    mock_store.py) and the collections are reloaded from there on start.
+    """
+
+    name = "agrovault"
+
+    def __init__(self, path=None, commit_interval=0.1, snapshot_bytes=64 << 20):
         self._collections = {}
+        self._collections_lock = threading.Lock()
+        self._store = None
+        if path:
+            self._store = LogStore(path, commit_interval=commit_interval, snapshot_bytes=snapshot_bytes)
+            for name, data in self._store.load().items():
+                collection = MockCollection(name, self._store)
+                collection._data = data
+                self._collections[name] = collection
+            self._store.start(self._capture)
+            atexit.register(self._store.close)
+            logging.info("MockDB loaded from %s: %s", path, self._store.loaded)
 
     def __getattr__(self, name):
-        if name not in self._collections:
-            self._collections[name] = MockCollection(name)
-        return self._collections[name]
+        if name.startswith("_"):
+            raise AttributeError(name)
+        collection = self._collections.get(name)
+        if collection is None:
+            with self._collections_lock:
+                collection = self._collections.get(name)
+                if collection is None:
+                    collection = self._collections[name] = MockCollection(name, self._store)
+        return collection
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+    def _capture(self):
+        return {name: list(c._data.values()) for name, c in list(self._collections.items())}
+
+    def drop_collection(self, name):
+        with self._collections_lock:
+            dropped = self._collections.pop(name, None)
+        if dropped is not None and self._store is not None:
+            with dropped._lock.write():
+                self._store.drop(name)
+
+    def flush(self):
+        """Commit logged writes now instead of waiting for the next group commit."""
+        if self._store is not None:
+            self._store.commit()
+
+    def close(self, compact=False):
+        """Commit (or, with ``compact``, snapshot) and stop the log writer."""
+        if self._store is not None:
+            self._store.close(compact=compact)
+
+    def stats(self) -> dict:
+        result = {"collections": len(self._collections)}
+        result["documents"] = sum(len(c._data) for c in list(self._collections.values()))
+        if self._store is not None:
+            result["store"] = self._store.stats()
+        return result
 
     def command(self, cmd):
         if cmd == "ping":
             return {"ok": 1.0}
         return {}
 
-def get_db():
-    """Return the agrovault database handle, creating the connection on first call."""
-    global _client, _db
-    if _db is None:
-        uri = os.environ.get("MONGO_URI", "mongodb://localhost:27017")
+# --------------------
+# Connection
+# --------------------
+
+_URI_CREDENTIALS = re.compile(r"(?<=://)[^@/]*@")
+
+
+def redact_uri(uri: str) -> str:
+    """The connection string without its user and password, safe to log or report."""
+    return _URI_CREDENTIALS.sub("", uri or "")
+
+
+class _PoolStats(monitoring.ConnectionPoolListener):
+    """Counts pymongo connection pool events for /api/health/monitor."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open = 0
+        self.in_use = 0
+        self.created = 0
+        self.checkouts = 0
+        self.failed_checkouts = 0
+        self.cleared = 0
+
+    def _bump(self, **deltas):
+        with self._lock:
+            for field, delta in deltas.items():
+                setattr(self, field, getattr(self, field) + delta)
+
+    def connection_created(self, event):
+        self._bump(open=1, created=1)
+
+    def connection_closed(self, event):
+        self._bump(open=-1)
+
+    def connection_checked_out(self, event):
+        self._bump(in_use=1, checkouts=1)
+
+    def connection_checked_in(self, event):
+        self._bump(in_use=-1)
+
+    def connection_check_out_failed(self, event):
+        self._bump(failed_checkouts=1)
+
+    def pool_cleared(self, event):
+        self._bump(cleared=1)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "open": self.open,
+                "inUse": self.in_use,
+                "created": self.created,
+                "checkouts": self.checkouts,
+                "failedCheckouts": self.failed_checkouts,
+                "cleared": self.cleared,
+            }
+
+
+class DatabaseMonitor:
+    """Chooses between MongoDB and the MockDB fallback off the request path.
+
+    ``start()`` gives Mongo up to ``startup_wait`` seconds. If it has not
+    answered by then, requests are served from the fallback while a
+    background thread pings every ``check_interval`` seconds and switches
+    to Mongo on the first success. With ``replay_fallback`` the documents
+    written to the fallback are then inserted into Mongo (ones Mongo
+    already has are left alone). Once on Mongo the monitor keeps pinging
+    for /api/health/monitor but never switches back: pymongo reconnects
+    on its own, and a second switch would split the data again.
+    """
+
+    def __init__(self, uri, check_interval=5.0, startup_wait=2.0, replay_fallback=False,
+                 server_timeout=2.0, fallback_factory=None):
+        self.uri = uri
+        self.check_interval = check_interval
+        self.startup_wait = startup_wait
+        self.replay_fallback = replay_fallback
+        self.pool = _PoolStats()
+        self.client = MongoClient(
+            uri,
+            serverSelectionTimeoutMS=int(server_timeout * 1000),
+            connect=False,
+            event_listeners=[self.pool],
+        )
+        self._fallback_factory = fallback_factory or _fallback_from_env
+        self._lock = threading.Lock()
+        self._decided = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._listeners = []
+        self.active = None
+        self.backend = None
+        self.fallback = None
+        self.reachable = False
+        self.last_check = None
+        self.last_error = None
+        self.ping_ms = None
+        self.checks = 0
+        self.failures = 0
+        self.switched_at = None
+        self.replayed = {}
+
+    def add_switch_listener(self, listener):
+        """Call ``listener(database)`` after the backend changes to Mongo."""
+        self._listeners.append(listener)
+
+    def start(self):
+        """Start the monitor and wait at most ``startup_wait`` for Mongo."""
+        if self._thread is not None:
+            return self
+        self._thread = threading.Thread(target=self._run, name="db-monitor", daemon=True)
+        self._thread.start()
+        self._decided.wait(self.startup_wait)
+        with self._lock:
+            if self.active is None:
+                logging.warning(
+                    "MongoDB at %s did not answer within %ss, using Mock Database: %s",
+                    redact_uri(self.uri), self.startup_wait, self.last_error or "no reply yet",
+                )
+                self._use_fallback()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def get(self):
+        database = self.active
+        if database is None:
+            with self._lock:
+                if self.active is None:
+                    self._use_fallback()
+                database = self.active
+        return database
+
+    def _use_fallback(self):
+        self.fallback = self._fallback_factory()
+        ensure_indexes(self.fallback)
+        self.active = self.fallback
+        self.backend = "mock"
+
+    def _run(self):
+        while True:
+            if self._check() and self.backend != "mongo":
+                try:
+                    self._switch()
+                except Exception as e:
+                    logging.exception("Switching to MongoDB failed")
+                    self.last_error = str(e)
+            self._decided.set()
+            if self._stop.wait(self.check_interval):
+                return
+
+    def _check(self):
+        started = time.perf_counter()
         try:
-            # Try to connect with a short timeout
-            _client = MongoClient(uri, serverSelectionTimeoutMS=2000)
-            _client.server_info() # Force connection check
-            _db = _client["agrovault"]
-            logging.info("Connected to MongoDB at %s", uri)
+            self.client.admin.command("ping")
         except Exception as e:
-            logging.warning("Could not connect to MongoDB, using Mock Database: %s", e)
-            _db = MockDB()
-            
-            # Application will start with empty collections
-            logging.info("Mock Database initialized (empty).")
-                
-    return _db
+            self.failures += 1
+            if self.reachable:
+                logging.warning("Lost contact with MongoDB: %s", e)
+            self.reachable = False
+            self.last_error = str(e)[:200]
+        else:
+            self.reachable = True
+            self.last_error = None
+            self.ping_ms = round((time.perf_counter() - started) * 1000, 2)
+        self.checks += 1
+        self.last_check = datetime.utcnow()
+        return self.reachable
+
+    def _switch(self):
+        database = self.client[MockDB.name]
+        ensure_indexes(database)
+        with self._lock:
+            previous, self.active, self.backend = self.active, database, "mongo"
+            self.switched_at = datetime.utcnow()
+        if previous is None:
+            logging.info("Connected to MongoDB at %s", redact_uri(self.uri))
+            return
+        logging.warning("MongoDB at %s is reachable again, switching from the Mock Database", redact_uri(self.uri))
+        if self.replay_fallback:
+            # Requests that grabbed the fallback just before the switch may
+            # still be writing; replaying after it keeps that window short.
+            self.replayed = self._replay(previous, database)
+        for listener in self._listeners:
+            try:
+                listener(database)
+            except Exception:
+                logging.exception("Database switch listener failed")
+
+    @staticmethod
+    def _replay(source, target, batch_size=1000):
+        """Insert the fallback's documents that Mongo does not have yet."""
+        replayed = {}
+        for name in list(source._collections):
+            docs = list(source[name].find({}))
+            inserted = 0
+            for start in range(0, len(docs), batch_size):
+                requests = [
+                    UpdateOne(
+                        {"_id": doc["_id"]},
+                        {"$setOnInsert": {k: v for k, v in doc.items() if k != "_id"}},
+                        upsert=True,
+                    )
+                    for doc in docs[start:start + batch_size]
+                ]
+                try:
+                    inserted += target[name].bulk_write(requests, ordered=False).upserted_count
+                except BulkWriteError as e:
+                    inserted += e.details.get("nUpserted", 0)
+                    logging.warning("Replaying %s: %d documents rejected", name, len(e.details.get("writeErrors", [])))
+            replayed[name] = inserted
+            source.drop_collection(name)
+        logging.info("Replayed fallback writes into MongoDB: %s", replayed)
+        return replayed
+
+    def stats(self) -> dict:
+        result = {
+            "backend": self.backend,
+            "uri": redact_uri(self.uri),
+            "reachable": self.reachable,
+            "lastCheck": self.last_check.isoformat() + "Z" if self.last_check else None,
+            "lastError": self.last_error,
+            "pingMs": self.ping_ms,
+            "checks": self.checks,
+            "failures": self.failures,
+            "checkInterval": self.check_interval,
+            "switchedAt": self.switched_at.isoformat() + "Z" if self.switched_at else None,
+            "replayed": self.replayed,
+            "pool": self.pool.stats(),
+        }
+        if self.fallback is not None:
+            result["fallback"] = self.fallback.stats()
+        return result
+
+
+def _fallback_from_env():
+    path = os.environ.get("MOCKDB_PATH")
+    database = MockDB(
+        path=path,
+        commit_interval=float(os.environ.get("MOCKDB_COMMIT_INTERVAL", "0.1")),
+        snapshot_bytes=int(float(os.environ.get("MOCKDB_SNAPSHOT_MB", "64")) * (1 << 20)),
+    )
+    if path:
+        logging.info("Mock Database persisted at %s.", path)
+    else:
+        # Application will start with empty collections
+        logging.info("Mock Database initialized (empty).")
+    return database
+
+
+def start_db_monitor() -> DatabaseMonitor:
+    """Create (once) and start the process-wide database monitor."""
+    global _monitor
+    with _monitor_lock:
+        if _monitor is None:
+            _monitor = DatabaseMonitor(
+                os.environ.get("MONGO_URI", "mongodb://localhost:27017"),
+                check_interval=float(os.environ.get("MONGO_CHECK_INTERVAL", "5")),
+                startup_wait=float(os.environ.get("MONGO_STARTUP_WAIT", "2")),
+                replay_fallback=os.environ.get("MONGO_REPLAY_FALLBACK", "0") == "1",
+            ).start()
+    return _monitor
+
+
+def get_db():
+    """Return the current database handle; Mongo or the fallback, as chosen by the monitor."""
+    monitor = _monitor or start_db_monitor()
+    return monitor.get()
@@ -0,0 +1,86 @@
+"""In-process publish/subscribe fan-out for server-sent events.
+
+Each connected client owns a bounded queue. Publishing serializes the
+event once and appends it to every queue; a full queue drops its oldest
+event rather than blocking, so a slow browser can never stall the
+request that published.
+"""
+
+import itertools
+import json
+import threading
+from collections import deque
+
+
+class TooManySubscribers(Exception):
+    """Raised when the broker already serves its maximum number of clients."""
+
+
+def format_sse(event_id, event, data) -> str:
+    payload = json.dumps(data, default=str, separators=(",", ":"))
+    return f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n"
+
+
+class Subscription:
+    """One client's bounded, drop-oldest event queue."""
+
+    __slots__ = ("queue", "dropped", "_cond")
+
+    def __init__(self, size):
+        self.queue = deque(maxlen=size)
+        self.dropped = 0
+        self._cond = threading.Condition()
+
+    def push(self, message):
+        with self._cond:
+            if len(self.queue) == self.queue.maxlen:
+                self.dropped += 1
+            self.queue.append(message)
+            self._cond.notify()
+
+    def drain(self, timeout):
+        """Wait up to ``timeout`` seconds for events and take all of them."""
+        with self._cond:
+            if not self.queue:
+                self._cond.wait(timeout)
+            messages = list(self.queue)
+            self.queue.clear()
+        return messages
+
+
+class EventBroker:
+    def __init__(self, queue_size=100, max_subscribers=500):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._subscribers = frozenset()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.published = 0
+
+    def subscribe(self) -> Subscription:
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise TooManySubscribers(f"at most {self.max_subscribers} event streams")
+            subscription = Subscription(self.queue_size)
+            # Copy-on-write so publish() can iterate without taking the lock
+            self._subscribers = self._subscribers | {subscription}
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers = self._subscribers - {subscription}
+
+    def publish(self, event, data):
+        message = format_sse(next(self._ids), event, data)
+        for subscription in self._subscribers:
+            subscription.push(message)
+        self.published += 1
+
+    def stats(self) -> dict:
+        subscribers = self._subscribers
+        return {
+            "subscribers": len(subscribers),
+            "published": self.published,
+            "dropped": sum(s.dropped for s in subscribers),
+            "queueSize": self.queue_size,
+        }
@@ -0,0 +1,94 @@
+"""Process-wide Gemini client for the chat route.
+
+``genai.Client`` owns an HTTP connection pool, so building one per
+request pays connection setup (and TLS) every turn. ``GeminiGateway``
+builds the client once, on first use, and shares it across requests and
+threads. ``use()`` swaps in any object with the same
+``models.generate_content`` / ``models.generate_content_stream`` surface,
+which is how the chat route is exercised offline.
+"""
+
+import os
+import threading
+
+try:
+    from google import genai
+    from google.genai.types import HttpOptions
+except ImportError:
+    genai = None
+    HttpOptions = None
+
+DEFAULT_MODEL = "gemini-2.5-flash"
+
+
+def build_client():
+    """A configured ``genai.Client``, or None if the SDK or API key is missing."""
+    api_key = os.environ.get("GOOGLE_API_KEY") or os.environ.get("GEMINI_API_KEY")
+    if not api_key or genai is None:
+        return None
+    if HttpOptions is not None:
+        return genai.Client(api_key=api_key, http_options=HttpOptions(api_version="v1"))
+    return genai.Client(api_key=api_key)
+
+
+def response_text(response):
+    """Text of a generate_content response or stream chunk, if any."""
+    text = getattr(response, "text", None)
+    if text:
+        return text
+    try:
+        candidates = getattr(response, "candidates", None) or []
+        if candidates and getattr(candidates[0], "content", None):
+            parts = getattr(candidates[0].content, "parts", None) or []
+            if parts and getattr(parts[0], "text", None):
+                return parts[0].text
+    except Exception:
+        return None
+    return None
+
+
+class GeminiGateway:
+    def __init__(self, factory=build_client, model=DEFAULT_MODEL, temperature=0.7, max_output_tokens=1024):
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+        self.model = model
+        self.temperature = temperature
+        self.max_output_tokens = max_output_tokens
+
+    @property
+    def client(self):
+        # Not cached while unconfigured, so setting a key later takes effect
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+        return self._client
+
+    def use(self, client):
+        """Replace the shared client, e.g. with a local stub."""
+        with self._lock:
+            self._client = client
+
+    def _config(self, system_prompt):
+        return {
+            "system_instruction": system_prompt,
+            "temperature": self.temperature,
+            "max_output_tokens": self.max_output_tokens,
+        }
+
+    def generate(self, contents, system_prompt):
+        response = self.client.models.generate_content(
+            model=self.model, contents=contents, config=self._config(system_prompt),
+        )
+        return response_text(response)
+
+    def stream(self, contents, system_prompt):
+        """Yield reply text chunks as the model produces them."""
+        chunks = self.client.models.generate_content_stream(
+            model=self.model, contents=contents, config=self._config(system_prompt),
+        )
+        for chunk in chunks:
+            text = response_text(chunk)
+            if text:
+                yield text
@@ -0,0 +1,239 @@
+"""Write-behind ingestion of IoT sensor readings.
+
+Readings posted to ``/api/sensors/ingest`` are validated, queued in
+memory and flushed in batches by a background thread. Each flush is a
+single unordered ``bulk_write`` of upserts into ``sensor_buckets``, which
+holds one document per silo per hour, so hundreds of sensors reporting
+every few seconds cost one database round-trip per flush rather than one
+per reading. Other consumers (such as the rollup tiers in rollups.py)
+subscribe with ``add_flush_listener`` and see every batch once it is
+stored.
+"""
+
+import atexit
+import json
+import logging
+import math
+import threading
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+SENSOR_METRICS = ("temperature", "humidity", "co2")
+BUCKET_COLLECTION = "sensor_buckets"
+
+
+class IngestQueueFull(Exception):
+    """Raised when accepting a batch would overflow the write-behind queue."""
+
+
+def parse_timestamp(value) -> datetime:
+    """Parse an ISO-8601 string or epoch seconds into an aware UTC datetime."""
+    if isinstance(value, bool):
+        raise ValueError("ts must be an ISO timestamp or epoch seconds")
+    if isinstance(value, (int, float)):
+        try:
+            return datetime.fromtimestamp(value, tz=timezone.utc)
+        except (OverflowError, OSError, ValueError):
+            raise ValueError(f"timestamp {value!r} is out of range") from None
+    if isinstance(value, str):
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            raise ValueError(f"invalid timestamp {value!r}") from None
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.astimezone(timezone.utc)
+    raise ValueError("ts must be an ISO timestamp or epoch seconds")
+
+
+def format_timestamp(ts: datetime) -> str:
+    return ts.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def parse_body(data: bytes, mimetype: str) -> list:
+    """Decode a request body holding a JSON array/object or NDJSON lines."""
+    text = data.decode("utf-8")
+    try:
+        if mimetype == "application/x-ndjson":
+            return [json.loads(line) for line in text.splitlines() if line.strip()]
+        payload = json.loads(text)
+    except json.JSONDecodeError as exc:
+        raise ValueError(f"invalid JSON: {exc}") from None
+    return payload if isinstance(payload, list) else [payload]
+
+
+def validate_reading(raw) -> dict:
+    """Normalize one raw reading; raises ValueError describing what is wrong."""
+    if not isinstance(raw, dict):
+        raise ValueError("reading must be an object")
+    silo_id = raw.get("siloId")
+    if not isinstance(silo_id, str) or not silo_id:
+        raise ValueError("siloId is required")
+    if "ts" not in raw:
+        raise ValueError("ts is required")
+    reading = {"siloId": silo_id, "ts": parse_timestamp(raw["ts"])}
+    for metric in SENSOR_METRICS:
+        value = raw.get(metric)
+        if value is None:
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"{metric} must be a number")
+        if not math.isfinite(value):
+            raise ValueError(f"{metric} must be finite")
+        reading[metric] = float(value)
+    if len(reading) == 2:
+        raise ValueError("reading has no sensor values")
+    return reading
+
+
+def bucket_groups(readings):
+    """Split readings into per silo-hour groups, each sorted by time."""
+    buckets = defaultdict(list)
+    for reading in readings:
+        hour = reading["ts"].replace(minute=0, second=0, microsecond=0)
+        buckets[(reading["siloId"], hour)].append(reading)
+    for group in buckets.values():
+        group.sort(key=lambda r: r["ts"])
+    return list(buckets.values())
+
+
+def bucket_update(group):
+    """The upsert appending one silo-hour group to its bucket."""
+    first = group[0]
+    start = format_timestamp(first["ts"].replace(minute=0, second=0, microsecond=0))
+    rows = [
+        dict({m: r[m] for m in SENSOR_METRICS if m in r}, ts=format_timestamp(r["ts"]))
+        for r in group
+    ]
+    return UpdateOne(
+        {"_id": f"{first['siloId']}:{start}"},
+        {
+            "$setOnInsert": {"siloId": first["siloId"], "bucketStart": start},
+            "$push": {"readings": {"$each": rows}},
+            "$inc": {"count": len(rows)},
+            "$max": {"lastTs": rows[-1]["ts"]},
+        },
+        upsert=True,
+    )
+
+
+def bucket_updates(readings):
+    """Group readings into one upsert per silo-hour bucket."""
+    return [bucket_update(group) for group in bucket_groups(readings)]
+
+
+class SensorIngestBuffer:
+    """In-process write-behind queue for sensor readings.
+
+    A daemon thread flushes every ``flush_interval`` seconds, or sooner once
+    ``flush_size`` readings are waiting. A failed flush puts its readings
+    back at the head of the queue to be retried; when the bulk write fails
+    only partly, just the buckets listed in its ``writeErrors`` go back,
+    since re-running an applied ``$push``/``$inc`` would double it.
+    ``max_queued`` bounds how much can pile up while the database is
+    unreachable.
+    """
+
+    def __init__(self, get_db, flush_size=500, flush_interval=2.0, max_queued=100_000):
+        self._get_db = get_db
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_queued = max_queued
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self.accepted = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.failed_listeners = 0
+        self._flush_listeners = []
+
+    def add_flush_listener(self, listener):
+        """Call ``listener(readings)`` after each successful flush."""
+        self._flush_listeners.append(listener)
+
+    @property
+    def queued(self) -> int:
+        return len(self._pending)
+
+    def submit(self, readings) -> int:
+        """Queue validated readings; returns how many are now waiting."""
+        with self._lock:
+            if len(self._pending) + len(readings) > self.max_queued:
+                raise IngestQueueFull(f"ingest queue is full ({self.max_queued} readings)")
+            self._pending.extend(readings)
+            self.accepted += len(readings)
+            queued = len(self._pending)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="sensor-ingest", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+        if queued >= self.flush_size:
+            self._wake.set()
+        return queued
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logging.exception("Sensor ingest flush failed; will retry")
+
+    def flush(self) -> int:
+        """Write everything queued so far; returns the number of readings written."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            groups = bucket_groups(batch)
+            try:
+                self._get_db()[BUCKET_COLLECTION].bulk_write([bucket_update(g) for g in groups], ordered=False)
+            except BulkWriteError as exc:
+                failed = {error["index"] for error in exc.details.get("writeErrors", [])}
+                retry = [r for i, group in enumerate(groups) if i in failed for r in group]
+                batch = [r for i, group in enumerate(groups) if i not in failed for r in group]
+                with self._lock:
+                    self._pending[:0] = retry
+                self.failed_flushes += 1
+                logging.warning(
+                    "Sensor ingest flush failed for %d of %d buckets; requeued %d readings",
+                    len(failed), len(groups), len(retry),
+                )
+            except Exception:
+                with self._lock:
+                    self._pending[:0] = batch
+                self.failed_flushes += 1
+                raise
+            self.flushed += len(batch)
+            self.flushes += 1
+            # Raw buckets are stored now; a failing listener must not requeue
+            # the batch, or the buckets would be written twice.
+            for listener in self._flush_listeners:
+                try:
+                    listener(batch)
+                except Exception:
+                    self.failed_listeners += 1
+                    logging.exception("Sensor flush listener %r failed", listener)
+            return len(batch)
+
+    def stats(self) -> dict:
+        return {
+            "flushSize": self.flush_size,
+            "flushInterval": self.flush_interval,
+            "maxQueued": self.max_queued,
+            "queued": self.queued,
+            "accepted": self.accepted,
+            "flushed": self.flushed,
+            "flushes": self.flushes,
+            "failedFlushes": self.failed_flushes,
+            "failedListeners": self.failed_listeners,
+        }
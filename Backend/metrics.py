@@ -0,0 +1,350 @@
+"""Per-route request metrics, exported in the Prometheus text format.
+
+Each request thread records into its own shard, so the hot path takes
+no lock: a count, total seconds, response bytes, DB calls and DB
+seconds per (route, method), counts per status, and a latency histogram
+with log-spaced buckets about 10% wide. ``/api/metrics`` merges the
+shards on scrape and reports p50/p95/p99 from the merged histogram.
+Shards of finished threads (the dev server starts one per request) are
+folded into a retired total whenever a new thread registers its shard,
+so the shard list stays as long as the live thread count.
+
+DB time is measured by wrapping the database handle: every collection
+method call, and the iteration of any cursor it returns, is charged to
+the request running on that thread. Requests slower than
+``slow_seconds`` are logged with their query string and per-operation
+DB breakdown.
+"""
+
+import logging
+import math
+import threading
+import time
+
+QUANTILES = (0.5, 0.95, 0.99)
+BUCKET_BASE = 1e-5  # seconds; everything faster lands in bucket 0
+BUCKET_GROWTH = 1.1
+BUCKETS = 200  # 1e-5 * 1.1**199 is about 17 minutes
+REDACTED = {"token", "password", "key", "api_key"}
+
+_LOG_GROWTH = math.log(BUCKET_GROWTH)
+
+
+def bucket_index(seconds):
+    if seconds <= BUCKET_BASE:
+        return 0
+    return min(BUCKETS - 1, math.ceil(math.log(seconds / BUCKET_BASE) / _LOG_GROWTH))
+
+
+def bucket_bound(index):
+    """Upper bound, in seconds, of a histogram bucket."""
+    return BUCKET_BASE * BUCKET_GROWTH ** index
+
+
+def quantile(buckets, count, q):
+    """Estimate the q-quantile from histogram counts (the bucket's upper bound)."""
+    if not count:
+        return 0.0
+    rank = q * count
+    seen = 0
+    for index, n in enumerate(buckets):
+        seen += n
+        if seen >= rank:
+            return bucket_bound(index)
+    return bucket_bound(BUCKETS - 1)
+
+
+class _RouteStats:
+    __slots__ = ("count", "seconds", "bytes", "db_calls", "db_seconds", "statuses", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.bytes = 0
+        self.db_calls = 0
+        self.db_seconds = 0.0
+        self.statuses = {}
+        self.buckets = [0] * BUCKETS
+
+    def merge(self, other):
+        self.count += other.count
+        self.seconds += other.seconds
+        self.bytes += other.bytes
+        self.db_calls += other.db_calls
+        self.db_seconds += other.db_seconds
+        for status, n in list(other.statuses.items()):
+            self.statuses[status] = self.statuses.get(status, 0) + n
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+
+
+class _Request:
+    """DB time charged to the request running on this thread."""
+
+    __slots__ = ("started", "db_calls", "db_seconds", "operations")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_calls = 0
+        self.db_seconds = 0.0
+        self.operations = {}  # "collection.method" -> [calls, seconds]
+
+    def charge(self, operation, seconds, calls=1):
+        self.db_calls += calls
+        self.db_seconds += seconds
+        entry = self.operations.get(operation)
+        if entry is None:
+            self.operations[operation] = [calls, seconds]
+        else:
+            entry[0] += calls
+            entry[1] += seconds
+
+
+class RequestMetrics:
+    def __init__(self, slow_seconds=1.0, prefix="agrovault"):
+        self.slow_seconds = slow_seconds
+        self.prefix = prefix
+        self._local = threading.local()
+        self._shards = []  # (thread, {(route, method): _RouteStats})
+        self._retired = {}
+        self._lock = threading.Lock()  # guards _shards and _retired, never taken per request
+        self.slow_requests = 0
+
+    # -- recording ------------------------------------------------------------
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._retire_dead()
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def _retire_dead(self):
+        """Fold shards of finished threads into the retired total; hold ``_lock``."""
+        live = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                live.append((thread, shard))
+            else:
+                self._fold(self._retired, shard)
+        self._shards = live
+
+    def begin(self):
+        self._local.request = _Request()
+
+    def end(self, route, method, status, size, query=None):
+        current = getattr(self._local, "request", None)
+        if current is None:
+            return
+        self._local.request = None
+        elapsed = time.perf_counter() - current.started
+        shard = self._shard()
+        stats = shard.get((route, method))
+        if stats is None:
+            stats = shard[(route, method)] = _RouteStats()
+        stats.count += 1
+        stats.seconds += elapsed
+        stats.bytes += size
+        stats.db_calls += current.db_calls
+        stats.db_seconds += current.db_seconds
+        stats.statuses[status] = stats.statuses.get(status, 0) + 1
+        stats.buckets[bucket_index(elapsed)] += 1
+        if elapsed >= self.slow_seconds:
+            self.slow_requests += 1
+            self._log_slow(route, method, status, elapsed, query, current)
+
+    def _log_slow(self, route, method, status, elapsed, query, current):
+        params = {k: ("***" if k.lower() in REDACTED else v) for k, v in dict(query or {}).items()}
+        breakdown = ", ".join(
+            f"{op} {calls}x {seconds * 1000:.1f}ms"
+            for op, (calls, seconds) in sorted(current.operations.items(), key=lambda kv: -kv[1][1])
+        )
+        logging.warning(
+            "Slow request: %s %s -> %s in %.1fms, query=%s, db=%d calls %.1fms (%s)",
+            method, route, status, elapsed * 1000, params,
+            current.db_calls, current.db_seconds * 1000, breakdown or "none",
+        )
+
+    def charge(self, operation, seconds, calls=1):
+        current = getattr(self._local, "request", None)
+        if current is not None:
+            current.charge(operation, seconds, calls)
+
+    def database(self, get_db):
+        """Wrap ``get_db`` so collection calls are charged to the current request."""
+        return lambda: _TimedDatabase(get_db(), self)
+
+    # -- export -----------------------------------------------------------------
+
+    def snapshot(self) -> dict:
+        """Merge every shard into {(route, method): _RouteStats}."""
+        with self._lock:
+            self._retire_dead()
+            merged = {}
+            self._fold(merged, self._retired)
+            for _, shard in self._shards:
+                self._fold(merged, shard)
+        return merged
+
+    @staticmethod
+    def _fold(target, shard):
+        for key, stats in list(shard.items()):
+            total = target.get(key)
+            if total is None:
+                total = target[key] = _RouteStats()
+            total.merge(stats)
+
+    def render(self, gauges=()) -> str:
+        """Prometheus text exposition; ``gauges`` adds (name, help, labels, value) samples."""
+        p = self.prefix
+        rows = sorted(self.snapshot().items())
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {p}_{name} {help_text}")
+            lines.append(f"# TYPE {p}_{name} {kind}")
+
+        family("http_requests_total", "counter", "Requests handled, by route, method and status.")
+        for (route, method), s in rows:
+            for status, n in sorted(s.statuses.items()):
+                lines.append(f'{p}_http_requests_total{{{_labels(route, method)},status="{status}"}} {n}')
+
+        family("http_request_duration_seconds", "summary", "Request latency from a log-bucket histogram.")
+        for (route, method), s in rows:
+            labels = _labels(route, method)
+            for q in QUANTILES:
+                value = quantile(s.buckets, s.count, q)
+                lines.append(f'{p}_http_request_duration_seconds{{{labels},quantile="{q}"}} {value:.6f}')
+            lines.append(f"{p}_http_request_duration_seconds_sum{{{labels}}} {s.seconds:.6f}")
+            lines.append(f"{p}_http_request_duration_seconds_count{{{labels}}} {s.count}")
+
+        family("http_response_size_bytes", "summary", "Response body sizes.")
+        for (route, method), s in rows:
+            labels = _labels(route, method)
+            lines.append(f"{p}_http_response_size_bytes_sum{{{labels}}} {s.bytes}")
+            lines.append(f"{p}_http_response_size_bytes_count{{{labels}}} {s.count}")
+
+        family("db_calls_total", "counter", "Database calls made while serving each route.")
+        for (route, method), s in rows:
+            lines.append(f"{p}_db_calls_total{{{_labels(route, method)}}} {s.db_calls}")
+
+        family("db_seconds_total", "counter", "Time spent in database calls while serving each route.")
+        for (route, method), s in rows:
+            lines.append(f"{p}_db_seconds_total{{{_labels(route, method)}}} {s.db_seconds:.6f}")
+
+        family("slow_requests_total", "counter", "Requests slower than the slow-request threshold.")
+        lines.append(f"{p}_slow_requests_total {self.slow_requests}")
+
+        declared = set()
+        for name, help_text, labels, value in gauges:
+            if name not in declared:
+                declared.add(name)
+                family(name, "gauge", help_text)
+            label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+            lines.append(f"{p}_{name}{{{label_text}}} {value}" if label_text else f"{p}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(route, method):
+    return f'route="{_escape(route)}",method="{method}"'
+
+
+# --------------------
+# DB wrappers
+# --------------------
+
+class _TimedDatabase:
+    __slots__ = ("_database", "_metrics")
+
+    def __init__(self, database, metrics):
+        self._database = database
+        self._metrics = metrics
+
+    def __getattr__(self, name):
+        attr = getattr(self._database, name)
+        if name.startswith("_") or not _is_collection(attr):
+            return attr
+        return _TimedCollection(attr, name, self._metrics)
+
+    def __getitem__(self, name):
+        return _TimedCollection(self._database[name], name, self._metrics)
+
+
+def _is_collection(attr):
+    return hasattr(attr, "find") and hasattr(attr, "insert_one")
+
+
+class _TimedCollection:
+    __slots__ = ("_collection", "_name", "_metrics")
+
+    def __init__(self, collection, name, metrics):
+        self._collection = collection
+        self._name = name
+        self._metrics = metrics
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+        operation = f"{self._name}.{name}"
+        metrics = self._metrics
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = attr(*args, **kwargs)
+            finally:
+                metrics.charge(operation, time.perf_counter() - started)
+            if hasattr(result, "__next__"):
+                return _TimedCursor(result, operation, metrics)
+            return result
+
+        return timed
+
+
+class _TimedCursor:
+    """Charges iteration of a lazy cursor to the operation that opened it."""
+
+    __slots__ = ("_cursor", "_operation", "_metrics", "_request", "_entry")
+
+    def __init__(self, cursor, operation, metrics):
+        self._cursor = cursor
+        self._operation = operation
+        self._metrics = metrics
+        # Resolved once so each row costs two additions, not a lookup
+        self._request = getattr(metrics._local, "request", None)
+        self._entry = None
+        if self._request is not None:
+            self._entry = self._request.operations.setdefault(operation, [0, 0.0])
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            return next(self._cursor)
+        finally:
+            if self._entry is not None:
+                elapsed = time.perf_counter() - started
+                self._request.db_seconds += elapsed
+                self._entry[1] += elapsed
+
+    def __getattr__(self, name):
+        attr = getattr(self._cursor, name)
+        if not callable(attr):
+            return attr
+
+        def chained(*args, **kwargs):
+            # Modifiers like sort() and limit() return a cursor; keep it wrapped
+            result = attr(*args, **kwargs)
+            if hasattr(result, "__next__"):
+                return _TimedCursor(result, self._operation, self._metrics)
+            return result
+
+        return chained
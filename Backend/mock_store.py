@@ -0,0 +1,304 @@
+"""Durable storage for MockDB: a write-ahead log plus compacted snapshots.
+
+Every change to a stored document is appended as a physical record:
+the document's new state, its deletion, or a dropped collection. An
+update logs only the top-level fields it changed, and an array that only
+grew (``$push``) logs just its new tail. Appending to a large document,
+such as an hourly sensor bucket, therefore costs the new items rather
+than the whole document again. Records
+are framed as ``<length><crc32><BSON>`` and collected in memory. A
+background thread writes and fsyncs them once per ``commit_interval``,
+so one fsync covers every write in that window (group commit). As with
+Mongo's journal, a write is acknowledged before its commit, and a crash
+loses at most the last interval.
+
+When the log grows past ``snapshot_bytes`` the live documents are
+written to ``snapshot.bin`` in batches of raw BSON. The snapshot records
+the last log segment it covers, so older segments can be deleted.
+Startup maps the snapshot into memory, decodes each batch with one
+``bson.decode_all`` call and then replays only the newer segments.
+Replay stops at the first short or corrupt frame, the torn tail of a
+crash, and truncates it away.
+"""
+
+import glob
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from datetime import timezone
+
+import bson
+from bson.codec_options import CodecOptions
+
+FRAME = struct.Struct("<II")  # payload length, crc32 of payload
+NAME = struct.Struct("<H")  # collection name length in snapshot batches
+SNAPSHOT = "snapshot.bin"
+SNAPSHOT_BATCH = 1000
+CODEC = CodecOptions(tz_aware=True, tzinfo=timezone.utc)
+
+
+def _frame(payload: bytes) -> bytes:
+    return FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def _frames(buffer):
+    """Yield (end offset, payload) for each intact frame, stopping at the first bad one."""
+    offset, size = 0, len(buffer)
+    while offset + FRAME.size <= size:
+        length, crc = FRAME.unpack_from(buffer, offset)
+        end = offset + FRAME.size + length
+        if end > size:
+            return
+        payload = buffer[offset + FRAME.size:end]
+        if zlib.crc32(payload) != crc:
+            return
+        yield end, payload
+        offset = end
+
+
+def _fsync_dir(path):
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+class LogStore:
+    def __init__(self, path, commit_interval=0.1, snapshot_bytes=64 << 20):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.commit_interval = commit_interval
+        self.snapshot_bytes = snapshot_bytes
+        self._lock = threading.Lock()  # guards _pending
+        self._io_lock = threading.Lock()  # orders writes, rotation and snapshots
+        self._pending = []
+        self._file = None
+        self._segment = 0
+        self._capture = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._closed = False
+        self.log_bytes = 0
+        self.commits = 0
+        self.snapshots = 0
+        self.loaded = {}
+
+    # -- paths ----------------------------------------------------------------
+
+    def _segment_path(self, number):
+        return os.path.join(self.path, f"wal-{number:08d}.log")
+
+    def _segments(self):
+        paths = glob.glob(os.path.join(self.path, "wal-*.log"))
+        return sorted(int(os.path.basename(p)[4:12]) for p in paths)
+
+    # -- recovery ---------------------------------------------------------------
+
+    def load(self):
+        """Rebuild {collection: {_id: doc}} from the snapshot and the newer log segments."""
+        started = time.perf_counter()
+        collections, covered = self._load_snapshot()
+        replayed = 0
+        segments = [n for n in self._segments() if n > covered]
+        for position, number in enumerate(segments):
+            path = self._segment_path(number)
+            with open(path, "rb") as f:
+                data = f.read()
+            good = 0
+            for good, payload in _frames(data):
+                self._apply(collections, bson.decode(payload, CODEC))
+                replayed += 1
+            if good < len(data):
+                if position == len(segments) - 1:
+                    logging.warning("Discarding torn tail of %s (%d bytes)", path, len(data) - good)
+                    with open(path, "r+b") as f:
+                        f.truncate(good)
+                else:
+                    logging.error("Corrupt record in %s at byte %d; skipping the rest of it", path, good)
+        for number in self._segments():
+            if number <= covered:
+                os.remove(self._segment_path(number))
+        self._segment = max([covered] + segments)
+        self.loaded = {
+            "documents": sum(len(docs) for docs in collections.values()),
+            "replayedRecords": replayed,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+        return collections
+
+    def _load_snapshot(self):
+        collections, covered = {}, 0
+        path = os.path.join(self.path, SNAPSHOT)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return collections, covered
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # Slicing the map copies one batch at a time; the file is never read whole
+            for _, payload in _frames(mm):
+                (length,) = NAME.unpack_from(payload)
+                if length == 0:
+                    covered = bson.decode(payload[NAME.size:], CODEC)["segment"]
+                    continue
+                name = payload[NAME.size:NAME.size + length].decode("utf-8")
+                docs = collections.setdefault(name, {})
+                for doc in bson.decode_all(payload[NAME.size + length:], CODEC):
+                    docs[doc["_id"]] = doc
+        return collections, covered
+
+    @staticmethod
+    def _apply(collections, record):
+        name, op = record["c"], record["o"]
+        if op == "put":
+            doc = record["d"]
+            collections.setdefault(name, {})[doc["_id"]] = doc
+        elif op == "patch":
+            docs = collections.get(name, {})
+            doc = docs.get(record["i"])
+            if doc is None:
+                return
+            doc = dict(doc, **record.get("s", {}))
+            for key in record.get("u", ()):
+                doc.pop(key, None)
+            for key, tail in record.get("a", {}).items():
+                doc[key] = list(doc.get(key) or []) + tail
+            docs[record["i"]] = doc
+        elif op == "del":
+            collections.get(name, {}).pop(record["i"], None)
+        elif op == "drop":
+            collections.pop(name, None)
+
+    # -- logging ------------------------------------------------------------------
+
+    def start(self, capture):
+        """Open a fresh segment and start group commits; ``capture()`` returns {name: [docs]}."""
+        self._capture = capture
+        self._segment += 1
+        self._file = open(self._segment_path(self._segment), "ab")
+        self._thread = threading.Thread(target=self._run, name="mockdb-wal", daemon=True)
+        self._thread.start()
+
+    def put(self, name, doc):
+        self._append({"c": name, "o": "put", "d": doc})
+
+    def patch(self, name, old, new):
+        """Log an update of ``old`` to ``new`` as the top-level fields that changed."""
+        changed, appended = {}, {}
+        for key, value in new.items():
+            before = old.get(key)
+            if before is value and key in old:
+                continue
+            if (isinstance(before, list) and isinstance(value, list) and len(value) > len(before)
+                    and all(a is b for a, b in zip(before, value))):
+                appended[key] = value[len(before):]
+            else:
+                changed[key] = value
+        removed = [key for key in old if key not in new]
+        record = {"c": name, "o": "patch", "i": new["_id"]}
+        if changed:
+            record["s"] = changed
+        if removed:
+            record["u"] = removed
+        if appended:
+            record["a"] = appended
+        self._append(record)
+
+    def delete(self, name, doc_id):
+        self._append({"c": name, "o": "del", "i": doc_id})
+
+    def drop(self, name):
+        self._append({"c": name, "o": "drop"})
+
+    def _append(self, record):
+        frame = _frame(bson.encode(record))
+        with self._lock:
+            self._pending.append(frame)
+        if self._closed:
+            # Late writes (e.g. other atexit handlers) are committed synchronously
+            self.commit()
+
+    def _run(self):
+        while not self._stop.wait(self.commit_interval):
+            try:
+                self.commit()
+                if self.log_bytes >= self.snapshot_bytes:
+                    self.snapshot()
+            except Exception:
+                logging.exception("MockDB log commit failed")
+
+    def commit(self):
+        """Write and fsync everything appended so far."""
+        with self._io_lock:
+            with self._lock:
+                frames, self._pending = self._pending, []
+            self._write(frames)
+
+    def _write(self, frames):
+        if frames and self._file is not None:
+            data = b"".join(frames)
+            self._file.write(data)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.log_bytes += len(data)
+            self.commits += 1
+
+    # -- compaction ---------------------------------------------------------------
+
+    def snapshot(self):
+        """Write the live documents to a new snapshot and drop the log it replaces."""
+        with self._io_lock:
+            with self._lock:
+                # Appends wait here, so the capture matches exactly the log so far
+                state = self._capture()
+                frames, self._pending = self._pending, []
+            self._write(frames)
+            covered = self._segment
+            self._file.close()
+            self._segment += 1
+            self._file = open(self._segment_path(self._segment), "ab")
+            self.log_bytes = 0
+
+        tmp = os.path.join(self.path, SNAPSHOT + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(_frame(NAME.pack(0) + bson.encode({"segment": covered})))
+            for name, docs in state.items():
+                encoded = name.encode("utf-8")
+                for start in range(0, len(docs), SNAPSHOT_BATCH):
+                    body = b"".join(bson.encode(doc) for doc in docs[start:start + SNAPSHOT_BATCH])
+                    f.write(_frame(NAME.pack(len(encoded)) + encoded + body))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(self.path, SNAPSHOT))
+        _fsync_dir(self.path)
+        for number in self._segments():
+            if number <= covered:
+                os.remove(self._segment_path(number))
+        self.snapshots += 1
+
+    def close(self, compact=False):
+        """Stop the commit thread; the segment stays open for synchronous late writes."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if compact:
+            self.snapshot()
+        else:
+            self.commit()
+        self._closed = True
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "segment": self._segment,
+            "logBytes": self.log_bytes,
+            "pendingRecords": len(self._pending),
+            "commits": self.commits,
+            "snapshots": self.snapshots,
+            "commitInterval": self.commit_interval,
+            "loaded": self.loaded,
+        }
@@ -0,0 +1,112 @@
+"""Password hashing on a bounded process pool.
+
+scrypt/pbkdf2 are deliberately slow (tens of milliseconds of CPU each),
+so running them on request threads lets a burst of logins starve every
+other route. ``PasswordHasher`` sends them to a
+small process pool instead, caps how many may be pending and raises
+``HasherBusy`` rather than queueing without bound; a job that outlives
+``timeout`` also surfaces as ``HasherBusy``. If the pool breaks, hashing
+runs inline for ``retry_after`` seconds before the pool is rebuilt, so a
+pool that cannot start is not respawned on every login. ``workers=0``
+hashes inline on the calling thread.
+"""
+
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HasherBusy(Exception):
+    """Raised when the hashing pool already has ``max_pending`` jobs or a job timed out."""
+
+
+def hash_params(hashed: str) -> str:
+    """The method/cost prefix of a werkzeug hash, e.g. ``scrypt:32768:8:1``."""
+    return hashed.split("$", 1)[0]
+
+
+class PasswordHasher:
+    def __init__(self, workers=2, max_pending=32, method="scrypt", timeout=30.0, retry_after=30.0):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.method = method
+        self.timeout = timeout
+        self.retry_after = retry_after
+        # Learn the full parameter string (werkzeug fills in default costs)
+        self.params = hash_params(generate_password_hash("", method=method))
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._broken_until = 0.0  # monotonic time before which the pool is not rebuilt
+        self.rejected = 0
+        self.timeouts = 0
+        self.broken = 0
+
+    def _executor(self):
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn: forking a threaded server process is unsafe
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._pool
+
+    def _run(self, fn, *args):
+        if self.workers <= 0:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HasherBusy("Password hashing is saturated")
+        try:
+            if time.monotonic() < self._broken_until:
+                return fn(*args)
+            future = self._executor().submit(fn, *args)
+            try:
+                return future.result(timeout=self.timeout)
+            except TimeoutError:
+                future.cancel()
+                self.timeouts += 1
+                raise HasherBusy("Password hashing timed out") from None
+        except BrokenProcessPool:
+            # A worker died (or could not start); answer inline until the backoff ends
+            logging.warning(
+                "Password hashing pool broke; hashing inline for %.0fs before rebuilding it", self.retry_after,
+            )
+            self.broken += 1
+            self._broken_until = time.monotonic() + self.retry_after
+            self.shutdown()
+            return fn(*args)
+        finally:
+            self._slots.release()
+
+    def hash(self, password: str) -> str:
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, hashed: str, password: str) -> bool:
+        return self._run(check_password_hash, hashed, password)
+
+    def needs_rehash(self, hashed: str) -> bool:
+        return hash_params(hashed) != self.params
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "method": self.params,
+            "maxPending": self.max_pending,
+            "pending": self.max_pending - self._slots._value,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "broken": self.broken,
+            "inline": time.monotonic() < self._broken_until,
+        }
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
@@ -0,0 +1,150 @@
+"""Server-side cache of serialized JSON responses with strong ETags.
+
+Cached views store the exact response bytes (and a gzipped copy) keyed
+by path, query string, Accept header and the caller's role. A hit
+skips the database and serialization entirely. The gzip and identity
+bodies carry different strong ETags (the gzip one ends in ``-gz``), so a
+validator never names bytes other than the ones it was sent with. A
+client sending a matching ``If-None-Match`` gets ``304 Not Modified``
+with no body.
+Entries expire after a per-route TTL, and mutating routes invalidate
+them early by tag.
+"""
+
+import gzip
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, current_app, request
+
+GZIP_MIN_BYTES = 512
+
+
+class _Entry:
+    __slots__ = ("expires", "etag", "body", "gzipped", "mimetype", "tags")
+
+    def __init__(self, expires, etag, body, gzipped, mimetype, tags):
+        self.expires = expires
+        self.etag = etag
+        self.body = body
+        self.gzipped = gzipped
+        self.mimetype = mimetype
+        self.tags = tags
+
+
+class ResponseCache:
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._tags = {}  # tag -> set of keys
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _key(self):
+        role = getattr(request, "current_user_role", None)
+        return (request.path, request.query_string, request.headers.get("Accept", ""), role)
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires < time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def _put(self, key, entry):
+        with self._lock:
+            self.misses += 1
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = entry
+            for tag in entry.tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+
+    def invalidate(self, *tags):
+        """Drop every entry carrying any of the given tags."""
+        with self._lock:
+            for tag in tags:
+                for key in self._tags.pop(tag, set()):
+                    if key in self._entries:
+                        self._drop(key)
+                        self.invalidations += 1
+
+    def cached(self, ttl, tags=()):
+        """Cache a JSON view for ``ttl`` seconds; place it below ``token_required``."""
+        tags = tuple(tags)
+
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                key = self._key()
+                entry = self._get(key)
+                if entry is None:
+                    response = current_app.make_response(view(*args, **kwargs))
+                    if response.status_code != 200 or response.is_streamed:
+                        return response
+                    body = response.get_data()
+                    entry = _Entry(
+                        expires=time.monotonic() + ttl,
+                        etag=hashlib.sha1(body).hexdigest(),
+                        body=body,
+                        gzipped=gzip.compress(body, 6) if len(body) >= GZIP_MIN_BYTES else None,
+                        mimetype=response.mimetype,
+                        tags=tags,
+                    )
+                    self._put(key, entry)
+                return self._respond(entry)
+            return wrapper
+        return decorator
+
+    def _respond(self, entry):
+        gzipped = entry.gzipped is not None and "gzip" in request.accept_encodings
+        etag = entry.etag + "-gz" if gzipped else entry.etag
+        if etag in request.if_none_match:
+            with self._lock:
+                self.not_modified += 1
+            response = Response(status=304)
+        elif gzipped:
+            response = Response(entry.gzipped, mimetype=entry.mimetype)
+            response.headers["Content-Encoding"] = "gzip"
+        else:
+            response = Response(entry.body, mimetype=entry.mimetype)
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "private, no-cache"
+        response.vary.add("Accept-Encoding")
+        response.vary.add("Authorization")
+        return response
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = sum(len(e.body) + len(e.gzipped or b"") for e in self._entries.values())
+            return {
+                "entries": len(self._entries),
+                "bytes": size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "notModified": self.not_modified,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
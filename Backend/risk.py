@@ -0,0 +1,288 @@
+"""Spoilage risk scoring for inventory batches (Features-List §6).
+
+Every batch is a row in a set of NumPy columns: temperature, humidity,
+storage start and a category index. The category index selects the
+per-category coefficients (ideal ranges, shelf life, sensitivity), so
+all batches are scored in a few vectorized expressions:
+
+    temp  = min(distance outside the ideal temperature range / 5°C, 1)
+    hum   = min(distance outside the ideal humidity range / 15%, 1)
+    age   = min(days stored / shelf life, 1)
+    score = clip(100 * sensitivity * (0.4 temp + 0.3 hum + 0.3 age), 0, 100)
+
+The environmental part only changes when a batch is written or its
+silo reports new readings, so those rows are rescored on their own. The
+age term depends on the clock and is refreshed for every row at most
+once per ``AGE_REFRESH_SECONDS``.
+"""
+
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+CATEGORY_PROFILES = {
+    # category: (temp low, temp high, humidity low, humidity high, shelf life days, sensitivity)
+    "Grains": (10.0, 25.0, 40.0, 65.0, 365.0, 1.0),
+    "Oilseeds": (10.0, 25.0, 40.0, 60.0, 270.0, 1.1),
+    "Fruits": (0.0, 4.0, 85.0, 95.0, 60.0, 1.3),
+    "Vegetables": (4.0, 10.0, 80.0, 95.0, 120.0, 1.2),
+    "Fibers": (10.0, 30.0, 35.0, 55.0, 730.0, 0.8),
+}
+DEFAULT_PROFILE = (5.0, 25.0, 40.0, 70.0, 180.0, 1.0)
+
+WEIGHTS = (0.4, 0.3, 0.3)
+TEMP_SCALE = 5.0
+HUMIDITY_SCALE = 15.0
+HIGH_RISK = 65.0
+MEDIUM_RISK = 35.0
+AGE_REFRESH_SECONDS = 60.0
+
+
+def _epoch(iso):
+    if not iso:
+        return np.nan
+    try:
+        return datetime.fromisoformat(str(iso).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return np.nan
+
+
+def _number(value):
+    """Float for the score arrays; anything that is not a number becomes NaN."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return np.nan
+    return float(value)
+
+
+def risk_level(score: float) -> str:
+    if score >= HIGH_RISK:
+        return "high"
+    if score >= MEDIUM_RISK:
+        return "medium"
+    return "low"
+
+
+class RiskScorer:
+    """Column store of inventory risk inputs with incremental rescoring."""
+
+    def __init__(self, capacity=1024):
+        self._lock = threading.RLock()
+        self._categories = list(CATEGORY_PROFILES) + [None]
+        profiles = [CATEGORY_PROFILES[c] for c in CATEGORY_PROFILES] + [DEFAULT_PROFILE]
+        self._profiles = np.array(profiles, dtype=np.float64)
+        self._size = 0
+        self._allocate(capacity)
+        self._ids = []
+        self._row = {}  # _id -> row
+        self._meta = []  # (name, category, location) per row
+        self._by_location = {}  # location -> set of rows
+        self._silo_locations = {}  # siloId -> location name
+        self._age_scored_at = 0.0
+        self.built = False
+
+    # -- storage ------------------------------------------------------------
+
+    def _allocate(self, capacity):
+        old = getattr(self, "temperature", None)
+        columns = {
+            "temperature": np.float64, "humidity": np.float64, "stored": np.float64,
+            "category": np.int16, "env": np.float64, "age": np.float64, "score": np.float64,
+        }
+        for name, dtype in columns.items():
+            fresh = np.zeros(capacity, dtype=dtype)
+            if old is not None:
+                fresh[:self._size] = getattr(self, name)[:self._size]
+            setattr(self, name, fresh)
+
+    def _category_index(self, category):
+        try:
+            return self._categories.index(category)
+        except ValueError:
+            return len(self._categories) - 1
+
+    def load(self, docs, silo_locations=None):
+        """Replace all rows with the given inventory documents and score them.
+
+        ``silo_locations`` maps sensor siloIds to the location names used on
+        inventory documents ("silo-a" -> "Silo A").
+        """
+        with self._lock:
+            self._silo_locations = dict(silo_locations or {})
+            self._size = 0
+            self._ids, self._row, self._meta, self._by_location = [], {}, [], {}
+            for doc in docs:
+                self._put(doc)
+            self.built = True
+            self.score_all()
+
+    def _put(self, doc):
+        row = self._row.get(doc["_id"])
+        if row is None:
+            row = self._size
+            if row == len(self.temperature):
+                self._allocate(max(1024, 2 * row))
+            self._size += 1
+            self._row[doc["_id"]] = row
+            self._ids.append(doc["_id"])
+            self._meta.append(None)
+        else:
+            self._by_location.get(self._meta[row][2], set()).discard(row)
+        self.temperature[row] = _number(doc.get("temperature"))
+        self.humidity[row] = _number(doc.get("humidity"))
+        self.stored[row] = _epoch(doc.get("storedSince") or doc.get("lastChecked"))
+        self.category[row] = self._category_index(doc.get("category"))
+        self._meta[row] = (doc.get("name"), doc.get("category"), doc.get("location"))
+        self._by_location.setdefault(doc.get("location"), set()).add(row)
+        return row
+
+    # -- scoring ------------------------------------------------------------
+
+    def _score_rows(self, rows, now):
+        """Recompute env, age and score for the given row indices (or a slice)."""
+        p = self._profiles[self.category[rows]]
+        t, h = self.temperature[rows], self.humidity[rows]
+        temp_dev = np.maximum(np.maximum(p[:, 0] - t, t - p[:, 1]), 0.0)
+        hum_dev = np.maximum(np.maximum(p[:, 2] - h, h - p[:, 3]), 0.0)
+        env = (
+            WEIGHTS[0] * np.minimum(np.nan_to_num(temp_dev) / TEMP_SCALE, 1.0)
+            + WEIGHTS[1] * np.minimum(np.nan_to_num(hum_dev) / HUMIDITY_SCALE, 1.0)
+        )
+        self.env[rows] = env
+        self._score_age(rows, now, p[:, 4], p[:, 5])
+
+    def _score_age(self, rows, now, shelf_life=None, sensitivity=None):
+        if shelf_life is None:
+            p = self._profiles[self.category[rows]]
+            shelf_life, sensitivity = p[:, 4], p[:, 5]
+        days = np.nan_to_num((now - self.stored[rows]) / 86400.0)
+        self.age[rows] = WEIGHTS[2] * np.clip(days / shelf_life, 0.0, 1.0)
+        self.score[rows] = np.clip(100.0 * sensitivity * (self.env[rows] + self.age[rows]), 0.0, 100.0)
+
+    def score_all(self, now=None):
+        with self._lock:
+            now = time.time() if now is None else now
+            self._score_rows(slice(0, self._size), now)
+            self._age_scored_at = now
+
+    def _refresh_age(self):
+        now = time.time()
+        if now - self._age_scored_at > AGE_REFRESH_SECONDS:
+            self._score_age(slice(0, self._size), now)
+            self._age_scored_at = now
+
+    # -- incremental updates -------------------------------------------------
+
+    def upsert(self, doc):
+        """Rescore one inventory document after a create or update."""
+        with self._lock:
+            if not self.built:
+                return
+            row = self._put(doc)
+            self._score_rows(np.array([row]), time.time())
+
+    def upsert_many(self, docs):
+        """Rescore several documents with one vectorized pass (bulk writes)."""
+        with self._lock:
+            if not self.built:
+                return
+            rows = [self._put(doc) for doc in docs]
+            if rows:
+                self._score_rows(np.array(rows), time.time())
+
+    def remove(self, item_id):
+        with self._lock:
+            row = self._row.pop(item_id, None)
+            if row is None:
+                return
+            last = self._size - 1
+            self._by_location.get(self._meta[row][2], set()).discard(row)
+            if row != last:
+                # Move the last row into the hole so the columns stay dense
+                moved = self._ids[last]
+                for name in ("temperature", "humidity", "stored", "category", "env", "age", "score"):
+                    column = getattr(self, name)
+                    column[row] = column[last]
+                self._ids[row] = moved
+                self._meta[row] = self._meta[last]
+                self._row[moved] = row
+                location_rows = self._by_location.get(self._meta[row][2], set())
+                location_rows.discard(last)
+                location_rows.add(row)
+            self._ids.pop()
+            self._meta.pop()
+            self._size = last
+
+    def apply_conditions(self, location, temperature=None, humidity=None):
+        """New sensor values for a storage location; rescores only its batches."""
+        with self._lock:
+            rows = self._by_location.get(location)
+            if not self.built or not rows:
+                return 0
+            rows = np.fromiter(rows, np.int64, len(rows))
+            if temperature is not None:
+                self.temperature[rows] = temperature
+            if humidity is not None:
+                self.humidity[rows] = humidity
+            self._score_rows(rows, time.time())
+            return len(rows)
+
+    def apply_readings(self, readings):
+        """Fold an ingest batch in: each silo's newest values rescore its batches."""
+        newest = {}
+        for reading in readings:
+            current = newest.get(reading["siloId"])
+            if current is None or reading["ts"] >= current["ts"]:
+                newest[reading["siloId"]] = reading
+        rescored = 0
+        for silo_id, reading in newest.items():
+            location = self._silo_locations.get(silo_id, silo_id)
+            rescored += self.apply_conditions(location, reading.get("temperature"), reading.get("humidity"))
+        return rescored
+
+    # -- queries ------------------------------------------------------------
+
+    def top(self, limit=50, level=None, category=None):
+        """Highest-risk batches plus a low/medium/high summary of all rows."""
+        with self._lock:
+            self._refresh_age()
+            scores = self.score[:self._size]
+            summary = {
+                "total": int(self._size),
+                "high": int(np.count_nonzero(scores >= HIGH_RISK)),
+                "medium": int(np.count_nonzero((scores >= MEDIUM_RISK) & (scores < HIGH_RISK))),
+            }
+            summary["low"] = summary["total"] - summary["high"] - summary["medium"]
+
+            mask = np.ones(self._size, dtype=bool)
+            if category is not None:
+                mask &= self.category[:self._size] == self._category_index(category)
+                if category not in CATEGORY_PROFILES:
+                    mask &= np.array([m[1] == category for m in self._meta], dtype=bool)
+            if level is not None:
+                bounds = {
+                    "high": (HIGH_RISK, np.inf),
+                    "medium": (MEDIUM_RISK, HIGH_RISK),
+                    "low": (-np.inf, MEDIUM_RISK),
+                }[level]
+                mask &= (scores >= bounds[0]) & (scores < bounds[1])
+            candidates = np.flatnonzero(mask)
+            if len(candidates) > limit:
+                part = np.argpartition(-scores[candidates], limit - 1)[:limit]
+                candidates = candidates[part]
+            candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+            items = []
+            for row in candidates:
+                name, category_name, location = self._meta[row]
+                score = round(float(scores[row]), 1)
+                items.append({
+                    "_id": self._ids[row],
+                    "name": name,
+                    "category": category_name,
+                    "location": location,
+                    "score": score,
+                    "level": risk_level(score),
+                })
+            return {"items": items, "summary": summary}
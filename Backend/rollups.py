@@ -0,0 +1,135 @@
+"""Pre-aggregated rollup tiers for sensor history.
+
+Every ingest flush folds its readings into per-silo min/max/sum/count
+aggregates at 1-minute, 1-hour and 1-day resolution. The aggregates
+are decomposable, so each tier is updated straight from the batch with
+``$min``/``$max``/``$inc`` upserts, with no re-reading. Range queries
+then read the coarsest tier that divides the requested bucket, so a
+90-day chart at 1h resolution reads about 2,000 rows per silo instead
+of every raw point.
+"""
+
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from pymongo import UpdateOne
+
+from ingest import SENSOR_METRICS, format_timestamp
+
+# tier name -> (collection, period in seconds), finest first
+ROLLUP_TIERS = {
+    "1m": ("sensor_rollup_1m", 60),
+    "1h": ("sensor_rollup_1h", 3600),
+    "1d": ("sensor_rollup_1d", 86400),
+}
+
+BUCKET_SIZES = {
+    "1m": 60,
+    "5m": 300,
+    "15m": 900,
+    "1h": 3600,
+    "6h": 21600,
+    "1d": 86400,
+}
+
+MAX_POINTS = 5000
+
+
+def _floor(epoch: int, period: int) -> int:
+    return epoch - epoch % period
+
+
+def _iso(epoch: int) -> str:
+    return format_timestamp(datetime.fromtimestamp(epoch, tz=timezone.utc))
+
+
+def rollup_updates(readings):
+    """Map each tier collection to the upserts folding readings into it."""
+    ops = {}
+    for collection, period in ROLLUP_TIERS.values():
+        groups = defaultdict(dict)
+        for reading in readings:
+            start = _floor(int(reading["ts"].timestamp()), period)
+            aggregates = groups[(reading["siloId"], start)]
+            for metric in SENSOR_METRICS:
+                value = reading.get(metric)
+                if value is None:
+                    continue
+                agg = aggregates.get(metric)
+                if agg is None:
+                    aggregates[metric] = [value, value, value, 1]
+                else:
+                    agg[0] = min(agg[0], value)
+                    agg[1] = max(agg[1], value)
+                    agg[2] += value
+                    agg[3] += 1
+
+        ops[collection] = []
+        for (silo_id, start), aggregates in groups.items():
+            iso = _iso(start)
+            update = {
+                "$setOnInsert": {"siloId": silo_id, "start": iso},
+                "$min": {}, "$max": {}, "$inc": {},
+            }
+            for metric, (low, high, total, count) in aggregates.items():
+                update["$min"][f"{metric}.min"] = low
+                update["$max"][f"{metric}.max"] = high
+                update["$inc"][f"{metric}.sum"] = total
+                update["$inc"][f"{metric}.count"] = count
+            ops[collection].append(UpdateOne({"_id": f"{silo_id}:{iso}"}, update, upsert=True))
+    return ops
+
+
+def write_rollups(database, readings):
+    for collection, ops in rollup_updates(readings).items():
+        if ops:
+            database[collection].bulk_write(ops, ordered=False)
+
+
+def tier_for(bucket_seconds: int):
+    """Coarsest tier whose period evenly divides the bucket size."""
+    best = None
+    for collection, period in ROLLUP_TIERS.values():
+        if period <= bucket_seconds and bucket_seconds % period == 0:
+            best = (collection, period)
+    return best
+
+
+def query_rollups(database, silos, start: datetime, end: datetime, bucket_seconds: int):
+    """Downsampled history as ``{metric: [{time, <silo>, <silo>Min, <silo>Max}]}``.
+
+    ``<silo>`` holds the bucket average so rows stay compatible with the
+    ``{time, siloA, siloB, ...}`` series the charts already plot.
+    """
+    collection, _ = tier_for(bucket_seconds)
+    query = {"start": {"$gte": format_timestamp(start), "$lt": format_timestamp(end)}}
+    if silos:
+        query["siloId"] = {"$in": list(silos)}
+
+    # (metric, bucket start) -> silo -> [min, max, sum, count]
+    merged = defaultdict(dict)
+    for row in database[collection].find(query):
+        epoch = int(datetime.fromisoformat(row["start"].replace("Z", "+00:00")).timestamp())
+        bucket = _floor(epoch, bucket_seconds)
+        for metric in SENSOR_METRICS:
+            agg = row.get(metric)
+            if not agg:
+                continue
+            acc = merged[(metric, bucket)].get(row["siloId"])
+            if acc is None:
+                merged[(metric, bucket)][row["siloId"]] = [agg["min"], agg["max"], agg["sum"], agg["count"]]
+            else:
+                acc[0] = min(acc[0], agg["min"])
+                acc[1] = max(acc[1], agg["max"])
+                acc[2] += agg["sum"]
+                acc[3] += agg["count"]
+
+    series = {metric: [] for metric in SENSOR_METRICS}
+    for (metric, bucket) in sorted(merged, key=lambda k: k[1]):
+        row = {"time": _iso(bucket)}
+        for silo_id, (low, high, total, count) in merged[(metric, bucket)].items():
+            row[silo_id] = round(total / count, 2)
+            row[f"{silo_id}Min"] = low
+            row[f"{silo_id}Max"] = high
+        series[metric].append(row)
+    return series
@@ -3,17 +3,27 @@ Seed script — populates the agrovault MongoDB database from mock_data.py.
 
 Usage:
     python seed.py
-
-Idempotent: drops each collection before inserting.
+    python seed.py --scale 100 [--workers 8] [--seed 42] [--days 90] [--interval 300]
+    python seed.py --scale 1 --target mock
+
+Idempotent: drops each collection before inserting. ``--scale N`` adds
+deterministic synthetic warehouses, silos, inventory, alerts and sensor
+history in place of the demo ones (see synthetic.py; N=100 is 1M
+inventory batches). ``--target mock`` seeds the MockDB persisted at
+MOCKDB_PATH (without it the data is discarded on exit, which is only
+useful for timing the generator).
 """
 
+import argparse
 import os
 import sys
+import time
 
 from dotenv import load_dotenv
 from pymongo import MongoClient, ASCENDING
 from werkzeug.security import generate_password_hash
 
+from db import INDEXES, MockDB, ensure_indexes, index_label
 from mock_data import (
     MOCK_INVENTORY,
     MOCK_SENSOR_READINGS,
@@ -28,9 +38,7 @@ from mock_data import (
 
 load_dotenv()
 
-uri = os.environ.get("MONGO_URI", "mongodb://localhost:27017")
-client = MongoClient(uri)
-db = client["agrovault"]
+db = None
 
 # ── helpers ──────────────────────────────────────────────────────────────────
 
@@ -53,7 +61,27 @@ def seed_single_doc(name, doc, doc_id="current"):
 
 # ── seed ─────────────────────────────────────────────────────────────────────
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Seed the agrovault database.")
+    parser.add_argument("--scale", type=float, default=0, help="synthetic data scale (0 = demo records only)")
+    parser.add_argument("--target", choices=("mongo", "mock"), default="mongo")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=90, help="days of sensor history")
+    parser.add_argument("--interval", type=int, default=300, help="seconds between sensor readings")
+    parser.add_argument("--minute-days", type=int, default=7, help="days of 1-minute rollups to keep")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    global db
+    args = parse_args(argv)
+    if args.target == "mock":
+        db = MockDB(path=os.environ.get("MOCKDB_PATH"))
+    else:
+        db = MongoClient(os.environ.get("MONGO_URI", "mongodb://localhost:27017"))["agrovault"]
+
     print("Seeding agrovault database...")
 
     # Users (demo accounts with hashed passwords)
@@ -96,14 +124,30 @@ def main():
     # Warehouses — preserve string _id
     seed_collection("warehouses", [dict(d) for d in MOCK_WAREHOUSE_DIRECTORY])
 
+    if args.scale > 0:
+        from synthetic import generate
+
+        print(f"\nGenerating synthetic data at scale {args.scale:g}...")
+        started = time.perf_counter()
+        counts = generate(
+            db, args.scale, seed=args.seed, workers=args.workers, batch_size=args.batch_size,
+            days=args.days, interval=args.interval, minute_days=args.minute_days,
+        )
+        for name, count in sorted(counts.items()):
+            print(f"  {name}: {count:,} docs")
+        print(f"  total: {sum(counts.values()):,} docs in {time.perf_counter() - started:.1f}s")
+
     # ── indexes ──────────────────────────────────────────────────────────────
     print("\nCreating indexes...")
-    db.users.create_index("email", unique=True)
-    db.inventory.create_index("category")
-    db.alerts.create_index("severity")
-    print("  users.email (unique)")
-    print("  inventory.category")
-    print("  alerts.severity")
+    ensure_indexes(db)
+    for collection, specs in INDEXES.items():
+        for keys, options in specs:
+            suffix = " (unique)" if options.get("unique") else ""
+            print(f"  {collection}.{index_label(keys)}{suffix}")
+
+    if isinstance(db, MockDB):
+        # Leave a compacted snapshot so the app starts without replaying the log
+        db.close(compact=True)
 
     print(f"\nDone — 10 collections seeded in '{db.name}'.")
 
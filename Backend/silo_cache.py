@@ -0,0 +1,147 @@
+"""In-memory cache of the latest sensor state per silo.
+
+Each silo keeps its last N readings in a fixed-size ring backed by
+``array`` buffers (epoch seconds as doubles, metrics as 32-bit floats),
+fed directly by the ingest route. ``/api/sensors/silos`` merges the
+newest reading into the silo status documents, which are reloaded from
+the database at most once per staleness window. A silo whose newest
+reading is older than that window falls back to the stored values.
+"""
+
+import math
+import sys
+import threading
+import time
+from array import array
+from datetime import datetime, timezone
+
+from ingest import SENSOR_METRICS, format_timestamp
+
+
+class SiloRing:
+    """Fixed-capacity ring of readings for one silo."""
+
+    __slots__ = ("silo_id", "capacity", "ts", "temperature", "humidity", "co2", "_head", "_size")
+
+    def __init__(self, silo_id, capacity):
+        self.silo_id = silo_id
+        self.capacity = capacity
+        self.ts = array("d", [0.0]) * capacity
+        self.temperature = array("f", [math.nan]) * capacity
+        self.humidity = array("f", [math.nan]) * capacity
+        self.co2 = array("f", [math.nan]) * capacity
+        self._head = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, ts, temperature=None, humidity=None, co2=None):
+        i = self._head
+        self.ts[i] = ts
+        self.temperature[i] = math.nan if temperature is None else temperature
+        self.humidity[i] = math.nan if humidity is None else humidity
+        self.co2[i] = math.nan if co2 is None else co2
+        self._head = (i + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def latest(self):
+        """Newest timestamp plus the newest non-missing value of each metric."""
+        if not self._size:
+            return None
+        newest = (self._head - 1) % self.capacity
+        state = {"ts": self.ts[newest]}
+        for metric in SENSOR_METRICS:
+            values = getattr(self, metric)
+            for back in range(self._size):
+                value = values[(newest - back) % self.capacity]
+                if not math.isnan(value):
+                    state[metric] = round(value, 2)
+                    break
+        return state
+
+    def nbytes(self) -> int:
+        buffers = sum(
+            sys.getsizeof(getattr(self, name)) for name in ("ts", "temperature", "humidity", "co2")
+        )
+        return sys.getsizeof(self) + buffers
+
+
+class SiloStateCache:
+    """Rings for every silo plus a periodically refreshed copy of silo_status."""
+
+    def __init__(self, capacity=256, stale_after=30.0):
+        self.capacity = capacity
+        self.stale_after = stale_after
+        self._rings = {}
+        self._docs = None
+        self._docs_loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, readings):
+        """Append validated ingest readings to their silos' rings."""
+        with self._lock:
+            for reading in readings:
+                ring = self._rings.get(reading["siloId"])
+                if ring is None:
+                    ring = self._rings[reading["siloId"]] = SiloRing(reading["siloId"], self.capacity)
+                ring.append(
+                    reading["ts"].timestamp(),
+                    reading.get("temperature"),
+                    reading.get("humidity"),
+                    reading.get("co2"),
+                )
+
+    def latest(self, silo_id):
+        """Newest metrics for a silo as ``{id, temperature, ..., lastReadingAt}``."""
+        with self._lock:
+            ring = self._rings.get(silo_id)
+            state = ring.latest() if ring is not None else None
+        if state is None:
+            return None
+        return self._overlay({"id": silo_id}, state, now=state["ts"])
+
+    def snapshot(self, load_docs):
+        """Silo status documents overlaid with fresh in-memory readings.
+
+        ``load_docs`` is only called when the cached documents are older
+        than ``stale_after`` seconds.
+        """
+        now = time.time()
+        if self._docs is None or now - self._docs_loaded_at > self.stale_after:
+            self._docs = list(load_docs())
+            self._docs_loaded_at = now
+
+        with self._lock:
+            live = {silo_id: ring.latest() for silo_id, ring in self._rings.items()}
+
+        silos = []
+        seen = set()
+        for doc in self._docs:
+            silo_id = doc.get("id")
+            seen.add(silo_id)
+            silos.append(self._overlay(doc, live.get(silo_id), now))
+        for silo_id, state in live.items():
+            if silo_id not in seen:
+                silos.append(self._overlay({"id": silo_id}, state, now))
+        return silos
+
+    def _overlay(self, doc, state, now):
+        doc = dict(doc)
+        if state is not None and now - state["ts"] <= self.stale_after:
+            doc.update({m: state[m] for m in SENSOR_METRICS if m in state})
+            doc["lastReadingAt"] = format_timestamp(datetime.fromtimestamp(state["ts"], tz=timezone.utc))
+        return doc
+
+    def memory_usage(self) -> dict:
+        with self._lock:
+            per_silo = {
+                silo_id: {"readings": len(ring), "bytes": ring.nbytes()}
+                for silo_id, ring in self._rings.items()
+            }
+        return {
+            "capacity": self.capacity,
+            "staleAfter": self.stale_after,
+            "silos": per_silo,
+            "totalBytes": sum(s["bytes"] for s in per_silo.values()),
+        }
@@ -0,0 +1,306 @@
+"""Deterministic synthetic data at scale, for load and performance testing.
+
+``generate(database, scale)`` writes warehouses, silo status, inventory
+batches, alerts and months of sensor history. The history goes into raw
+hourly buckets plus the 1m/1h/1d rollup tiers. Documents are shaped like
+the ``MOCK_*`` records and the ingest pipeline's own documents, so every
+route works on the result unchanged.
+
+Each scale unit is ``SCALE_UNIT`` (e.g. 10,000 inventory batches, 20
+silos). Work is split into independent chunks, one per batch of
+documents or one per silo for sensor history. Each chunk draws from its
+own RNG seeded from (seed, collection, chunk), so output does not depend
+on the worker count, batch size or scheduling. Only ``2 * workers`` chunks are in
+flight at a time and each is written with ``insert_many`` as soon as it
+is built, so memory stays flat however large the scale.
+"""
+
+import threading
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+
+import numpy as np
+
+from db import ensure_indexes
+from ingest import BUCKET_COLLECTION, format_timestamp
+from risk import CATEGORY_PROFILES
+from rollups import ROLLUP_TIERS
+
+# Documents per generation chunk; fixed so output does not depend on batch size
+CHUNK_SIZE = 1000
+SCALE_UNIT = {"warehouses": 10, "silos": 20, "inventory": 10_000, "alerts": 1_000}
+
+# crop -> (inventory category, unit)
+CROPS = {
+    "Wheat": ("Grains", "tons"), "Rice": ("Grains", "tons"), "Corn": ("Grains", "tons"),
+    "Barley": ("Grains", "tons"), "Soybean": ("Oilseeds", "tons"), "Sunflower": ("Oilseeds", "tons"),
+    "Mustard": ("Oilseeds", "tons"), "Apples": ("Fruits", "tons"), "Grapes": ("Fruits", "tons"),
+    "Potatoes": ("Vegetables", "tons"), "Onions": ("Vegetables", "tons"), "Cotton": ("Fibers", "bales"),
+}
+CROP_NAMES = list(CROPS)
+VARIETIES = ["Organic", "Premium", "HD-2967", "Basmati", "Yellow", "Hybrid", "Local", "Export Grade"]
+CITIES = ["Gurgaon, Haryana", "Nashik, Maharashtra", "Indore, Madhya Pradesh", "Ludhiana, Punjab",
+          "Guntur, Andhra Pradesh", "Rajkot, Gujarat", "Kota, Rajasthan", "Hubli, Karnataka"]
+ALERT_TYPES = {
+    "Temperature": "Temperature exceeded {value:.0f}°C threshold",
+    "Humidity": "Humidity level rising above {value:.0f}%",
+    "Stock Level": "Stock below {value:.0f} tons",
+    "Quality": "Moisture content elevated",
+    "Sensor": "CO2 sensor reading anomaly detected",
+    "Maintenance": "Scheduled maintenance in {value:.0f} days",
+}
+SEVERITIES = ["critical", "warning", "info"]
+SILO_STATUSES = ["normal", "warning", "critical"]
+
+COLLECTIONS = ["warehouses", "silo_status", "inventory", "alerts", BUCKET_COLLECTION] + [
+    collection for collection, _ in ROLLUP_TIERS.values()
+]
+
+
+def _rng(seed, name, chunk):
+    return np.random.default_rng([seed, zlib.crc32(name.encode()), chunk])
+
+
+def _iso(epoch) -> str:
+    return format_timestamp(datetime.fromtimestamp(epoch, tz=timezone.utc))
+
+
+def _profile(crop):
+    low_t, high_t, low_h, high_h = CATEGORY_PROFILES[CROPS[crop][0]][:4]
+    return (low_t + high_t) / 2, (low_h + high_h) / 2
+
+
+class _Writer:
+    """Per-chunk buffers flushed with ``insert_many`` every ``batch_size`` documents."""
+
+    def __init__(self, database, batch_size, counts, lock):
+        self._database = database
+        self._batch_size = batch_size
+        self._buffers = {}
+        self._counts = counts
+        self._lock = lock
+
+    def add(self, collection, doc):
+        buffer = self._buffers.setdefault(collection, [])
+        buffer.append(doc)
+        if len(buffer) >= self._batch_size:
+            self.flush(collection)
+
+    def flush(self, collection=None):
+        for name in [collection] if collection else list(self._buffers):
+            docs = self._buffers.get(name)
+            if docs:
+                self._database[name].insert_many(docs, ordered=False)
+                with self._lock:
+                    self._counts[name] = self._counts.get(name, 0) + len(docs)
+                self._buffers[name] = []
+
+
+class Generator:
+    def __init__(self, scale, seed=42, days=90, interval=300, minute_days=7, end=None):
+        if interval <= 0 or 3600 % interval:
+            raise ValueError("interval must divide 3600 seconds")
+        self.seed = seed
+        self.days = days
+        self.interval = interval
+        self.minute_days = minute_days
+        self.sizes = {name: max(1, round(count * scale)) for name, count in SCALE_UNIT.items()}
+        if end is None:
+            end = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        self.end = int(end.timestamp())
+        crops = _rng(seed, "silo", 0).integers(len(CROP_NAMES), size=self.sizes["silos"]).tolist()
+        self._silos = [
+            (f"silo-{i + 1}", f"Silo {i + 1}", CROP_NAMES[crop], f"wh-{i % self.sizes['warehouses'] + 1}")
+            for i, crop in enumerate(crops)
+        ]
+
+    def silo(self, index):
+        """(id, name, crop, warehouse id) of silo ``index``; shared by every collection."""
+        return self._silos[index]
+
+    # -- document chunks -------------------------------------------------------
+
+    def warehouses(self, writer, start, stop):
+        rng = _rng(self.seed, "warehouses", start)
+        for i in range(start, stop):
+            total = int(rng.integers(2_000, 20_000))
+            writer.add("warehouses", {
+                "_id": f"wh-{i + 1}",
+                "name": f"AgroVault Hub {i + 1}",
+                "location": CITIES[i % len(CITIES)],
+                "totalCapacity": total,
+                "usedCapacity": int(total * rng.uniform(0.3, 0.95)),
+                "units": int(rng.integers(2, 12)),
+                "contact": {
+                    "phone": f"+91 {rng.integers(100, 999)}-{rng.integers(100, 999)}-{rng.integers(1000, 9999)}",
+                    "email": f"hub{i + 1}@agrovault.io",
+                    "manager": f"Manager {i + 1}",
+                },
+                "crops": sorted({CROP_NAMES[c] for c in rng.integers(len(CROP_NAMES), size=4)}),
+                "status": "operational" if rng.random() < 0.9 else "maintenance",
+            })
+
+    def silos(self, writer, start, stop):
+        rng = _rng(self.seed, "silos", start)
+        for i in range(start, stop):
+            silo_id, name, crop, warehouse = self.silo(i)
+            temperature, humidity = _profile(crop)
+            writer.add("silo_status", {
+                "id": silo_id,
+                "name": name,
+                "warehouseId": warehouse,
+                "crop": crop,
+                "status": SILO_STATUSES[rng.choice(3, p=[0.8, 0.15, 0.05])],
+                "capacity": int(rng.integers(10, 100)),
+                "temperature": round(temperature + rng.normal(0, 1.5), 1),
+                "humidity": round(humidity + rng.normal(0, 3), 1),
+                "co2": int(rng.normal(420, 30)),
+            })
+
+    def inventory(self, writer, start, stop):
+        rng = _rng(self.seed, "inventory", start)
+        n = stop - start
+        silos = rng.integers(self.sizes["silos"], size=n)
+        quantities = rng.lognormal(5.5, 0.8, n).round()
+        stored = self.end - rng.uniform(0, 400 * 86400, n)
+        checked = self.end - rng.uniform(0, 7 * 86400, n)
+        quality = rng.choice(["Good", "Good", "Good", "Fair", "Poor"], size=n)
+        variety = rng.integers(len(VARIETIES), size=n)
+        temp_noise, humidity_noise = rng.normal(0, 2, n), rng.normal(0, 5, n)
+        for j in range(n):
+            _, silo_name, crop, _ = self.silo(int(silos[j]))
+            category, unit = CROPS[crop]
+            temperature, humidity = _profile(crop)
+            writer.add("inventory", {
+                "_id": f"inv-{start + j + 1}",
+                "name": f"{VARIETIES[variety[j]]} {crop}",
+                "category": category,
+                "location": silo_name,
+                "quantity": int(quantities[j]),
+                "unit": unit,
+                "qualityStatus": str(quality[j]),
+                "lastChecked": _iso(int(checked[j])),
+                "storedSince": _iso(int(stored[j])),
+                "temperature": round(temperature + float(temp_noise[j]), 1),
+                "humidity": round(humidity + float(humidity_noise[j])),
+            })
+
+    def alerts(self, writer, start, stop):
+        rng = _rng(self.seed, "alerts", start)
+        types = list(ALERT_TYPES)
+        for i in range(start, stop):
+            kind = types[rng.integers(len(types))]
+            age = rng.uniform(0, self.days * 86400)
+            writer.add("alerts", {
+                "_id": f"alert-{i + 1}",
+                "type": kind,
+                "severity": SEVERITIES[rng.choice(3, p=[0.15, 0.35, 0.5])],
+                "location": self.silo(int(rng.integers(self.sizes["silos"])))[1],
+                "message": ALERT_TYPES[kind].format(value=rng.uniform(2, 30) if kind != "Stock Level" else rng.uniform(100, 900)),
+                "timestamp": _iso(int(self.end - age)),
+                # Older alerts have usually been dealt with
+                "acknowledged": bool(rng.random() < min(0.95, age / 86400 / 3)),
+            })
+
+    def sensor_history(self, writer, index):
+        """``days`` of readings for one silo as hourly buckets plus rollups."""
+        silo_id, _, crop, _ = self.silo(index)
+        rng = _rng(self.seed, "sensors", index)
+        base_t, base_h = _profile(crop)
+        per_day = 86400 // self.interval
+        per_hour = 3600 // self.interval
+        offsets = np.arange(per_day) * self.interval
+        suffixes = [f"{o // 3600:02d}:{o // 60 % 60:02d}:{o % 60:02d}Z" for o in offsets.tolist()]
+        daily = np.sin(2 * np.pi * (offsets / 86400 - 0.25))
+        drift_t = drift_h = 0.0
+        first_day = self.end - self.days * 86400
+        for day in range(self.days):
+            day_start = first_day + day * 86400
+            drift_t = 0.9 * drift_t + rng.normal(0, 0.5)
+            drift_h = 0.9 * drift_h + rng.normal(0, 1.5)
+            columns = {
+                "temperature": np.round(base_t + drift_t + 1.5 * daily + rng.normal(0, 0.3, per_day), 1),
+                "humidity": np.clip(np.round(base_h + drift_h - 4 * daily + rng.normal(0, 1.0, per_day), 1), 0, 100),
+                "co2": np.maximum(np.round(420 + 15 * daily + rng.normal(0, 12, per_day)), 300),
+            }
+            values = {metric: column.tolist() for metric, column in columns.items()}
+            values["co2"] = [int(v) for v in values["co2"]]
+            prefix = _iso(day_start)[:11]
+            for hour in range(24):
+                rows = [
+                    {"temperature": values["temperature"][j], "humidity": values["humidity"][j],
+                     "co2": values["co2"][j], "ts": prefix + suffixes[j]}
+                    for j in range(hour * per_hour, (hour + 1) * per_hour)
+                ]
+                start = prefix + f"{hour:02d}:00:00Z"
+                writer.add(BUCKET_COLLECTION, {
+                    "_id": f"{silo_id}:{start}", "siloId": silo_id, "bucketStart": start,
+                    "readings": rows, "count": len(rows), "lastTs": rows[-1]["ts"],
+                })
+            for collection, period in ROLLUP_TIERS.values():
+                if period == 60 and day < self.days - self.minute_days:
+                    continue
+                for doc in _rollup_docs(silo_id, day_start, offsets, columns, period):
+                    writer.add(collection, doc)
+
+
+def _rollup_docs(silo_id, day_start, offsets, columns, period):
+    keys = offsets // period
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    counts = np.diff(np.r_[starts, len(offsets)]).tolist()
+    aggregates = {
+        metric: (np.minimum.reduceat(column, starts).tolist(), np.maximum.reduceat(column, starts).tolist(),
+                 np.add.reduceat(column, starts).tolist())
+        for metric, column in columns.items()
+    }
+    for g, key in enumerate(keys[starts].tolist()):
+        iso = _iso(day_start + key * period)
+        doc = {"_id": f"{silo_id}:{iso}", "siloId": silo_id, "start": iso}
+        for metric, (low, high, total) in aggregates.items():
+            doc[metric] = {"min": low[g], "max": high[g], "sum": total[g], "count": counts[g]}
+        yield doc
+
+
+def generate(database, scale, seed=42, workers=4, batch_size=1000, days=90, interval=300,
+             minute_days=7, end=None, log=print):
+    """Drop and regenerate the synthetic collections; returns documents written per collection."""
+    generator = Generator(scale, seed=seed, days=days, interval=interval, minute_days=minute_days, end=end)
+    for name in COLLECTIONS:
+        database.drop_collection(name)
+
+    counts, lock = {}, threading.Lock()
+
+    def run(method, *args):
+        writer = _Writer(database, batch_size, counts, lock)
+        method(writer, *args)
+        writer.flush()
+
+    def chunks(name):
+        total = generator.sizes[name]
+        return ((start, min(start + CHUNK_SIZE, total)) for start in range(0, total, CHUNK_SIZE))
+
+    phases = [
+        ("warehouses", (((generator.warehouses,) + chunk) for chunk in chunks("warehouses"))),
+        ("silo_status", (((generator.silos,) + chunk) for chunk in chunks("silos"))),
+        ("inventory", (((generator.inventory,) + chunk) for chunk in chunks("inventory"))),
+        ("alerts", (((generator.alerts,) + chunk) for chunk in chunks("alerts"))),
+        ("sensor history", ((generator.sensor_history, i) for i in range(generator.sizes["silos"]))),
+    ]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for label, tasks in phases:
+            started = time.perf_counter()
+            pending = set()
+            for task in tasks:
+                if len(pending) >= 2 * workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                pending.add(pool.submit(run, *task))
+            for future in wait(pending)[0]:
+                future.result()
+            log(f"  {label}: done in {time.perf_counter() - started:.1f}s")
+
+    ensure_indexes(database)
+    return counts
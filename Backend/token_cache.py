@@ -0,0 +1,70 @@
+"""Cache of verified JWT payloads so repeat requests skip signature checks.
+
+Entries are keyed by a SHA-256 of the raw token, so the tokens
+themselves are never kept. Each entry stores the decoded payload and is
+served only while its ``exp`` claim is in the future. Revoked tokens
+(logout) are remembered until they would have expired anyway.
+Revocation is per process; run a shared store if several workers must
+see each other's logouts.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+def token_key(token: str) -> bytes:
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+
+class TokenCache:
+    def __init__(self, max_entries=10_000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> payload
+        self._revoked = {}  # key -> exp
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Cached payload for a token key, or None if absent or expired."""
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is None:
+                self.misses += 1
+                return None
+            if payload.get("exp", 0) <= time.time():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def put(self, key, payload):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = payload
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def revoke(self, key, exp):
+        with self._lock:
+            self._entries.pop(key, None)
+            now = time.time()
+            self._revoked = {k: e for k, e in self._revoked.items() if e > now}
+            self._revoked[key] = exp
+
+    def is_revoked(self, key) -> bool:
+        return key in self._revoked
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "revoked": len(self._revoked),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
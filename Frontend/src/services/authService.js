@@ -20,6 +20,10 @@ const authService = {
     },
 
     logout: () => {
+        // Revoke server-side too; local logout must not wait on or fail with it
+        if (localStorage.getItem('token')) {
+            api.post('/auth/logout').catch(() => {});
+        }
         localStorage.removeItem('token');
         localStorage.removeItem('user');
     },
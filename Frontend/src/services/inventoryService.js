@@ -6,6 +6,18 @@ const inventoryService = {
         return response.data;
     },
 
+    // Keyset pagination: resolves to { items, next }. Pass `next` back as
+    // `after` to fetch the following page; `next` is null on the last page.
+    getPage: async ({ after, limit = 50, sort, fields, category } = {}) => {
+        const params = { limit };
+        if (after) params.after = after;
+        if (sort) params.sort = sort;
+        if (category) params.category = category;
+        if (fields) params.fields = Array.isArray(fields) ? fields.join(',') : fields;
+        const response = await api.get('/inventory', { params });
+        return response.data;
+    },
+
     getById: async (id) => {
         const response = await api.get(`/inventory/${id}`);
         return response.data;
@@ -20,6 +20,19 @@ const sensorService = {
         const response = await api.put(`/sensors/alerts/${alertId}/acknowledge`);
         return response.data;
     },
+
+    // Live updates over server-sent events instead of polling.
+    // handlers: { alert, 'alert.acknowledged', silo } -> fn(data).
+    // Returns the EventSource; call .close() to stop listening.
+    subscribe: (handlers = {}) => {
+        const token = localStorage.getItem('token') || '';
+        const url = `${api.defaults.baseURL}/stream/events?token=${encodeURIComponent(token)}`;
+        const source = new EventSource(url);
+        Object.entries(handlers).forEach(([event, handler]) => {
+            source.addEventListener(event, (e) => handler(JSON.parse(e.data)));
+        });
+        return source;
+    },
 };
 
 export default sensorService;